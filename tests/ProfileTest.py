@@ -2,7 +2,7 @@
 Not actually tests, but benchmarks.
 """
 from __future__ import print_function
-from yarom import disconnect, connect, yarom_import
+from yarom import disconnect, connect, config, yarom_import
 
 
 def setup():
@@ -18,3 +18,27 @@ def test_do_create():
 
     for i in range(10000):
         DO()
+
+
+def test_do_create_variable():
+    DO = yarom_import('yarom.dataObject.DataObject')
+
+    for i in range(10000):
+        DO().variable()
+
+
+def test_do_create_random_variable():
+    DO = yarom_import('yarom.dataObject.DataObject')
+    config('dataObject.variable_naming', 'random')
+    try:
+        for i in range(10000):
+            DO().variable()
+    finally:
+        config('dataObject.variable_naming', 'counter')
+
+
+def test_do_create_million():
+    DO = yarom_import('yarom.dataObject.DataObject')
+
+    for i in range(1000000):
+        DO().rdf_type_property
@@ -2,6 +2,10 @@ from yarom import connect, disconnect
 from yarom import config as C
 from yarom.configure import Configuration
 
+from random import random
+from yarom.graphObject import GraphObject
+from yarom.rangedObjects import InRange
+
 import rdflib
 import unittest
 import subprocess
@@ -57,3 +61,115 @@ def make_graph(size=100):
         o = rdflib.URIRef(TEST_NS["o" + str(i)])
         g.add((s, p, o))
     return g
+
+
+class CountingGraph(object):
+
+    """ Wraps a graph, recording the calls made to read from it.
+
+    Calls to ``triples``, ``triples_choices``, ``query`` and ``__contains__``
+    are appended to :attr:`calls` as pairs of the method name and the query.
+    The number of statements read through ``triples`` and ``triples_choices``
+    is counted in :attr:`pulled` as they're read. Other attributes come from
+    the wrapped graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.calls = []
+        self.pulled = 0
+
+    def triples(self, q, context=None):
+        self.calls.append(('triples', q))
+        return self._pull(self.graph.triples(q, context))
+
+    def triples_choices(self, q, context=None):
+        self.calls.append(('triples_choices', q))
+        return self._pull(self.graph.triples_choices(q, context))
+
+    def _pull(self, triples):
+        for t in triples:
+            self.pulled += 1
+            yield t
+
+    def query(self, q, *args, **kwargs):
+        self.calls.append(('query', q))
+        return self.graph.query(q, *args, **kwargs)
+
+    def __contains__(self, t):
+        self.calls.append(('__contains__', t))
+        return t in self.graph
+
+    def count(self, *methods):
+        """ Returns the number of calls recorded to any of `methods`, or to
+        any method if none are given """
+        return len([c for c in self.calls if not methods or c[0] in methods])
+
+    def reset(self):
+        """ Forgets the calls recorded so far """
+        self.calls = []
+        self.pulled = 0
+
+    def __iter__(self):
+        return iter(self.graph)
+
+    def __len__(self):
+        return len(self.graph)
+
+    def __getattr__(self, attr):
+        return getattr(self.graph, attr)
+
+
+class G(GraphObject):
+
+    def __init__(self, k=None, **kwargs):
+        super(G, self).__init__(**kwargs)
+        if k is None:
+            self._v = random()
+            self._k = None
+        else:
+            self._k = k
+            self._v = None
+
+    @property
+    def identifier(self):
+        return self._k
+
+    def variable(self):
+        return self._v
+
+    def __hash__(self):
+        return hash(self._k)
+
+    @property
+    def defined(self):
+        return self._k is not None
+
+    def __repr__(self):
+        return 'G(' + repr(self._k) + ')' if self._k else 'G()'
+
+
+class P(object):
+
+    """ A property from `x` to `y` in a query graph made of :class:`G`
+    objects. If `graph` is given and both ends are defined, the triple for
+    the property is added to it """
+
+    link = '->'
+
+    def __init__(self, x, y, graph=None, link=None):
+        if link is not None:
+            self.link = link
+        self.values = [y]
+        self.owner = x
+
+        if isinstance(y, InRange):
+            vcname = 'G' + y.__class__.__name__
+            vclass = y.__class__
+            y.__class__ = type(vcname, (vclass, G), {})
+            G.__init__(y)
+
+        y.owner_properties.append(self)
+        x.properties.append(self)
+        if graph is not None and x.defined and y.defined:
+            graph.add((x.identifier, self.link, y.identifier))
@@ -0,0 +1,111 @@
+import random
+import unittest
+
+import rdflib
+
+from yarom.closureIndex import ClosureIndex
+from yarom.graphObject import GraphObjectQuerier, ZeroOrMoreTQLayer
+from yarom.go_modifiers import ZeroOrMore
+from yarom.rdfUtils import transitive_lookup, UP, DOWN
+
+from .base_test import CountingGraph
+
+EX = rdflib.Namespace('http://example.org/')
+
+
+def n(i):
+    return EX['n' + str(i)]
+
+
+class ClosureIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rand = random.Random(11)
+        self.g = CountingGraph(rdflib.ConjunctiveGraph())
+        for _ in range(60):
+            self.g.add(self.edge())
+        self.cut = ClosureIndex(self.g)
+
+    def edge(self):
+        return (n(self.rand.randrange(30)), EX.sub, n(self.rand.randrange(30)))
+
+    def assertClosuresMatch(self):
+        for i in range(30):
+            for direction in (UP, DOWN):
+                self.assertEqual(transitive_lookup(self.g, n(i), EX.sub,
+                                                   direction=direction),
+                                 self.cut.closure(n(i), EX.sub, direction))
+
+    def test_matches_lookup(self):
+        self.assertClosuresMatch()
+
+    def test_single_scan(self):
+        for i in range(30):
+            self.cut.closure(n(i), EX.sub, DOWN)
+        self.assertEqual(1, self.g.count())
+
+    def test_unknown_start(self):
+        self.assertEqual(frozenset([EX.other]),
+                         self.cut.closure(EX.other, EX.sub))
+
+    def test_add(self):
+        self.assertClosuresMatch()
+        for _ in range(20):
+            t = self.edge()
+            self.g.add(t)
+            self.cut.add([t])
+            self.assertClosuresMatch()
+
+    def test_remove(self):
+        self.assertClosuresMatch()
+        for t in self.rand.sample(sorted(self.g.triples((None, None, None))), 20):
+            self.g.remove(t)
+            self.cut.remove([t])
+            self.assertClosuresMatch()
+
+    def test_unindexed_predicate(self):
+        cut = ClosureIndex(self.g, [EX.other])
+        self.assertIsNone(cut.closure(n(0), EX.sub))
+
+    def test_clear(self):
+        self.cut.closure(n(0), EX.sub)
+        self.g.add((n(0), EX.sub, EX.extra))
+        self.cut.clear()
+        self.assertIn(EX.extra, self.cut.closure(n(0), EX.sub))
+
+
+class ZeroOrMoreClosureIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(rdflib.ConjunctiveGraph())
+        for i in range(1, 6):
+            g.add((n(i), EX.sub, n(i - 1)))
+        for i in range(6):
+            g.add((EX['thing' + str(i)], EX.kind, n(i)))
+        self.g = g
+
+    def tf(self, direction):
+        def f(x):
+            if x == n(2):
+                return ZeroOrMore(n(2), EX.sub, direction)
+        return f
+
+    def test_same_results(self):
+        for direction in (UP, DOWN):
+            q = (None, EX.kind, n(2))
+            expected = set(ZeroOrMoreTQLayer(self.tf(direction), self.g).triples(q))
+            index = ClosureIndex(self.g)
+            cut = ZeroOrMoreTQLayer(self.tf(direction), self.g, closure_index=index)
+            self.assertEqual(expected, set(cut.triples(q)))
+            self.g.reset()
+            self.assertEqual(expected, set(cut.triples(q)))
+            self.assertEqual(1, self.g.count())
+
+    def test_given_by_querier(self):
+        index = ClosureIndex(self.g)
+        layer = ZeroOrMoreTQLayer(self.tf(DOWN), self.g)
+        other = ZeroOrMoreTQLayer(self.tf(DOWN), rdflib.ConjunctiveGraph())
+        GraphObjectQuerier(None, layer, closure_index=index)
+        GraphObjectQuerier(None, other, closure_index=index)
+        self.assertIs(index, layer.closure_index)
+        self.assertIsNone(other.closure_index)
@@ -0,0 +1,34 @@
+from yarom import yarom_import
+
+from .data_test import _DataTest
+
+
+class DataObjectCreationTest(_DataTest):
+
+    def test_create_cost_constant(self):
+        ''' Objects related to a shared type object cost the same to make no
+        matter how many have been made before. Cost is counted in comparisons
+        between properties '''
+        from yarom.simpleProperty import SimpleProperty
+        DO = yarom_import('yarom.dataObject.DataObject')
+        chunk = 1000
+        comparisons = [0]
+        eq = SimpleProperty.__eq__
+
+        def counting_eq(self, other):
+            comparisons[0] += 1
+            return eq(self, other)
+        counts = []
+        objects = []
+        SimpleProperty.__eq__ = counting_eq
+        try:
+            for _ in range(5):
+                comparisons[0] = 0
+                for i in range(chunk):
+                    o = DO()
+                    o.rdf_type_property
+                    objects.append(o)
+                counts.append(comparisons[0])
+        finally:
+            SimpleProperty.__eq__ = eq
+        self.assertLessEqual(max(counts), counts[0])
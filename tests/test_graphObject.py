@@ -1,52 +1,34 @@
+import pickle
 import unittest
 from logging import getLogger
-from random import random
-from yarom.graphObject import (GraphObject,
+from yarom.graphObject import (BatchGraphObjectQuerier,
                                ComponentTripler,
+                               close_worker_graphs,
+                               GraphObjectChecker,
                                GraphObjectQuerier,
+                               QueryPlanCache,
                                TQLayer,
-                               ZeroOrMoreTQLayer)
+                               ZeroOrMoreTQLayer,
+                               _QueryPreparer,
+                               _QueryShape,
+                               _bind_plan)
 
 from yarom.rangedObjects import InRange, LessThan
 from yarom.rdfUtils import UP, DOWN
+from .base_test import CountingGraph, G, P
 
 import rdflib
 
 L = getLogger(__name__)
 
 
-class G(GraphObject):
-
-    def __init__(self, k=None, **kwargs):
-        super(G, self).__init__(**kwargs)
-        if k is None:
-            self._v = random()
-            self._k = None
-        else:
-            self._k = k
-            self._v = None
-
-    @property
-    def identifier(self):
-        return self._k
-
-    def variable(self):
-        return self._v
-
-    def __hash__(self):
-        return hash(self._k)
-
-    @property
-    def defined(self):
-        return self._k is not None
-
-    def __repr__(self):
-        return 'G(' + repr(self._k) + ')' if self._k else 'G()'
-
-
 class Graph(object):
     def __init__(self):
         self.s = set([])
+        self.closed = False
+
+    def close(self):
+        self.closed = True
 
     def __contains__(self, o):
         return o in self.s
@@ -131,25 +113,6 @@ class Graph(object):
                     return set([q]) if q in self.s else set([])
 
 
-class P(object):
-    link = '->'
-
-    def __init__(self, x, y, graph=None):
-        self.values = [y]
-        self.owner = x
-
-        if isinstance(y, InRange):
-            vcname = 'G' + y.__class__.__name__
-            vclass = y.__class__
-            y.__class__ = type(vcname, (vclass, G), {})
-            G.__init__(y)
-
-        y.owner_properties.append(self)
-        x.properties.append(self)
-        if graph is not None and x.defined and y.defined:
-            graph.add((x.identifier, P.link, y.identifier))
-
-
 class GraphObjectQuerierTest(unittest.TestCase):
 
     def test_query_defined_and_in_graph_returns_self(self):
@@ -206,6 +169,418 @@ class GraphObjectQuerierTest(unittest.TestCase):
         self.assertEqual(set([2, 3]), r)
 
 
+class QueryPlanCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        P(G(3), G(1), g)
+        P(G(2), G(7), g)
+        P(G(3), G(7), g)
+        P(G(7), G(9), g)
+        self.g = g
+
+    def query(self, k):
+        at = G()
+        mid = G()
+        P(at, G(k))
+        P(at, mid)
+        P(mid, G(9))
+        return at
+
+    def test_path_table_matches_merge_paths(self):
+        at = self.query(1)
+        paths = _QueryPreparer(at)()
+        expected = GraphObjectQuerier(at, self.g).merge_paths(paths)
+
+        shape = _QueryShape(at)
+        signature = shape()
+        actual = _bind_plan(shape.path_table(signature), shape.constants)
+
+        def strip_targets(table):
+            return {hop[:3]: strip_targets(sub) for hop, sub in table.items()}
+        self.assertEqual(strip_targets(expected), strip_targets(actual))
+
+    def test_same_shape_same_signature(self):
+        self.assertEqual(_QueryShape(self.query(1))(),
+                         _QueryShape(self.query(7))())
+
+    def test_different_shape_different_signature(self):
+        at = G()
+        P(at, G(1))
+        self.assertNotEqual(_QueryShape(self.query(1))(), _QueryShape(at)())
+
+    def test_hit_rebinds_constants(self):
+        cache = QueryPlanCache()
+        r1 = set(GraphObjectQuerier(self.query(1), self.g, plan_cache=cache)())
+        r2 = set(GraphObjectQuerier(self.query(7), self.g, plan_cache=cache)())
+        self.assertEqual(set([3]), r1)
+        self.assertEqual(set(GraphObjectQuerier(self.query(7), self.g)()), r2)
+        self.assertEqual(set([2, 3]), r2)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(1, cache.hits)
+
+    def test_cached_order_is_reused(self):
+        scores = {1: 0, 9: 1}
+        cache = QueryPlanCache()
+        calls = []
+
+        def scorer(hop):
+            calls.append(hop)
+            return scores.get(hop[2], 2)
+        GraphObjectQuerier(self.query(1), self.g, hop_scorer=scorer, plan_cache=cache)()
+        del calls[:]
+        GraphObjectQuerier(self.query(1), self.g, hop_scorer=scorer, plan_cache=cache)()
+        self.assertEqual([], calls)
+
+    def test_lru_eviction(self):
+        cache = QueryPlanCache(maxsize=1)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(2, cache.get('b'))
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(1, len(cache))
+
+
+class GraphObjectQuerierExplainTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        P(G(3), G(1), g)
+        P(G(2), G(7), g)
+        P(G(3), G(7), g)
+        P(G(7), G(9), g)
+        self.g = g
+        at = G()
+        mid = G()
+        P(at, G(7))
+        P(at, mid)
+        P(mid, G(9))
+        self.at = at
+
+    def scorer(self, hop):
+        return 1 if hop[2] == 7 else 2
+
+    def test_explain_hop_order(self):
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=self.scorer).explain()
+        self.assertEqual([7, 0], [h[2] for h in expl.hop_order()])
+        self.assertEqual([1, 2], [h.estimate for h in expl.join.hops])
+        self.assertIsNone(expl.result_size)
+
+    def test_explain_subquery(self):
+        expl = GraphObjectQuerier(self.at, self.g).explain()
+        sub = expl.join.hops[1].subquery
+        self.assertEqual([9], [h.hop[2] for h in sub.hops])
+
+    def test_analyze_sizes(self):
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=self.scorer).explain(analyze=True)
+        self.assertEqual(2, expl.result_size)
+        self.assertEqual([2, 2], expl.join.join_sizes)
+        self.assertEqual([2, 2], [h.actual for h in expl.join.hops])
+        self.assertEqual(1, expl.join.hops[1].subquery.result_size)
+
+    def test_analyze_calls(self):
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=self.scorer).explain(analyze=True)
+        self.assertEqual({'triples': 2, 'triples_choices': 1}, expl.calls)
+        self.assertEqual({'triples': 1}, expl.join.hops[0].calls)
+        self.assertEqual({'triples_choices': 1}, expl.join.hops[1].calls)
+
+    def test_analyze_defined(self):
+        expl = GraphObjectQuerier(G(3), self.g).explain(analyze=True)
+        self.assertTrue(expl.checked)
+        self.assertEqual(1, expl.result_size)
+
+    def test_str(self):
+        expl = GraphObjectQuerier(self.at, self.g).explain(analyze=True)
+        self.assertIn('->', str(expl))
+
+
+class GraphObjectQuerierStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(Graph())
+        for i in range(20):
+            P(G(i), G(100), g)
+            if i % 2 == 0:
+                P(G(i), G(200), g)
+        self.g = g
+
+    def test_stream_matches_query(self):
+        at = G()
+        P(at, G(100))
+        P(at, G(200))
+        r = list(GraphObjectQuerier(at, self.g).stream())
+        self.assertEqual(len(set(r)), len(r))
+        self.assertEqual(set(GraphObjectQuerier(at, self.g)()), set(r))
+
+    def test_stream_is_lazy(self):
+        at = G()
+        P(at, G(100))
+        it = GraphObjectQuerier(at, self.g).stream()
+        next(it)
+        next(it)
+        self.assertEqual(2, self.g.pulled)
+
+    def test_stream_defined(self):
+        self.assertEqual([4], list(GraphObjectQuerier(G(4), self.g).stream()))
+
+    def test_stream_empty_join(self):
+        at = G()
+        P(at, G(100))
+        P(at, G(300))
+        self.assertEqual([], list(GraphObjectQuerier(at, self.g).stream()))
+
+
+def _parallel_test_graph(g=None):
+    if g is None:
+        g = Graph()
+    for i in range(30):
+        P(G(i), G(100 + i % 3), g)
+        P(G(i), G(200 + i % 5), g)
+        P(G(i), G(300 + i % 2), g)
+        P(G(300 + i % 2), G(400), g)
+    return g
+
+
+class _TestGraphOpener(object):
+
+    def __call__(self):
+        return _parallel_test_graph()
+
+    def __eq__(self, other):
+        return isinstance(other, _TestGraphOpener)
+
+    def __hash__(self):
+        return hash(_TestGraphOpener)
+
+
+_worker_calls = []
+
+
+class _RecordingGraphOpener(_TestGraphOpener):
+
+    def __call__(self):
+        class RecordingGraph(Graph):
+            def triples(self, q, context=None):
+                _worker_calls.append(('triples', q))
+                return super(RecordingGraph, self).triples(q, context)
+
+            def triples_choices(self, q, context=None):
+                _worker_calls.append(('triples_choices', q))
+                return super(RecordingGraph, self).triples_choices(q, context)
+        return _parallel_test_graph(RecordingGraph())
+
+    def __eq__(self, other):
+        return isinstance(other, _RecordingGraphOpener)
+
+    def __hash__(self):
+        return hash(_RecordingGraphOpener)
+
+
+class _PicklingExecutor(object):
+
+    """ Runs tasks immediately, after sending them through pickle as a process
+    pool would """
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        fn, args = pickle.loads(pickle.dumps((fn, args)))
+        f = Future()
+        f.set_result(fn(*args))
+        return f
+
+
+class GraphObjectQuerierParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.g = _parallel_test_graph()
+        at = G()
+        mid = G()
+        P(at, G(101))
+        P(at, G(203))
+        P(at, mid)
+        P(mid, G(400))
+        self.at = at
+
+    def test_threads_same_as_sequential(self):
+        expected = set(GraphObjectQuerier(self.at, self.g)())
+        self.assertEqual(set([13, 28]), expected)
+        r = set(GraphObjectQuerier(self.at, self.g, parallel=True)())
+        self.assertEqual(expected, r)
+
+    def test_given_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        expected = set(GraphObjectQuerier(self.at, self.g)())
+        with ThreadPoolExecutor(2) as ex:
+            r = set(GraphObjectQuerier(self.at, self.g, parallel=ex)())
+        self.assertEqual(expected, r)
+
+    def test_process_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+        expected = set(GraphObjectQuerier(self.at, self.g)())
+        with ProcessPoolExecutor(2) as ex:
+            r = set(GraphObjectQuerier(self.at, self.g, parallel=ex,
+                                       graph_opener=_TestGraphOpener())())
+        self.assertEqual(expected, r)
+
+    def test_worker_uses_scores(self):
+        at = G()
+        mid = G()
+        P(at, G(101))
+        P(at, mid)
+        P(mid, G(400))
+        P(G(5), mid)
+
+        def scorer(hop):
+            if hop[2] == 400:
+                return 1
+            if hop[0] == 5:
+                return 2
+            return 1000
+        scorer.estimates_size = True
+
+        def sub_query_calls():
+            return [c for c in _worker_calls if 5 in c[1] or 400 in c[1]]
+
+        opener = _RecordingGraphOpener()
+        del _worker_calls[:]
+        expected = set(GraphObjectQuerier(at, opener(), hop_scorer=scorer)())
+        self.assertEqual(set([1, 7, 13, 19, 25]), expected)
+        expected_calls = sub_query_calls()
+
+        close_worker_graphs()
+        del _worker_calls[:]
+        try:
+            r = set(GraphObjectQuerier(at, self.g, parallel=_PicklingExecutor(),
+                                       graph_opener=opener, hop_scorer=scorer)())
+        finally:
+            close_worker_graphs()
+        self.assertEqual(expected, r)
+        self.assertEqual(expected_calls, sub_query_calls())
+
+    def test_worker_graphs_closed(self):
+        from yarom.graphObject import _worker_graph
+        close_worker_graphs()
+        first = _worker_graph(_TestGraphOpener())
+        self.assertIs(first, _worker_graph(_TestGraphOpener()))
+        second = _worker_graph(_RecordingGraphOpener())
+        self.assertTrue(first.closed)
+        close_worker_graphs()
+        self.assertTrue(second.closed)
+
+    def test_process_pool_requires_opener(self):
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(1) as ex:
+            with self.assertRaises(Exception):
+                GraphObjectQuerier(self.at, self.g, parallel=ex)
+
+
+class BatchGraphObjectQuerierTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        for i in range(30):
+            P(G(i), G(100 + i % 3), g)
+            P(G(i), G(200 + i % 5), g)
+            P(G(200 + i % 5), G(300 + i % 2), g)
+        self.g = g
+
+    def star(self, a, b):
+        at = G()
+        P(at, G(a))
+        P(at, G(b))
+        return at
+
+    def chain(self, a, c):
+        at = G()
+        mid = G()
+        P(at, G(a))
+        P(at, mid)
+        P(mid, G(c))
+        return at
+
+    def individually(self, queries):
+        return [set(GraphObjectQuerier(q, self.g)()) for q in queries]
+
+    def test_same_as_individual(self):
+        queries = [self.star(100 + i % 3, 200 + i % 5) for i in range(10)]
+        queries.append(self.star(100, 999))
+        expected = self.individually(queries)
+        r = BatchGraphObjectQuerier(queries, self.g)()
+        self.assertEqual(expected, [set(x) for x in r])
+
+    def test_mixed_shapes(self):
+        queries = [self.chain(101, 300), self.star(101, 202), self.chain(102, 301),
+                   G(4), G(999), self.star(100, 200)]
+        expected = self.individually(queries)
+        r = BatchGraphObjectQuerier(queries, self.g)()
+        self.assertEqual(expected, [set(x) for x in r])
+
+    def test_range(self):
+        queries = []
+        for lo in (1, 5, 20):
+            at = G()
+            P(at, InRange(lo, lo + 4))
+            queries.append(at)
+        g = Graph()
+        for i in range(30):
+            P(G(1000 + i), G(i), g)
+        expected = [set(GraphObjectQuerier(q, g)()) for q in queries]
+        self.assertEqual(set([1002, 1003, 1004]), expected[0])
+        r = BatchGraphObjectQuerier(queries, g)()
+        self.assertEqual(expected, [set(x) for x in r])
+
+    def test_calls_shared(self):
+        g = CountingGraph(self.g)
+        queries = [self.chain(100 + i % 3, 300 + i % 2) for i in range(20)]
+        BatchGraphObjectQuerier(queries, g)()
+        self.assertEqual(3, len([q for _, q in g.calls if isinstance(q[2], list)]))
+
+
+class GraphObjectCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(Graph())
+        for i in range(1, 6):
+            P(G(0), G(i), g)
+        P(G(7), G(0), g)
+        self.g = g
+
+    def star(self, n):
+        at = G(0)
+        for i in range(1, n + 1):
+            P(at, G(i))
+        P(G(7), at)
+        return at
+
+    def test_present(self):
+        self.assertTrue(GraphObjectChecker(self.star(5), self.g)())
+
+    def test_missing(self):
+        self.assertFalse(GraphObjectChecker(self.star(6), self.g)())
+
+    def test_grouped(self):
+        GraphObjectChecker(self.star(5), self.g)()
+        self.assertEqual(['__contains__', 'triples_choices'],
+                         sorted(c[0] for c in self.g.calls))
+
+    def test_stops_at_first_miss(self):
+        at = self.star(5)
+        P(G(8), at)
+
+        class Scorer(object):
+            def known(self, hop):
+                return 0 if hop[0] is None else None
+        self.assertFalse(GraphObjectChecker(at, self.g, hop_scorer=Scorer())())
+        self.assertEqual(1, len(self.g.calls))
+        self.assertEqual('triples_choices', self.g.calls[0][0])
+
+    def test_unknown_scores_not_computed(self):
+        def scorer(hop):
+            raise AssertionError('Scored {}'.format(hop))
+        self.assertTrue(GraphObjectChecker(self.star(5), self.g, hop_scorer=scorer)())
+
+
 class ZeroOrMoreTQLayerTest(unittest.TestCase):
     # test ZeroOrMore literal fails
     # test ZeroOrMore triples_choices
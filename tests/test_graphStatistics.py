@@ -0,0 +1,150 @@
+import unittest
+
+from yarom.graphObject import GraphObjectQuerier, Variable
+from yarom.graphStatistics import GraphStatistics, StatisticsHopScorer
+
+from .base_test import G, P
+from .test_graphObject import Graph
+
+
+class GraphStatisticsTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        for i in range(10):
+            g.add((i, 'type', 'common'))
+        g.add((3, 'type', 'rare'))
+        g.add((3, 'name', 'three'))
+        g.add((4, 'name', 'four'))
+        self.g = g
+        self.cut = GraphStatistics(g)
+
+    def test_predicate_counts(self):
+        stats = self.cut.predicate_statistics('type')
+        self.assertEqual(11, stats.count)
+        self.assertEqual(10, stats.distinct_subjects)
+        self.assertEqual(2, stats.distinct_objects)
+
+    def test_object_frequency(self):
+        self.assertEqual(10, self.cut.estimate((None, 'type', 'common', None)))
+        self.assertEqual(1, self.cut.estimate((None, 'type', 'rare', None)))
+
+    def test_untracked_object_frequency(self):
+        cut = GraphStatistics(self.g, tracked_values=1)
+        self.assertEqual(1, cut.estimate((None, 'type', 'rare', None)))
+
+    def test_subject_constant(self):
+        self.assertEqual(1.1, self.cut.estimate((3, 'type', None, None)))
+
+    def test_variable_estimate_is_predicate_count(self):
+        self.assertEqual(11, self.cut.estimate((None, 'type', Variable(0), None)))
+
+    def test_estimate_without_collecting(self):
+        self.assertIsNone(self.cut.estimate((None, 'type', 'rare', None), collect=False))
+        self.cut.predicate_statistics('type')
+        self.assertEqual(1, self.cut.estimate((None, 'type', 'rare', None), collect=False))
+
+    def test_cached_until_refresh(self):
+        self.cut.predicate_statistics('name')
+        self.g.add((5, 'name', 'five'))
+        self.cut.note_modified({'name': 1})
+        self.assertEqual(2, self.cut.predicate_statistics('name').count)
+        self.cut.note_modified()
+        self.assertEqual(3, self.cut.predicate_statistics('name').count)
+
+    def test_refresh_after_many_modifications(self):
+        cut = GraphStatistics(self.g, refresh_minimum=0, refresh_fraction=0.5)
+        cut.predicate_statistics('name')
+        self.g.add((5, 'name', 'five'))
+        self.g.add((6, 'name', 'six'))
+        cut.note_modified({'name': 2})
+        self.assertEqual(4, cut.predicate_statistics('name').count)
+
+
+class StatisticsHopScorerTest(unittest.TestCase):
+
+    def test_most_selective_hop_first(self):
+        g = Graph()
+        for i in range(20):
+            g.add((i, P.link, 0))
+        g.add((5, P.link, 1))
+
+        hops = []
+
+        class RecordingQuerier(GraphObjectQuerier):
+            def _qpr_helper(self, sub, search_triple, join_args):
+                hops.append(search_triple[2])
+                return super(RecordingQuerier, self)._qpr_helper(sub, search_triple, join_args)
+
+        at = G()
+        P(at, G(0))
+        P(at, G(1))
+        r = set(RecordingQuerier(at, g, hop_scorer=StatisticsHopScorer(GraphStatistics(g)))())
+        self.assertEqual(set([5]), r)
+        self.assertEqual([1, 0], hops)
+
+
+class SizeScorer(object):
+    estimates_size = True
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def __call__(self, hop):
+        return self.sizes[hop[1]]
+
+
+class Q(P):
+    link = 'rare'
+
+
+class SidewaysRestrictionTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        for i in range(200):
+            g.add((i, P.link, 0))
+        g.add((5, 'rare', 1))
+        g.add((6, 'rare', 1))
+        g.add((300, 'rare', 1))
+        self.g = g
+        at = G()
+        P(at, G(0))
+        Q(at, G(1))
+        self.at = at
+
+    def test_scan_small_hop(self):
+        scorer = SizeScorer({P.link: 1, 'rare': 3})
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=scorer).explain(analyze=True)
+        self.assertEqual(2, expl.result_size)
+        self.assertEqual({'triples': 1}, expl.join.hops[1].calls)
+
+    def test_choices_for_large_hop(self):
+        scorer = SizeScorer({P.link: 1, 'rare': 1000})
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=scorer).explain(analyze=True)
+        self.assertEqual(2, expl.result_size)
+        self.assertEqual({'triples_choices': 1}, expl.join.hops[1].calls)
+
+    def test_choices_without_size_estimates(self):
+        expl = GraphObjectQuerier(self.at, self.g, hop_scorer=lambda h: 0).explain(analyze=True)
+        self.assertEqual(2, expl.result_size)
+        self.assertEqual({'triples_choices': 1}, expl.join.hops[1].calls)
+
+    def test_subquery_restricted(self):
+        """ A sub-query hop is filtered by the hops before it """
+        g = self.g
+        for i in range(0, 200, 10):
+            g.add((i, 'rare', 400 + i))
+            g.add((400 + i, P.link, 9))
+        at = G()
+        mid = G()
+        Q(at, G(1))
+        P(at, mid)
+        P(mid, G(9))
+        scorer = SizeScorer({P.link: 100, 'rare': 3})
+        r = GraphObjectQuerier(at, g, hop_scorer=scorer)()
+        self.assertEqual(set(), r)
+        g.add((5, P.link, 405))
+        g.add((405, P.link, 9))
+        r = GraphObjectQuerier(at, g, hop_scorer=scorer)()
+        self.assertEqual(set([5]), r)
@@ -0,0 +1,86 @@
+import gc
+import unittest
+
+import rdflib
+
+from yarom.identityMap import IdentityMap
+
+EX = rdflib.Namespace('http://example.org/')
+
+
+class Thing(object):
+    pass
+
+
+class Other(object):
+    pass
+
+
+class IdentityMapTest(unittest.TestCase):
+
+    def test_get_put(self):
+        cut = IdentityMap()
+        o = Thing()
+        cut.put(EX.a, Thing, o)
+        self.assertIs(o, cut.get(EX.a, Thing))
+        self.assertIsNone(cut.get(EX.a, Other))
+        self.assertIsNone(cut.get(EX.b, Thing))
+
+    def test_weak(self):
+        cut = IdentityMap()
+        cut.put(EX.a, Thing, Thing())
+        gc.collect()
+        self.assertIsNone(cut.get(EX.a, Thing))
+        self.assertEqual(0, len(cut))
+
+    def test_strong_lru(self):
+        cut = IdentityMap(strong_size=2)
+        for n in ('a', 'b', 'c'):
+            cut.put(EX[n], Thing, Thing())
+        cut.get(EX.b, Thing)
+        cut.put(EX.d, Thing, Thing())
+        gc.collect()
+        self.assertIsNone(cut.get(EX.a, Thing))
+        self.assertIsNone(cut.get(EX.c, Thing))
+        self.assertIsNotNone(cut.get(EX.b, Thing))
+        self.assertIsNotNone(cut.get(EX.d, Thing))
+
+    def test_remove(self):
+        cut = IdentityMap()
+        a, b, c = Thing(), Other(), Thing()
+        cut.put(EX.a, Thing, a)
+        cut.put(EX.a, Other, b)
+        cut.put(EX.c, Thing, c)
+        cut.add([(EX.c, EX.p, EX.d)])
+        self.assertIs(c, cut.get(EX.c, Thing))
+        cut.remove([(EX.x, EX.p, EX.a)])
+        self.assertIsNone(cut.get(EX.a, Thing))
+        self.assertIsNone(cut.get(EX.a, Other))
+        self.assertIs(c, cut.get(EX.c, Thing))
+
+    def test_discard_all_classes(self):
+        cut = IdentityMap(strong_size=2)
+        a, b = Thing(), Other()
+        cut.put(EX.a, Thing, a)
+        cut.put(EX.a, Other, b)
+        cut.discard(EX.a)
+        self.assertIsNone(cut.get(EX.a, Thing))
+        self.assertIsNone(cut.get(EX.a, Other))
+        del a, b
+        gc.collect()
+        self.assertEqual(0, len(cut))
+
+    def test_replaced_object_collected(self):
+        cut = IdentityMap()
+        a, b = Thing(), Thing()
+        cut.put(EX.a, Thing, a)
+        cut.put(EX.a, Thing, b)
+        del a
+        gc.collect()
+        self.assertIs(b, cut.get(EX.a, Thing))
+
+    def test_clear(self):
+        cut = IdentityMap(strong_size=1)
+        cut.put(EX.a, Thing, Thing())
+        cut.clear()
+        self.assertIsNone(cut.get(EX.a, Thing))
@@ -0,0 +1,121 @@
+import unittest
+
+import rdflib
+from rdflib.term import Literal
+
+from yarom.graphObject import GraphObjectQuerier
+from yarom.literalIndex import LiteralIndex
+from yarom.rangedObjects import InRange
+
+from .base_test import CountingGraph, G, P
+
+EX = rdflib.Namespace('http://example.org/')
+
+
+class LiteralIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        g = rdflib.ConjunctiveGraph()
+        for i in range(10):
+            g.add((EX['thing' + str(i)], EX.size, Literal(i)))
+        g.add((EX.thing10, EX.size, Literal(2.5)))
+        g.add((EX.thing11, EX.size, Literal('big')))
+        g.add((EX.thing12, EX.size, EX.huge))
+        self.g = g
+        self.cut = LiteralIndex(g)
+
+    def subjects(self, *args):
+        return set(s for s, _ in self.cut.range(EX.size, *args))
+
+    def test_strict(self):
+        self.assertEqual(set([EX.thing3, EX.thing4, EX.thing10]),
+                         self.subjects(Literal(2), Literal(5)))
+
+    def test_numbers_across_datatypes(self):
+        self.assertEqual(set([EX.thing2, EX.thing10, EX.thing3]),
+                         self.subjects(Literal(1.5), Literal(4)))
+
+    def test_plain_values(self):
+        self.assertEqual(set([EX.thing8, EX.thing9]), self.subjects(7, None))
+
+    def test_other_kind(self):
+        self.assertEqual(set([EX.thing11]), self.subjects(Literal('a'), None))
+
+    def test_mismatched_bounds(self):
+        self.assertIsNone(self.cut.range(EX.size, Literal(1), Literal('z')))
+
+    def test_add_remove(self):
+        self.subjects(None, 0)
+        t = (EX.thing20, EX.size, Literal(-1))
+        self.g.add(t)
+        self.cut.add([t, t])
+        self.assertEqual(set([EX.thing20]), self.subjects(None, 0))
+        self.g.remove(t)
+        self.cut.remove([t])
+        self.assertEqual(set(), self.subjects(None, 0))
+
+    def test_remove_kept_in_other_context(self):
+        self.subjects(None, 0)
+        t = (EX.thing20, EX.size, Literal(-1))
+        self.g.get_context(EX.c1).add(t)
+        self.g.get_context(EX.c2).add(t)
+        self.cut.add([t])
+        self.g.get_context(EX.c1).remove(t)
+        self.cut.remove([t])
+        self.assertEqual(set([EX.thing20]), self.subjects(None, 0))
+
+    def test_buffered_changes(self):
+        self.subjects(None, 0)
+        added = [(EX['neg' + str(i)], EX.size, Literal(-i)) for i in range(1, 50)]
+        zero = (EX.thing0, EX.size, Literal(0))
+        for t in added:
+            self.g.add(t)
+        self.cut.add(added)
+        self.g.remove(added[0])
+        self.g.remove(zero)
+        self.cut.remove([added[0], zero])
+        self.g.add(zero)
+        self.cut.add([added[1], zero])
+        self.assertEqual([(EX.neg49, Literal(-49)), (EX.neg48, Literal(-48))],
+                         self.cut.range(EX.size, None, Literal(-47)))
+        self.assertEqual(set(t[0] for t in added[1:]) | set([EX.thing0]),
+                         self.subjects(None, Literal(0.5)))
+
+    def test_unindexed_predicate_ignored(self):
+        self.cut.add([(EX.thing0, EX.weight, Literal(1))])
+        self.g.add((EX.thing0, EX.weight, Literal(2)))
+        self.assertEqual([(EX.thing0, Literal(2))],
+                         self.cut.range(EX.weight, 1, None))
+
+
+class LiteralIndexQuerierTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(rdflib.ConjunctiveGraph())
+        for i in range(20):
+            s = EX['thing' + str(i)]
+            g.add((s, EX.kind, EX['kind' + str(i % 2)]))
+            g.add((s, EX.size, Literal(i)))
+        self.g = g
+        self.index = LiteralIndex(g)
+
+    def query(self, q):
+        expected = GraphObjectQuerier(q, self.g)()
+        self.index.range(EX.size, 0, None)
+        self.g.reset()
+        actual = GraphObjectQuerier(q, self.g, literal_index=self.index)()
+        self.assertEqual(expected, actual)
+        self.assertNotIn(('triples', (None, EX.size, None)), self.g.calls)
+        return actual
+
+    def test_range(self):
+        at = G()
+        P(at, InRange(Literal(3), Literal(7)), link=EX.size)
+        P(at, G(EX.kind0), link=EX.kind)
+        self.assertEqual(set([EX.thing4, EX.thing6]), self.query(at))
+
+    def test_range_only(self):
+        at = G()
+        P(at, InRange(Literal(16), None), link=EX.size)
+        self.assertEqual(set([EX.thing17, EX.thing18, EX.thing19]),
+                         self.query(at))
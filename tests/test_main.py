@@ -225,6 +225,491 @@ class DataObjectTest(_DataTest):
         with self.assertRaises(Exception):
             T()
 
+    def test_variable_made_on_first_use(self):
+        a = self.DataObject()
+        b = self.DataObject()
+        self.assertIsNone(a._id_variable)
+        self.assertIsInstance(a.variable(), R.Variable)
+        self.assertIs(a.variable(), a.variable())
+        self.assertNotEqual(a.variable(), b.variable())
+
+    def test_random_variable_naming(self):
+        self.config['dataObject.variable_naming'] = 'random'
+        v = self.DataObject().variable()
+        self.assertEqual(len('DataObject_') + 32, len(v))
+
+    def test_given_variable(self):
+        self.assertEqual(R.Variable('x'), self.DataObject(var='x').variable())
+
+    def test_properties_attached_on_access(self):
+        class T(self.DataObject):
+            datatypeProperties = ['a', 'b']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        t = T(key='x')
+        self.assertNotIn('a', t.__dict__)
+        a = t.a
+        self.assertIs(a, t.a)
+        self.assertNotIn('b', t.__dict__)
+        self.assertEqual(set(['a', 'b', 'rdf_type_property']),
+                         set(x.linkName for x in t.properties))
+
+    def test_redeclared_property_raises(self):
+        class T(self.DataObject):
+            datatypeProperties = ['name']
+        T.mapper.add_class(T)
+
+        class U(T):
+            datatypeProperties = ['name']
+        with self.assertRaises(Exception):
+            T.mapper.add_class(U)
+
+    def test_unaccessed_properties_triples(self):
+        class T(self.DataObject):
+            datatypeProperties = ['a', 'b']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        t = T(key='x', b=2)
+        trips = set(t.triples())
+        self.assertIn((t.identifier, R.RDF.type, T.rdf_type), trips)
+        self.assertIn((t.identifier, T.rdf_namespace['b'], R.Literal(2)), trips)
+
+    def test_load_limit_offset(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        for i in range(6):
+            t = T(key=str(i))
+            t.size(i)
+            t.save()
+        q = T()
+        q.size(3)
+        self.assertEqual(1, len(list(q.load(limit=5))))
+
+        everything = set(x.identifier for x in T().load())
+        self.assertEqual(6, len(everything))
+        page1 = [x.identifier for x in T().load(limit=4)]
+        page2 = [x.identifier for x in T().load(limit=4, offset=4)]
+        self.assertEqual(4, len(page1))
+        self.assertEqual(2, len(page2))
+        self.assertEqual(everything, set(page1) | set(page2))
+
+    def test_instances_collected_while_class_mapped(self):
+        import gc
+        import weakref
+
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        refs = []
+        for i in range(3):
+            t = T(key=str(i))
+            t.size(i)
+            list(t.triples())
+            refs.append(weakref.ref(t))
+        del t
+        gc.collect()
+        self.assertEqual([None, None, None], [r() for r in refs])
+
+    def test_type_object_owners_not_walked(self):
+        class T(self.DataObject):
+            pass
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        a = T(key='a')
+        b = T(key='b')
+        self.assertEqual([a.rdf_type_property, b.rdf_type_property],
+                         list(T.rdf_type_object.owner_properties))
+        self.assertNotIn(b.identifier, set(x[0] for x in a.triples()))
+
+    def test_clear_type_after_first_instance_collected(self):
+        import gc
+
+        class T(self.DataObject):
+            pass
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        a = T(key='a')
+        b = T(key='b')
+        self.assertIn(T.rdf_type_object, a.rdf_type_property.values)
+        self.assertIn(T.rdf_type_object, b.rdf_type_property.values)
+        del a
+        gc.collect()
+        b.rdf_type_property.clear()
+        self.assertEqual(0, len(b.rdf_type_property.values))
+
+    def _bulk_class(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size', 'name']
+            objectProperties = ['s']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        return T
+
+    def test_bulk_create_same_as_save(self):
+        T = self._bulk_class()
+        other = T(key='other')
+        rows = [dict(key='a', size=1, name='x', s=other),
+                dict(key='b', size=2, s=None),
+                dict(ident='http://example.org/c', name='z')]
+        bulk = set(T._bulk_triples(iter(rows)))
+        saved = set()
+        for row in rows:
+            row = dict((k, v) for k, v in row.items() if v is not None)
+            saved |= set(T(**row).get_defined_component())
+        self.assertEqual(saved, bulk)
+
+    def test_bulk_create_same_graph_as_save_with_inference(self):
+        T = self._bulk_class()
+        typed = R.URIRef('http://example.org/typed')
+
+        def infer(graph, new_data):
+            for s, p, o in list(new_data):
+                if p == R.RDF['type']:
+                    graph.add((s, typed, o))
+        other = T(key='other')
+        rows = [dict(key='a', size=1, name='x', s=other),
+                dict(key='b', size=2),
+                dict(ident='http://example.org/c', name='z')]
+        graph = self.config['rdf.graph']
+        self.config['rdf.inference'] = True
+        self.config['fuxi.infer_func'] = infer
+        try:
+            for row in rows:
+                T(**row).save()
+            saved = set(graph)
+            graph.remove((None, None, None))
+            T.bulk_create(rows, batchsize=2)
+            bulk = set(graph)
+        finally:
+            self.config['rdf.inference'] = False
+        self.assertIn((T(key='a').identifier, typed, T.rdf_type), saved)
+        self.assertEqual(saved, bulk)
+
+    def test_bulk_create_columns(self):
+        T = self._bulk_class()
+        self.assertEqual(3, T.bulk_create({'key': ['a', 'b', 'c'],
+                                           'size': [1, 2, 3]},
+                                          batchsize=2))
+        q = T()
+        q.size(2)
+        self.assertEqual([T(key='b').identifier],
+                         [x.identifier for x in q.load()])
+        self.assertEqual(3, len(list(T().load())))
+
+    def test_bulk_create_notifies_after_adding(self):
+        T = self._bulk_class()
+        graph = self.config['rdf.graph']
+        missing = []
+
+        class Listener(object):
+            def add(self, triples):
+                missing.extend(t for t in triples if t not in graph)
+
+            def remove(self, triples):
+                pass
+        self.config['rdf.closure_index'] = Listener()
+        try:
+            T.bulk_create({'key': ['a', 'b', 'c'], 'size': [1, 2, 3]},
+                          batchsize=2)
+        finally:
+            self.config['rdf.closure_index'] = False
+        self.assertEqual([], missing)
+
+    def test_bulk_create_rows(self):
+        T = self._bulk_class()
+        rows = (dict(key=str(i), size=i) for i in range(5))
+        self.assertEqual(5, T.bulk_create(rows))
+        self.assertEqual(5, len(list(T().load())))
+
+    def test_bulk_create_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise unittest.SkipTest('NumPy is not installed')
+        T = self._bulk_class()
+        data = np.array([('a', 1), ('b', 2)],
+                        dtype=[('key', 'U5'), ('size', 'i8')])
+        T.bulk_create(data)
+        q = T()
+        q.size(2)
+        self.assertEqual([T(key='b').identifier],
+                         [x.identifier for x in q.load()])
+
+    def test_bulk_create_identifier_augment(self):
+        class T(self.DataObject):
+            datatypeProperties = ['name']
+
+            def defined_augment(self):
+                return self.name.has_defined_value()
+
+            def identifier_augment(self):
+                return self.make_identifier_from_properties('name')
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        T.bulk_create({'name': ['x', 'y']})
+        t = T()
+        t.name('y')
+        self.assertEqual(set([T(name='x').identifier, t.identifier]),
+                         set(x.identifier for x in T().load()))
+
+    def test_bulk_create_unknown_column(self):
+        T = self._bulk_class()
+        with self.assertRaises(ValueError):
+            T.bulk_create([dict(key='a', colour='red')])
+
+    def test_bulk_create_no_identifier(self):
+        T = self._bulk_class()
+        with self.assertRaises(Exception):
+            T.bulk_create([dict(size=1)])
+
+    def _augmented_class(self):
+        class T(self.DataObject):
+            datatypeProperties = ['name']
+            objectProperties = ['part']
+            computed = 0
+
+            def defined_augment(self):
+                return self.name.has_defined_value()
+
+            def identifier_augment(self):
+                type(self).computed += 1
+                return self.make_identifier_from_properties('name', 'part')
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        return T
+
+    def test_computed_identifier_kept(self):
+        T = self._augmented_class()
+        t = T(name='a')
+        ident = t.identifier
+        self.assertEqual(ident, t.identifier)
+        self.assertEqual(1, T.computed)
+        set([t, t])
+        self.assertEqual(1, T.computed)
+
+    def test_computed_identifier_changes_with_property(self):
+        T = self._augmented_class()
+        t = T()
+        self.assertFalse(t.defined)
+        t.name('a')
+        self.assertTrue(t.defined)
+        a = t.identifier
+        t.name('b')
+        b = t.identifier
+        self.assertNotEqual(a, b)
+        t.name.unset('b')
+        self.assertEqual(a, t.identifier)
+        t.name.clear()
+        self.assertFalse(t.defined)
+
+    def test_computed_identifier_changes_with_value_identifier(self):
+        T = self._augmented_class()
+        part = T(name='p')
+        t = T(name='a', part=part)
+        a = t.identifier
+        part.name.clear()
+        part.name('q')
+        self.assertNotEqual(a, t.identifier)
+        part.setKey('r')
+        self.assertEqual(T(name='a', part=T(key='r')).identifier, t.identifier)
+
+    def test_get_for_defined_owner_skips_querier(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        t = T(key='a')
+        t.size(3)
+        t.save()
+
+        queried = []
+        r = T(key='a')
+        r.size._querier = lambda q: queried.append(q)
+        self.assertEqual(set([3]), set(r.size()))
+        self.assertEqual([], queried)
+
+    def test_get_for_undefined_owner_uses_querier(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size', 'name']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        t = T(key='a')
+        t.size(3)
+        t.name('n')
+        t.save()
+        T(key='b', size=4).save()
+
+        r = T()
+        r.name('n')
+        self.assertEqual(set([3]), set(r.size()))
+
+    def test_load_many(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        for i in range(6):
+            t = T(key=str(i))
+            t.size(i % 3)
+            t.save()
+        templates = []
+        for i in (0, 2, 7):
+            q = T()
+            q.size(i)
+            templates.append(q)
+        r = T.load_many(templates)
+        self.assertEqual(3, len(r))
+        for q, objects in zip(templates, r):
+            self.assertEqual(set(x.identifier for x in q.load()),
+                             set(x.identifier for x in objects))
+        self.assertEqual(2, len(r[0]))
+        self.assertEqual([], r[2])
+
+    def test_load_types_in_chunks(self):
+        class T(self.DataObject):
+            objectProperties = ['s']
+        T.mapper.add_class(T)
+
+        class U(T):
+            pass
+        T.mapper.add_class(U)
+        T.mapper.remap()
+        self.config['rdf.type_lookup_chunk_size'] = 2
+        t = T(key='t')
+        type(t.s).after_mapper_module_load(T.mapper)
+        for i in range(5):
+            t.s(U(key=str(i)) if i % 2 else T(key=str(i)))
+        t.save()
+        self.assertEqual(4, len(list(T().load())))
+        loaded = list(U().load())
+        self.assertEqual(2, len(loaded))
+        self.assertTrue(all(isinstance(x, U) for x in loaded))
+        values = list(T(key='t').s.get())
+        self.assertEqual(5, len(values))
+        self.assertEqual(set([U(key='1').identifier, U(key='3').identifier]),
+                         set(x.identifier for x in values if isinstance(x, U)))
+
+    def test_load_with_result_cache(self):
+        from yarom.queryResultCache import QueryResultCache
+
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        cache = QueryResultCache()
+        self.config['rdf.query_result_cache'] = cache
+        t = T(key='0')
+        t.size(1)
+        t.save()
+        q = T()
+        q.size(1)
+        self.assertEqual(1, len(list(q.load())))
+        self.assertEqual(1, len(list(q.load())))
+        self.assertEqual(1, cache.hits)
+        t = T(key='1')
+        t.size(1)
+        t.save()
+        self.assertEqual(2, len(list(q.load())))
+
+    def test_save_updates_literal_index(self):
+        from yarom.literalIndex import LiteralIndex
+
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        index = LiteralIndex(self.config['rdf.graph'])
+        self.config['rdf.literal_index'] = index
+        t = T(key='0')
+        t.size(1)
+        t.save()
+        size = t.size.link
+        self.assertEqual(1, len(index.range(size, 0, 3)))
+        t = T(key='1')
+        t.size(2)
+        t.save()
+        self.assertEqual(2, len(index.range(size, 0, 3)))
+        t.retract_statements([(t.identifier, size, R.Literal(2))])
+        self.assertEqual(1, len(index.range(size, 0, 3)))
+
+    def test_load_with_identity_map(self):
+        from yarom.identityMap import IdentityMap
+
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        im = IdentityMap()
+        self.config['mapper.identity_map'] = im
+        T.mapper.identity_map = im
+        try:
+            t = T(key='0')
+            t.size(1)
+            t.save()
+            first = list(T().load())
+            self.assertEqual(1, len(first))
+            self.assertIs(first[0], list(T().load())[0])
+            t.retract_statements([(t.identifier, t.size.link, R.Literal(1))])
+            self.assertIsNot(first[0], list(T().load())[0])
+        finally:
+            T.mapper.identity_map = None
+
+    def test_load_with_sparql_queries(self):
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        for i in range(4):
+            t = T(key=str(i))
+            t.size(i % 2)
+            t.save()
+        q = T()
+        q.size(1)
+        expected = set(x.identifier for x in q.load())
+        self.config['rdf.sparql_queries'] = True
+        try:
+            self.assertEqual(expected, set(x.identifier for x in q.load()))
+            self.assertEqual(1, len(list(q.load(limit=1))))
+        finally:
+            self.config['rdf.sparql_queries'] = False
+
+
+    def test_load_in_parallel(self):
+        from concurrent.futures import Future
+
+        class T(self.DataObject):
+            datatypeProperties = ['size']
+        T.mapper.add_class(T)
+        T.mapper.remap()
+        for i in range(4):
+            t = T(key=str(i))
+            t.size(i % 2)
+            t.save()
+        q = T()
+        q.size(1)
+        expected = set(x.identifier for x in q.load())
+
+        class Executor(object):
+            submitted = 0
+
+            def submit(self, fn, *args):
+                self.submitted += 1
+                f = Future()
+                f.set_result(fn(*args))
+                return f
+        ex = Executor()
+        self.assertEqual(expected, set(x.identifier for x in q.load(parallel=ex)))
+        self.assertEqual(2, ex.submitted)
+        self.config['rdf.parallel_queries'] = ex
+        try:
+            self.assertEqual(expected, set(x.identifier for x in q.load()))
+            self.assertEqual(4, ex.submitted)
+        finally:
+            self.config['rdf.parallel_queries'] = False
+
 
 class DataUserTest(_DataTest):
 
@@ -550,6 +1035,72 @@ class DataTest(unittest.TestCase):
             d['rdf.namespace_manager'],
             R.namespace.NamespaceManager)
 
+    def test_statistics_opt_in(self):
+        c = Configuration()
+        c['rdf.source'] = 'default'
+        c['rdf.store'] = 'default'
+        c['rdf.namespace'] = TEST_NS
+        Configureable.conf = c
+        d = Data()
+        d.openDatabase()
+        self.assertNotIn('rdf.graph_statistics', d)
+
+        c['rdf.collect_statistics'] = True
+        d = Data()
+        d.openDatabase()
+        self.assertIn('rdf.graph_statistics', d)
+
+    def test_identity_map_opt_in(self):
+        c = Configuration()
+        c['rdf.source'] = 'default'
+        c['rdf.store'] = 'default'
+        c['rdf.namespace'] = TEST_NS
+        Configureable.conf = c
+        d = Data()
+        d.openDatabase()
+        self.assertNotIn('mapper.identity_map', d)
+
+        c['mapper.use_identity_map'] = True
+        c['mapper.identity_map_size'] = 3
+        d = Data()
+        d.openDatabase()
+        self.assertEqual(3, d['mapper.identity_map'].strong_size)
+
+    def test_term_interner_cleared(self):
+        c = Configuration()
+        c['rdf.source'] = 'default'
+        c['rdf.store'] = 'default'
+        c['rdf.namespace'] = TEST_NS
+        Configureable.conf = c
+        d = Data()
+        d.openDatabase()
+        self.assertNotIn('rdf.term_interner', d)
+
+        c['rdf.intern_terms'] = True
+        d = Data()
+        d.openDatabase()
+        interner = d['rdf.term_interner']
+        interner.intern(R.URIRef('http://example.org/a'))
+        d.closeDatabase()
+        self.assertEqual(0, len(interner))
+
+    def test_query_executor_shut_down(self):
+        c = Configuration()
+        c['rdf.source'] = 'default'
+        c['rdf.store'] = 'default'
+        c['rdf.namespace'] = TEST_NS
+        c['rdf.parallel_queries'] = True
+        c['rdf.parallel_query_workers'] = 3
+        Configureable.conf = c
+        d = Data()
+        d.openDatabase()
+        ex = d['rdf.query_executor']
+        self.assertEqual(3, ex._max_workers)
+        d.closeDatabase()
+        self.assertFalse(d['rdf.query_executor'])
+        with self.assertRaises(RuntimeError):
+            ex.submit(int)
+
     def test_init_no_rdf_store(self):
         """ Should be able to init without these values """
         # XXX: If I don't provide some random config value here, this test doesn't work
@@ -711,6 +1262,27 @@ class SimplePropertyTest(_DataTest):
         bets.unset("l")
         self.assertEqual(len(bets.values), 0)
 
+    def test_unset_repeated_value(self):
+        bits = self.k().bits
+        o = self.k(key='roger')
+        bits.set(o)
+        bits.set(o)
+        self.assertEqual([o, o], bits.values)
+        bits.unset(o)
+        self.assertEqual([o], bits.values)
+
+    def test_equal_owner_properties_kept(self):
+        """ Properties of the same class compare equal, but each one that
+        refers to a value is among the value's owner_properties """
+        o = self.k(key='roger')
+        a = self.k()
+        b = self.k()
+        a.bits(o)
+        b.bits(o)
+        self.assertEqual([a.bits, b.bits], list(o.owner_properties))
+        a.bits.unset(o)
+        self.assertEqual([b.bits], list(o.owner_properties))
+
     def test_unset_empty(self):
         """ Attempting to unset a value that isn't set should raise an error """
         bits = self.k().bits
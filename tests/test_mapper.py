@@ -3,6 +3,7 @@ from yarom.configure import Configureable
 from yarom.data import Data
 from yarom.mapper import Mapper
 from yarom.mappedClass import MappedClass
+from yarom.identityMap import IdentityMap
 
 from .base_test import _DataTestB
 import rdflib
@@ -60,3 +61,52 @@ class MapperTest(_DataTestB):
         self.mapper.deregister_all()
         self.assertEqual(len(self.mapper.MappedClasses), 0,
                          msg="No mapped classes")
+
+    def test_oid_identity_map(self):
+        """ With an identity map, the same identifier and type give the same
+            object """
+        dc = MappedClass("TestDOM", (self.DataObject,), dict())
+        self.mapper.add_class(dc)
+        self.mapper.remap()
+        self.mapper.identity_map = IdentityMap()
+        ident = rdflib.URIRef('http://example.org/a')
+        o = self.mapper.oid(ident, dc.rdf_type)
+        self.assertIs(o, self.mapper.oid(ident, dc.rdf_type))
+        self.assertIsNot(o, self.mapper.oid(ident, self.DataObject.rdf_type))
+
+    def test_oid_no_identity_map(self):
+        dc = MappedClass("TestDOM", (self.DataObject,), dict())
+        self.mapper.add_class(dc)
+        self.mapper.remap()
+        ident = rdflib.URIRef('http://example.org/a')
+        self.assertIsNot(self.mapper.oid(ident, dc.rdf_type),
+                         self.mapper.oid(ident, dc.rdf_type))
+
+    def test_most_specific_rdf_type(self):
+        a = MappedClass("A", (self.DataObject,), dict())
+        self.mapper.add_class(a)
+        b = MappedClass("B", (a,), dict())
+        self.mapper.add_class(b)
+        types = [self.DataObject.rdf_type, b.rdf_type, a.rdf_type,
+                 rdflib.URIRef('http://example.org/unmapped')]
+        self.assertEqual(b.rdf_type, self.mapper.get_most_specific_rdf_type(types))
+        self.assertEqual(self.DataObject.rdf_type,
+                         self.mapper.get_most_specific_rdf_type([]))
+
+    def test_most_specific_rdf_type_cache_bounded(self):
+        a = MappedClass("A", (self.DataObject,), dict())
+        self.mapper.add_class(a)
+        self.mapper.most_specific_type_cache_size = 2
+        for t in ([a.rdf_type], [self.DataObject.rdf_type], [],
+                  [a.rdf_type, self.DataObject.rdf_type]):
+            self.mapper.get_most_specific_rdf_type(t)
+        self.assertEqual(2, len(self.mapper._most_specific_types))
+
+    def test_most_specific_rdf_type_after_add_class(self):
+        a = MappedClass("A", (self.DataObject,), dict())
+        self.mapper.add_class(a)
+        b = MappedClass("B", (a,), dict())
+        types = [a.rdf_type, b.rdf_type]
+        self.assertEqual(a.rdf_type, self.mapper.get_most_specific_rdf_type(types))
+        self.mapper.add_class(b)
+        self.assertEqual(b.rdf_type, self.mapper.get_most_specific_rdf_type(types))
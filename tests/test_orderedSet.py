@@ -0,0 +1,106 @@
+import gc
+import unittest
+
+from yarom.orderedSet import (OrderedSet, IdentityOrderedSet,
+                              IdentityOrderedBag, WeakIdentityOrderedSet)
+
+
+class Eq(object):
+
+    def __eq__(self, other):
+        return isinstance(other, Eq)
+
+    def __hash__(self):
+        return 0
+
+
+class OrderedSetTest(unittest.TestCase):
+
+    def test_insertion_order(self):
+        cut = OrderedSet([3, 1, 2, 1])
+        cut.append(0)
+        self.assertEqual([3, 1, 2, 0], list(cut))
+        self.assertEqual(4, len(cut))
+
+    def test_remove(self):
+        cut = OrderedSet([3, 1, 2])
+        cut.remove(1)
+        self.assertEqual([3, 2], list(cut))
+        self.assertNotIn(1, cut)
+        with self.assertRaises(ValueError):
+            cut.remove(1)
+
+    def test_equal_elements_collapse(self):
+        a, b = Eq(), Eq()
+        cut = OrderedSet([a, b])
+        self.assertEqual([a], list(cut))
+        self.assertIn(b, cut)
+
+    def test_empty_is_false(self):
+        self.assertFalse(OrderedSet())
+        self.assertTrue(OrderedSet([0]))
+
+
+class IdentityOrderedSetTest(unittest.TestCase):
+
+    def test_equal_elements_kept(self):
+        a, b = Eq(), Eq()
+        cut = IdentityOrderedSet([a, b, a])
+        self.assertEqual([a, b], list(cut))
+        cut.remove(b)
+        self.assertEqual([a], list(cut))
+        self.assertNotIn(b, cut)
+        self.assertIn(a, cut)
+
+
+class IdentityOrderedBagTest(unittest.TestCase):
+
+    def test_equal_elements_kept(self):
+        a, b = Eq(), Eq()
+        cut = IdentityOrderedBag([a, b])
+        self.assertEqual(2, len(cut))
+        cut.remove(b)
+        self.assertEqual([a], list(cut))
+        self.assertNotIn(b, cut)
+
+    def test_repeated_element(self):
+        a, b = Ref(), Ref()
+        cut = IdentityOrderedBag([a, b, a])
+        self.assertEqual([a, b, a], list(cut))
+        cut.remove(a)
+        self.assertEqual([b, a], list(cut))
+        self.assertIn(a, cut)
+        cut.remove(a)
+        self.assertNotIn(a, cut)
+        with self.assertRaises(ValueError):
+            cut.remove(a)
+
+    def test_unhashable(self):
+        x = []
+        cut = IdentityOrderedBag([x])
+        self.assertIn(x, cut)
+        self.assertNotIn([], cut)
+
+
+class Ref(object):
+    pass
+
+
+class WeakIdentityOrderedSetTest(unittest.TestCase):
+
+    def test_dropped_when_unreferenced(self):
+        a, b = Ref(), Ref()
+        cut = WeakIdentityOrderedSet([a, b])
+        self.assertEqual([a, b], list(cut))
+        del a
+        gc.collect()
+        self.assertEqual([b], list(cut))
+        self.assertEqual(1, len(cut))
+
+    def test_equal_elements_kept(self):
+        a, b = Eq(), Eq()
+        cut = WeakIdentityOrderedSet([a, b])
+        self.assertEqual([a, b], list(cut))
+        cut.remove(b)
+        self.assertNotIn(b, cut)
+        self.assertIn(a, cut)
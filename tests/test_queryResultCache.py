@@ -0,0 +1,108 @@
+import unittest
+
+from yarom.graphObject import GraphObjectQuerier
+from yarom.queryResultCache import GraphVersion, QueryResultCache
+
+from .base_test import CountingGraph, G, P
+from .test_graphObject import Graph
+
+
+class GraphVersionTest(unittest.TestCase):
+
+    def test_predicate_version(self):
+        v = GraphVersion()
+        v.bump(['a'])
+        v.bump(['b'])
+        self.assertEqual(1, v.predicate_version('a'))
+        self.assertEqual(2, v.predicate_version('b'))
+        self.assertEqual(0, v.predicate_version('c'))
+
+    def test_bump_all(self):
+        v = GraphVersion()
+        v.bump(['a'])
+        v.bump()
+        self.assertEqual(2, v.predicate_version('a'))
+        self.assertEqual(2, v.predicate_version('c'))
+
+
+class QueryResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.version = GraphVersion()
+        self.cut = QueryResultCache(max_terms=10)
+
+    def test_hit(self):
+        self.cut.put('k', frozenset([1, 2]), frozenset(['a']), 0)
+        self.assertEqual(frozenset([1, 2]), self.cut.get('k', self.version))
+        self.assertIsNone(self.cut.get('j', self.version))
+        self.assertEqual(0.5, self.cut.hit_rate)
+
+    def test_invalidated_by_predicate(self):
+        self.cut.put('k', frozenset([1]), frozenset(['a']), 0)
+        self.version.bump(['b'])
+        self.assertIsNotNone(self.cut.get('k', self.version))
+        self.version.bump(['a'])
+        self.assertIsNone(self.cut.get('k', self.version))
+        self.assertEqual(1, self.cut.invalidations)
+        self.assertEqual(0, len(self.cut))
+
+    def test_evicts_least_recently_used(self):
+        self.cut.put('a', frozenset(range(4)), frozenset(), 0)
+        self.cut.put('b', frozenset(range(4)), frozenset(), 0)
+        self.cut.get('a', self.version)
+        self.cut.put('c', frozenset(range(2)), frozenset(), 0)
+        self.assertIsNone(self.cut.get('b', self.version))
+        self.assertIsNotNone(self.cut.get('a', self.version))
+        self.assertEqual(1, self.cut.evictions)
+
+    def test_too_large(self):
+        self.cut.put('a', frozenset(range(10)), frozenset(), 0)
+        self.assertEqual(0, len(self.cut))
+
+
+class CachedQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(Graph())
+        P(G(3), G(1), g)
+        P(G(4), G(1), g)
+        self.g = g
+        self.version = GraphVersion()
+        self.cache = QueryResultCache()
+
+    def query(self, o):
+        at = G()
+        P(at, G(o))
+        return GraphObjectQuerier(at, self.g,
+                                  result_cache=self.cache,
+                                  graph_version=self.version)()
+
+    def test_cached(self):
+        self.assertEqual(set([3, 4]), self.query(1))
+        calls = self.g.count()
+        self.assertEqual(set([3, 4]), self.query(1))
+        self.assertEqual(calls, self.g.count())
+        self.assertEqual(1, self.cache.hits)
+
+    def test_results_mutable(self):
+        self.query(1).add(5)
+        res = self.query(1)
+        self.assertEqual(set([3, 4]), res)
+        res.add(5)
+
+    def test_different_constants(self):
+        self.query(1)
+        self.assertEqual(set(), self.query(2))
+        self.assertEqual(2, len(self.cache))
+
+    def test_invalidated(self):
+        self.query(1)
+        P(G(5), G(1), self.g)
+        self.version.bump(['other'])
+        self.assertEqual(set([3, 4]), self.query(1))
+        self.version.bump([P.link])
+        self.assertEqual(set([3, 4, 5]), self.query(1))
+
+    def test_requires_version(self):
+        with self.assertRaises(Exception):
+            GraphObjectQuerier(G(), self.g, result_cache=self.cache)
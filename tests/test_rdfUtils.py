@@ -1,11 +1,17 @@
 from itertools import cycle
+import random
 import unittest
 try:
     from unittest.mock import Mock
 except ImportError:
     from mock import Mock
 
-from yarom.rdfUtils import transitive_subjects
+import rdflib
+
+from yarom.rdfUtils import (transitive_subjects, transitive_lookup_many,
+                            rdf_types_many, UP, DOWN)
+
+EX = rdflib.Namespace('http://example.org/')
 
 
 class TransitiveLookupTest(unittest.TestCase):
@@ -30,3 +36,102 @@ class TransitiveLookupTest(unittest.TestCase):
         g = Mock()
         g.triples_choices.return_value = []
         self.assertEqual(set([]), transitive_subjects(g, None, 'predicate'))
+
+
+class TransitiveLookupManyTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(5)
+        self.g = rdflib.ConjunctiveGraph()
+        for _ in range(50):
+            self.g.add((EX[str(rand.randrange(25))], EX.p,
+                        EX[str(rand.randrange(25))]))
+        self.starts = [EX[str(i)] for i in range(25)]
+
+    def test_matches_lookup(self):
+        for direction in (UP, DOWN):
+            res = transitive_lookup_many(self.g, self.starts, EX.p,
+                                         direction=direction)
+            for start in self.starts:
+                self.assertEqual(transitive_subjects(self.g, start, EX.p,
+                                                     direction=direction),
+                                 res[start])
+
+    def test_shared_triples_choices(self):
+        g = Mock()
+        g.triples_choices.side_effect = [[(EX.a, EX.p, EX.c), (EX.b, EX.p, EX.c)],
+                                         [(EX.c, EX.p, EX.d)],
+                                         []]
+        res = transitive_lookup_many(g, [EX.a, EX.b], EX.p)
+        self.assertEqual(set([EX.a, EX.c, EX.d]), res[EX.a])
+        self.assertEqual(set([EX.b, EX.c, EX.d]), res[EX.b])
+        self.assertEqual(3, g.triples_choices.call_count)
+
+    def test_cycle_shares_closure(self):
+        g = rdflib.ConjunctiveGraph()
+        g.add((EX.a, EX.p, EX.b))
+        g.add((EX.b, EX.p, EX.a))
+        res = transitive_lookup_many(g, [EX.a, EX.b], EX.p)
+        self.assertIs(res[EX.a], res[EX.b])
+
+    def test_depths(self):
+        g = rdflib.ConjunctiveGraph()
+        for i in range(4):
+            g.add((EX[str(i)], EX.p, EX[str(i + 1)]))
+        res = transitive_lookup_many(g, [EX['0'], EX['3']], EX.p, depths=True)
+        self.assertEqual({EX['3']: 0, EX['4']: 1}, res[EX['3']])
+        self.assertEqual(4, res[EX['0']][EX['4']])
+
+    def test_max_depth(self):
+        g = rdflib.ConjunctiveGraph()
+        for i in range(4):
+            g.add((EX[str(i)], EX.p, EX[str(i + 1)]))
+        res = transitive_lookup_many(g, [EX['0'], EX['2']], EX.p, max_depth=1)
+        self.assertEqual(set([EX['0'], EX['1']]), res[EX['0']])
+        self.assertEqual(set([EX['2'], EX['3']]), res[EX['2']])
+        res = transitive_lookup_many(g, [EX['4']], EX.p, direction=UP,
+                                     max_depth=2)
+        self.assertEqual(set([EX['2'], EX['3'], EX['4']]), res[EX['4']])
+
+    def test_none_start(self):
+        g = Mock()
+        g.triples_choices.return_value = []
+        self.assertEqual({None: frozenset()},
+                         transitive_lookup_many(g, [None], EX.p))
+
+
+class RDFTypesManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.g = rdflib.ConjunctiveGraph()
+        for i in range(5):
+            self.g.add((EX[str(i)], rdflib.RDF.type, EX.A))
+        self.g.add((EX['0'], rdflib.RDF.type, EX.B))
+
+    def test_types(self):
+        idents = [EX['0'], EX['1'], EX.untyped, rdflib.Literal(1), EX['0']]
+        res = list(rdf_types_many(self.g, idents, chunk_size=2))
+        self.assertEqual(idents, [x[0] for x in res])
+        self.assertEqual(set([EX.A, EX.B]), res[0][1])
+        self.assertEqual(set([EX.A]), res[1][1])
+        self.assertEqual(set(), res[2][1])
+        self.assertEqual(set(), res[3][1])
+        self.assertEqual(set([EX.A, EX.B]), res[4][1])
+
+    def test_one_lookup_per_chunk(self):
+        g = Mock()
+        g.triples_choices.return_value = []
+        list(rdf_types_many(g, [EX[str(i)] for i in range(5)], chunk_size=2))
+        self.assertEqual(3, g.triples_choices.call_count)
+
+    def test_streams(self):
+        g = Mock()
+        g.triples_choices.return_value = []
+
+        def idents():
+            yield EX.a
+            yield EX.b
+            raise Exception('read past the first chunk')
+        res = rdf_types_many(g, idents(), chunk_size=2)
+        self.assertEqual(EX.a, next(res)[0])
+        self.assertEqual(EX.b, next(res)[0])
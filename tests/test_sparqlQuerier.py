@@ -0,0 +1,72 @@
+import unittest
+
+import rdflib
+from rdflib.term import URIRef, Literal
+
+from yarom.graphObject import GraphObjectQuerier
+from yarom.sparqlQuerier import SPARQLQuerier
+from yarom.rangedObjects import InRange
+
+from .base_test import CountingGraph, G, P
+
+EX = rdflib.Namespace('http://example.org/')
+
+
+class SPARQLQuerierTest(unittest.TestCase):
+
+    def setUp(self):
+        g = CountingGraph(rdflib.ConjunctiveGraph())
+        for i in range(20):
+            s = EX['thing' + str(i)]
+            g.add((s, EX.kind, EX['kind' + str(i % 2)]))
+            g.add((s, EX.size, Literal(i)))
+            g.add((s, EX.part, EX['part' + str(i % 3)]))
+        g.add((EX.part1, EX.colour, EX.red))
+        g.add((EX.owner, EX.owns, EX.thing4))
+        self.g = g
+
+    def both(self, q):
+        expected = GraphObjectQuerier(q, self.g)()
+        self.g.reset()
+        actual = SPARQLQuerier(q, self.g)()
+        self.assertEqual(1, self.g.count('query'))
+        self.assertEqual(expected, actual)
+        return actual
+
+    def test_star(self):
+        at = G()
+        P(at, G(EX.kind0), link=EX.kind)
+        P(at, G(EX.part1), link=EX.part)
+        self.assertEqual(set([EX.thing4, EX.thing10, EX.thing16]), self.both(at))
+
+    def test_subquery(self):
+        at = G()
+        part = G()
+        P(at, part, link=EX.part)
+        P(part, G(EX.red), link=EX.colour)
+        P(at, G(EX.kind1), link=EX.kind)
+        self.assertEqual(set([EX['thing' + str(i)] for i in (1, 7, 13, 19)]),
+                         self.both(at))
+
+    def test_inverse(self):
+        at = G()
+        P(G(EX.owner), at, link=EX.owns)
+        self.assertEqual(set([EX.thing4]), self.both(at))
+
+    def test_range(self):
+        at = G()
+        P(at, InRange(Literal(3), Literal(7)), link=EX.size)
+        P(at, G(EX.kind0), link=EX.kind)
+        self.assertEqual(set([EX.thing4, EX.thing6]), self.both(at))
+
+    def test_limit(self):
+        at = G()
+        P(at, G(EX.kind0), link=EX.kind)
+        r = list(SPARQLQuerier(at, self.g).stream(limit=3, offset=2))
+        self.assertEqual(3, len(r))
+        self.assertIn('LIMIT 3', SPARQLQuerier(at, self.g).sparql(3, 2))
+
+    def test_defined(self):
+        at = G(EX.thing4)
+        P(at, G(EX.kind0), link=EX.kind)
+        self.assertEqual(set([EX.thing4]), SPARQLQuerier(at, self.g)())
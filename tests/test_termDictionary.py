@@ -0,0 +1,149 @@
+import unittest
+
+import rdflib
+from rdflib.term import URIRef
+
+from yarom.graphObject import GraphObjectQuerier, InterningTQLayer
+
+from .base_test import G, P
+from .test_graphObject import Graph
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+@unittest.skipIf(not HAS_NUMPY, "NumPy is not installed")
+class TermDictionaryTest(unittest.TestCase):
+
+    def setUp(self):
+        from yarom.termDictionary import TermDictionary
+        self.d = TermDictionary()
+
+    def test_dense_ids(self):
+        self.assertEqual(0, self.d.id('a'))
+        self.assertEqual(1, self.d.id('b'))
+        self.assertEqual(0, self.d.id('a'))
+        self.assertEqual('b', self.d.term(1))
+        self.assertEqual(2, len(self.d))
+
+    def test_encode_dedupes(self):
+        s = self.d.encode(['c', 'a', 'c', 'b'])
+        self.assertEqual(3, len(s))
+        self.assertEqual(set(['a', 'b', 'c']), set(s))
+
+    def test_contains(self):
+        s = self.d.encode(['a', 'b'])
+        self.d.id('c')
+        self.assertIn('a', s)
+        self.assertNotIn('c', s)
+        self.assertNotIn('z', s)
+
+    def test_intersection_update(self):
+        s = self.d.encode(['a', 'b', 'c', 'd'])
+        s.intersection_update(self.d.encode(['b', 'c', 'e']),
+                              self.d.encode(['c', 'b', 'a']))
+        self.assertEqual(set(['b', 'c']), set(s))
+
+    def test_intersection_update_with_plain_set(self):
+        s = self.d.encode(['a', 'b', 'c'])
+        s.intersection_update(set(['c', 'a', 'q']))
+        self.assertEqual(set(['a', 'c']), set(s))
+
+
+@unittest.skipIf(not HAS_NUMPY, "NumPy is not installed")
+class EncodedQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        g = Graph()
+        for i in range(40):
+            P(G(i), G(100 + i % 3), g)
+            P(G(i), G(200 + i % 4), g)
+            P(G(i), G(300 + i % 2), g)
+        P(G(300), G(400), g)
+        self.g = g
+        at = G()
+        mid = G()
+        P(at, G(101))
+        P(at, G(202))
+        P(at, mid)
+        P(mid, G(400))
+        self.at = at
+
+    def test_same_results(self):
+        expected = GraphObjectQuerier(self.at, self.g)()
+        r = GraphObjectQuerier(self.at, self.g, term_dictionary=True)()
+        self.assertEqual(set([10, 22, 34]), expected)
+        self.assertEqual(expected, r)
+        self.assertIsInstance(r, set)
+
+    def test_shared_dictionary(self):
+        from yarom.termDictionary import TermDictionary
+        d = TermDictionary()
+        GraphObjectQuerier(self.at, self.g, term_dictionary=d)()
+        n = len(d)
+        self.assertGreater(n, 0)
+        r = GraphObjectQuerier(self.at, self.g, term_dictionary=d)()
+        self.assertEqual(n, len(d))
+        self.assertEqual(set([10, 22, 34]), r)
+
+    def test_stream(self):
+        r = list(GraphObjectQuerier(self.at, self.g, term_dictionary=True).stream())
+        self.assertEqual(set([10, 22, 34]), set(r))
+
+
+class TermInternerTest(unittest.TestCase):
+
+    def setUp(self):
+        from yarom.termDictionary import TermInterner
+        self.cut = TermInterner()
+
+    def test_canonical(self):
+        a = URIRef('http://example.org/' + 'a')
+        b = URIRef('http://example.org/' + 'a')
+        self.assertIsNot(a, b)
+        self.assertIs(a, self.cut.intern(a))
+        self.assertIs(a, self.cut.intern(b))
+        self.assertEqual(0, self.cut.get_id(b))
+
+    def test_stats(self):
+        self.cut.intern('a')
+        self.cut.intern('a')
+        self.cut.intern('b')
+        stats = self.cut.stats()
+        self.assertEqual(2, stats['terms'])
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertGreater(stats['memory_size'], 0)
+
+    def test_clear(self):
+        self.cut.intern('a')
+        self.cut.clear()
+        self.assertEqual(0, len(self.cut))
+        self.assertIsNone(self.cut.get_id('a'))
+        self.assertEqual(0, self.cut.stats()['misses'])
+
+
+class InterningTQLayerTest(unittest.TestCase):
+
+    def test_interned_results(self):
+        from yarom.termDictionary import TermInterner
+        interner = TermInterner()
+        g = rdflib.ConjunctiveGraph()
+        ex = rdflib.Namespace('http://example.org/')
+        for i in range(3):
+            g.add((ex['s' + str(i)], ex.p, ex.o))
+        objects = [t[2] for t in InterningTQLayer(g, interner).triples((None, ex.p, None))]
+        self.assertEqual(3, len(objects))
+        self.assertTrue(all(o is objects[0] for o in objects))
+
+    def test_query_same_results(self):
+        g = Graph()
+        P(G(3), G(1), g)
+        P(G(4), G(1), g)
+        at = G()
+        P(at, G(1))
+        self.assertEqual(set([3, 4]),
+                         GraphObjectQuerier(at, g, intern_terms=True)())
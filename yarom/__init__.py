@@ -116,6 +116,17 @@ def loadData(data, dataFormat):
         g = config('rdf.graph')
         for x in data.quads((None, None, None, None)):
             g.add(x)
+    stats = config().get('rdf.graph_statistics', False)
+    if stats:
+        stats.note_modified()
+    version = config().get('rdf.graph_version', False)
+    if version:
+        version.bump()
+    for key in ('rdf.literal_index', 'rdf.closure_index',
+                'mapper.identity_map'):
+        index = config().get(key, False)
+        if index is not False:
+            index.clear()
 
 
 def connect(conf=False,
@@ -171,6 +182,10 @@ def connect(conf=False,
 
     atexit.register(disconnect)
 
+    im = dbconn.get('mapper.identity_map', False)
+    if im is not False:
+        MAPPER.identity_map = im
+
     for mod in modulesToLoad:
         MAPPER.load_module(mod)
 
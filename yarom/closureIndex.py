@@ -0,0 +1,190 @@
+import logging
+
+from .rdfUtils import UP, DOWN
+
+L = logging.getLogger(__name__)
+
+__all__ = ["ClosureIndex"]
+
+
+class ClosureIndex(object):
+
+    """ A reachability index over the statements with a predicate, used in
+    place of repeated breadth-first searches for transitive lookups.
+
+    The edges for a predicate are read from the graph the first time a
+    closure for that predicate is asked for. Closures are computed from the
+    edges as needed and kept, so each node's closure is only computed once,
+    and reuses the closures already computed for the nodes it reaches.
+
+    After the edges for a predicate are read, the index must be kept current
+    with :meth:`add` and :meth:`remove`, or dropped with :meth:`clear`. Within
+    yarom, this is done by :class:`~yarom.dataUser.DataUser` and
+    :func:`yarom.loadData`. An added statement extends the closures which
+    reach its subject (or object, going `UP`); a removed statement discards
+    only the closures which pass through it.
+    """
+
+    def __init__(self, graph, predicates=None):
+        """
+        Parameters
+        ----------
+        graph : rdflib.graph.Graph
+            The graph to index. Must implement ``triples`` and ``__contains__``
+        predicates : iterable of rdflib.term.URIRef
+            The predicates to index. If `None`, then any predicate asked for
+            is indexed. Optional
+        """
+        self.graph = graph
+        self.predicates = None if predicates is None else frozenset(predicates)
+        self._edges = dict()
+        self._closures = dict()
+        # Maps each node to the nodes whose kept closures contain it
+        self._members = dict()
+
+    def indexes(self, predicate):
+        """ Returns whether closures over `predicate` are answered by the
+        index """
+        return self.predicates is None or predicate in self.predicates
+
+    def closure(self, start, predicate, direction=DOWN):
+        """ Returns the resources which relate to `start` through zero or more
+        `predicate` relationships, including `start`.
+
+        This is the same as :func:`yarom.rdfUtils.transitive_lookup` over the
+        whole graph.
+
+        Parameters
+        ----------
+        start : rdflib.term.Identifier
+            The resource to start from
+        predicate : rdflib.term.URIRef
+            The predicate relating terms in the closure
+        direction : DOWN or UP
+            The direction in which to traverse
+
+        Returns
+        -------
+        frozenset of rdflib.term.Identifier
+            The closure, or `None` if `predicate` isn't indexed
+        """
+        if not self.indexes(predicate):
+            return None
+        key = (predicate, direction)
+        edges = self._predicate_edges(predicate)[direction]
+        closures = self._closures[key]
+        res = closures.get(start)
+        if res is None:
+            res = _compute_closure(start, edges, closures)
+            self._keep_closure(key, start, res)
+        return res
+
+    def _keep_closure(self, key, start, closure):
+        closures = self._closures[key]
+        old = closures.get(start)
+        closures[start] = closure
+        members = self._members[key]
+        for m in (closure if old is None else closure - old):
+            members.setdefault(m, set()).add(start)
+
+    def _drop_closure(self, key, start):
+        members = self._members[key]
+        for m in self._closures[key].pop(start):
+            starts = members[m]
+            starts.discard(start)
+            if not starts:
+                del members[m]
+
+    def _predicate_edges(self, predicate):
+        res = self._edges.get(predicate)
+        if res is None:
+            res = {DOWN: dict(), UP: dict()}
+            count = 0
+            for t in self.graph.triples((None, predicate, None)):
+                if isinstance(t[0], tuple):
+                    t = t[0]
+                res[DOWN].setdefault(t[0], set()).add(t[2])
+                res[UP].setdefault(t[2], set()).add(t[0])
+                count += 1
+            self._edges[predicate] = res
+            for direction in (DOWN, UP):
+                self._closures[(predicate, direction)] = dict()
+                self._members[(predicate, direction)] = dict()
+            L.debug('Indexed %s edges for %s', count, predicate)
+        return res
+
+    def add(self, triples):
+        """ Adds statements to the index for predicates which have been
+        indexed """
+        for s, p, o in triples:
+            edges = self._edges.get(p)
+            if edges is None or o in edges[DOWN].get(s, ()):
+                continue
+            self._add_edge(p, DOWN, s, o)
+            self._add_edge(p, UP, o, s)
+
+    def _add_edge(self, predicate, direction, a, b):
+        key = (predicate, direction)
+        edges = self._edges[predicate][direction]
+        closures = self._closures[key]
+        edges.setdefault(a, set()).add(b)
+        stale = self._members[key].get(a)
+        if not stale:
+            return
+        stale = list(stale)
+        # Any closure containing `a` now also reaches everything `b` does.
+        # Computing `b`'s closure through the stale closures is still correct
+        # since the only reachability they lack is through `b` itself
+        extra = _compute_closure(b, edges, closures)
+        self._keep_closure(key, b, extra)
+        for n in stale:
+            self._keep_closure(key, n, closures[n] | extra)
+
+    def remove(self, triples):
+        """ Removes statements from the index """
+        for s, p, o in triples:
+            edges = self._edges.get(p)
+            if edges is None or o not in edges[DOWN].get(s, ()):
+                continue
+            if (s, p, o) in self.graph:
+                # Still present, for instance, in another context
+                continue
+            self._remove_edge(p, DOWN, s, o)
+            self._remove_edge(p, UP, o, s)
+
+    def _remove_edge(self, predicate, direction, a, b):
+        key = (predicate, direction)
+        edges = self._edges[predicate][direction]
+        targets = edges[a]
+        targets.discard(b)
+        if not targets:
+            del edges[a]
+        for n in list(self._members[key].get(a, ())):
+            self._drop_closure(key, n)
+
+    def clear(self):
+        """ Drops the index for all predicates. They will be rebuilt as
+        needed """
+        self._edges.clear()
+        self._closures.clear()
+        self._members.clear()
+
+    def __repr__(self):
+        return 'ClosureIndex(' + repr(self.graph) + ')'
+
+
+def _compute_closure(start, edges, closures):
+    res = set([start])
+    border = [start]
+    while border:
+        n = border.pop()
+        for m in edges.get(n, ()):
+            if m in res:
+                continue
+            known = closures.get(m)
+            if known is None:
+                res.add(m)
+                border.append(m)
+            else:
+                res |= known
+    return frozenset(res)
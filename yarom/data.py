@@ -10,6 +10,13 @@ import datetime
 import os
 import logging
 from .configure import Configureable, Configuration, ConfigValue
+from .queryResultCache import GraphVersion, QueryResultCache
+from .literalIndex import LiteralIndex
+from .closureIndex import ClosureIndex
+from .graphStatistics import GraphStatistics
+from .identityMap import IdentityMap
+from .termDictionary import TermInterner
+from .graphObject import QueryPlanCache, close_worker_graphs
 
 __all__ = [
     "Data",
@@ -72,6 +79,35 @@ class Data(Configuration, Configureable):
 
         nm.bind("dt", self.dt_ns)
         nm.bind("", self['rdf.namespace'])
+        if self.get('rdf.collect_statistics', False):
+            self['rdf.graph_statistics'] = GraphStatistics(self['rdf.graph'])
+        self['rdf.query_plan_cache'] = QueryPlanCache(
+            self.get('rdf.query_plan_cache_size', 256))
+        self['rdf.graph_version'] = GraphVersion()
+        if self.get('rdf.index_literals', False):
+            self['rdf.literal_index'] = LiteralIndex(self['rdf.graph'])
+        closures = self.get('rdf.index_closures', False)
+        if closures:
+            predicates = None
+            if closures is not True:
+                predicates = [rdflib.URIRef(p) for p in closures]
+            self['rdf.closure_index'] = ClosureIndex(self['rdf.graph'], predicates)
+        result_cache_size = self.get('rdf.query_result_cache_size', False)
+        if result_cache_size:
+            self['rdf.query_result_cache'] = QueryResultCache(result_cache_size)
+        if self.get('mapper.use_identity_map', False):
+            self['mapper.identity_map'] = IdentityMap(
+                self.get('mapper.identity_map_size', 0))
+        if self.get('rdf.intern_terms', False):
+            self['rdf.term_interner'] = TermInterner()
+        if self.get('rdf.parallel_queries', False) is True:
+            try:
+                from concurrent.futures import ThreadPoolExecutor
+            except ImportError:
+                raise Exception("rdf.parallel_queries requires the 'futures'"
+                                " package on this version of Python")
+            self['rdf.query_executor'] = ThreadPoolExecutor(
+                self.get('rdf.parallel_query_workers', 8))
 
         # TODO: Extract classes recorded in the graph
         #       First, look at the :pythonClass attribute attached to the RDF class resource.
@@ -93,6 +129,14 @@ class Data(Configuration, Configureable):
 
     def closeDatabase(self):
         """ Close a the configured database """
+        executor = self.get('rdf.query_executor', False)
+        if executor:
+            executor.shutdown()
+            self['rdf.query_executor'] = False
+        close_worker_graphs()
+        interner = self.get('rdf.term_interner', False)
+        if interner is not False:
+            interner.clear()
         self.source.close()
 
     def _init_rdf_graph(self):
@@ -298,10 +342,15 @@ class SPARQLSource(RDFSource):
         Configure like::
 
             "rdf.source" = "sparql_endpoint"
+
+        Queries for objects are sent to the endpoint as a single SPARQL query
+        unless ``"rdf.sparql_queries"`` is set to `false`.
     """
     name = 'sparql_endpoint'
 
     def open(self):
+        if 'rdf.sparql_queries' not in self.conf:
+            self.conf['rdf.sparql_queries'] = True
         # XXX: If we have a source that's read only, should we need to set the
         # store separately??
         g0 = ConjunctiveGraph('SPARQLUpdateStore')
@@ -3,16 +3,20 @@ import logging
 import hashlib
 import six
 import random
+import itertools
+import weakref
 
 from yarom import yarom_import
-from .mappedClass import MappedClass
+from .mappedClass import MappedClass, PropertyAttribute
 from .mappedProperty import MappedPropertyClass
 from .dataUser import DataUser
 from .configure import BadConf
 from .rdfUtils import triples_to_bgp
+from .orderedSet import WeakIdentityOrderedSet
+from .propertyMixins import ObjectPropertyMixin, UnionPropertyMixin
 from .graphObject import (
     GraphObject,
-    GraphObjectQuerier,
+    BatchGraphObjectQuerier,
     ComponentTripler,
     HeroTripler,
     ReferenceTripler,
@@ -48,6 +52,27 @@ def get_hash_function(method_name):
         return (lambda data: hashlib.new(method_name, data))
 
 
+_NOT_FOUND = object()
+
+_variable_counter = itertools.count()
+
+
+class _RDFTypePropertyAttribute(PropertyAttribute):
+
+    """ Attaches the rdf:type property for a DataObject, with the value for
+    the object's type, when it's first accessed """
+
+    def __init__(self):
+        super(_RDFTypePropertyAttribute, self).__init__(None)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        p = obj.attachProperty(RDFTypeProperty)
+        p.set(obj._rdf_type_value())
+        return p
+
+
 class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
 
     """
@@ -61,13 +86,23 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
         The rdflib namespace (prefix for URIs) for objects from this class
     properties : list of Property
         Properties belonging to this object
-    owner_properties : list of Property
+    owner_properties : yarom.orderedSet.IdentityOrderedSet of Property
         Properties belonging to parents of this object
     """
 
     _openSet = set()
     _closedSet = set()
 
+    _id_variable = None
+
+    # Results of defined_augment and identifier_augment, kept until a value
+    # they may have been computed from changes. See _identifier_changed
+    _defined_cache = None
+    _identifier_cache = None
+    _identifier_dependents = None
+
+    rdf_type_property = _RDFTypePropertyAttribute()
+
     configuration_variables = {
         "rdf.namespace": {
             "description": "Namespaces for DataObject sub-classes will, by "
@@ -81,6 +116,13 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
             "type": "sha224, md5, or one of the types accepted by"
             "hashlib.new()",
             "directly_configureable": True},
+        "dataObject.variable_naming": {
+            "description": "How query variables are named for objects "
+            "without an identifier. 'counter' numbers them in the order "
+            "they're needed. 'random' names them with a hash of random "
+            "numbers. Defaults to 'counter'.",
+            "type": "counter or random",
+            "directly_configureable": True},
     }
     base_namespace = R.Namespace("http://openworm.org/entities/")
 
@@ -143,52 +185,79 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
             self.setKey(key)
         elif generate_key:
             self.setKey(random.random())
-        else:
-            # Randomly generate an identifier if the derived class can't
-            # come up with one from the start. Ensures we always have something
-            # that functions as an identifier
-            v = (random.random(), random.random())
-            cname = self.__class__.__name__
-            self._id_variable = R.Variable(cname + "_" + hashlib.md5(
-                str(v).encode()).hexdigest())
-
-        for x in self.__class__.dataObjectProperties:
+        # Otherwise, a variable is made when one is first needed. See
+        # :meth:`variable`
+
+        # Declared properties are attached when they're first accessed (see
+        # PropertyAttribute) except where their names are taken by some
+        # other attribute
+        self._properties_pending = True
+        for x in self.__class__._eagerly_attached_properties():
             self.attachProperty(x)
 
-        existing_property_names = [x.linkName for x in self.properties]
         for propName in kwargs.keys():
-            if propName not in existing_property_names:
+            if self._property_named(propName) is None:
                 raise ValueError(
                     "No such argument {} to {}::__init__".format(
                         propName,
                         self.__class__.__name__))
 
-        for x in self.properties:
-            if x.linkName in kwargs:
-                self.relate(x.linkName, kwargs[x.linkName])
+        for propName in kwargs.keys():
+            self.relate(propName, kwargs[propName])
+
+    @property
+    def properties(self):
+        """ Properties belonging to this object. Any declared properties which
+        haven't been accessed yet are attached first """
+        if self._properties_pending:
+            self._properties_pending = False
+            attached = self.__dict__
+            for x in self.__class__.dataObjectProperties:
+                if x.linkName not in attached:
+                    getattr(self, x.linkName)
+            self.rdf_type_property
+        return self._properties
+
+    @properties.setter
+    def properties(self, value):
+        self._properties = value
 
+    @classmethod
+    def _eagerly_attached_properties(cls):
+        """ Returns the declared properties which don't have a
+        PropertyAttribute on the class and must be attached when an object is
+        created """
+        props = cls.dataObjectProperties
+        cached = cls.__dict__.get('_eager_properties')
+        if cached is None or cached[0] != len(props):
+            eager = tuple(x for x in props
+                          if getattr(getattr(cls, x.linkName, None), 'prop', None) is not x)
+            cached = (len(props), eager)
+            cls._eager_properties = cached
+        return cached[1]
+
+    def _property_named(self, linkName):
+        """ Returns the property attached or declared with the given name or
+        `None` if there isn't one """
+        for x in self._properties:
+            if x.linkName == linkName:
+                return x
+        if isinstance(getattr(type(self), linkName, None), PropertyAttribute):
+            return getattr(self, linkName)
+        return None
+
+    def _rdf_type_value(self):
+        """ Returns the object for the value of this object's rdf:type """
         if isinstance(self, PropertyDataObject):
-            self.relate(
-                'rdf_type_property',
-                RDFProperty.getInstance(),
-                RDFTypeProperty)
+            return RDFProperty.getInstance()
         elif isinstance(self, TypeDataObject):
-            self.relate(
-                'rdf_type_property',
-                RDFSClass.getInstance(),
-                RDFTypeProperty)
+            return RDFSClass.getInstance()
         elif isinstance(self, RDFProperty):
-            self.relate(
-                'rdf_type_property',
-                RDFSClass.getInstance(),
-                RDFTypeProperty)
+            return RDFSClass.getInstance()
         elif isinstance(self, RDFSClass):
-            self.relate('rdf_type_property', self, RDFTypeProperty)
+            return self
         else:
-            self.relate(
-                'rdf_type_property',
-                self.rdf_type_object,
-                RDFTypeProperty)
+            return self.rdf_type_object
 
     @classmethod
     def identifier_hash_method(self, o):
@@ -233,46 +302,86 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
         #       recursion.
         if self._id:
             return True
-        else:
-            return self.defined_augment()
+        res = self._defined_cache
+        if res is None:
+            res = self.defined_augment()
+            self._defined_cache = res
+            self._watch_identifier_inputs()
+        return res
 
     def defined_augment(self):
         """ This fuction must return False if :meth:`identifier_augment` would
         raise an :exc:`~yarom.graphObject.IdentifierMissingException`. Override
         it when defining a non-standard identifier for subclasses of DataObjects.
+
+        The result is kept until a property value of this object changes, so
+        it should depend only on those values.
         """
         return False
 
-    def variable(self):
-        """ Returns the variable to be usedin queries with this DataObject
-
-        Raises
-        ------
+    def _watch_identifier_inputs(self):
+        """ Arranges for the computed identifier of this object to be
+        forgotten when the identifier of one of its property values changes
+        """
+        for p in self._properties:
+            if isinstance(p, RDFTypeProperty):
+                continue
+            for v in getattr(p, 'values', ()):
+                if isinstance(v, DataObject):
+                    deps = v._identifier_dependents
+                    if deps is None:
+                        deps = weakref.WeakValueDictionary()
+                        v._identifier_dependents = deps
+                    deps[id(self)] = self
+
+    def _identifier_changed(self):
+        """ Forgets the results of :meth:`defined_augment` and
+        :meth:`identifier_augment` for this object and for objects whose
+        identifiers may have been computed from this one's. Called when a
+        property value of this object changes """
+        if self._defined_cache is not None:
+            self._defined_cache = None
+        if self._identifier_cache is not None:
+            self._identifier_cache = None
+        deps = self._identifier_dependents
+        if deps is not None:
+            self._identifier_dependents = None
+            for d in list(deps.values()):
+                d._identifier_changed()
 
-        IdentifierMissingException
+    def variable(self):
+        """ Returns the variable to be used in queries with this DataObject
 
+        Unless one was given when the object was created, the variable is made
+        the first time it's asked for. Its name is made according to the
+        ``dataObject.variable_naming`` configuration.
         """
-        if self._id_variable is not None:
-            return self._id_variable
-        else:
-            raise IdentifierMissingException(self)
+        if self._id_variable is None:
+            cname = self.__class__.__name__
+            if self.conf.get('dataObject.variable_naming', 'counter') == 'random':
+                v = (random.random(), random.random())
+                name = cname + "_" + hashlib.md5(str(v).encode()).hexdigest()
+            else:
+                name = cname + "_" + str(next(_variable_counter))
+            self._id_variable = R.Variable(name)
+        return self._id_variable
 
     def setKey(self, key):
         if isinstance(key, str):
             self._id = self.make_identifier_direct(key)
         else:
             self._id = self.make_identifier(key)
+        self._identifier_changed()
 
     def relate(self, linkName, other, prop=False):
-        existing_property_names = [x.linkName for x in self.properties]
-        if linkName in existing_property_names:
-            if prop and not isinstance(getattr(self, linkName), prop):
+        p = self._property_named(linkName)
+        if p is not None:
+            if prop and not isinstance(p, prop):
                 L.warning(
                     "A property class, {}, was provided to relate, but it"
                     " will be ignored since there's already a property, {},"
                     " with the given linkName '{}' and it has a different"
-                    " class".format(prop, getattr(self, linkName), linkName))
-            p = getattr(self, linkName)
+                    " class".format(prop, p, linkName))
         else:
             if not prop:
                 # Make up a property class
@@ -297,14 +406,15 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
         if not hasattr(prop, 'linkName'):
             raise Exception("The given property class cannot be attached"
                             " because it has no `linkName` attribute")
-        p = prop(resolver=self.mapper.resolver, owner=self)
-
-        if hasattr(self, prop.linkName):
+        attr = getattr(type(self), prop.linkName, _NOT_FOUND)
+        if (prop.linkName in self.__dict__ or
+                not (attr is _NOT_FOUND or isinstance(attr, PropertyAttribute))):
             raise Exception(
                 "Cannot attach property '{}'. A property must have a different \
                         name from any attributes in DataObject".format(
                     prop.linkName))
-        self.properties.append(p)
+        p = prop(resolver=self.mapper.resolver, owner=self)
+        self._properties.append(p)
         setattr(self, p.linkName, p)
         return p
 
@@ -388,14 +498,20 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
         """
         if self._id:
             return self._id
-        else:
-            return self.identifier_augment()
+        res = self._identifier_cache
+        if res is None:
+            res = self.identifier_augment()
+            self._identifier_cache = res
+            self._watch_identifier_inputs()
+        return res
 
     def identifier_augment(self):
         """ Override this method to define an identifier in lieu of one explicity set.
 
         One must also override :meth:`defined_augment` to return True whenever
-        this method could return a valid identifier.
+        this method could return a valid identifier. The identifier is kept
+        until a property value of this object, or the identifier of one of
+        those values, changes.
         :exc:`~yarom.graphObject.IdentifierMissingException` should be
         raised if an identifier cannot be generated by this method.
 
@@ -439,13 +555,98 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
             self.get_defined_component(),
             namespace_manager=nm)
 
-    def load(self):
-        for ident in GraphObjectQuerier(self, self.rdf)():
-            types = set()
-            for rdf_type in self.rdf.objects(ident, R.RDF['type']):
-                types.add(rdf_type)
+    def load(self, limit=None, offset=None, parallel=None):
+        """ Loads objects like this one from the graph.
+
+        Parameters
+        ----------
+        limit : int
+            The maximum number of objects to load. Optional
+        offset : int
+            The number of matching objects to skip before loading. Optional
+        parallel : bool or concurrent.futures.Executor
+            Whether to evaluate the branches of the query concurrently, as for
+            :class:`~yarom.graphObject.GraphObjectQuerier`. Defaults to the
+            ``rdf.parallel_queries`` configuration value. Optional
+
+        If `limit` or `offset` is given, the query results are streamed from
+        the graph (see :meth:`~yarom.graphObject.GraphObjectQuerier.stream`)
+        so that triples stop being read once `limit` objects have been
+        loaded. In that case, the graph should not be modified until the
+        iteration is finished. The order of results is not defined, so
+        paging through results with `offset` is only meaningful over an
+        unchanging graph.
+
+        The rdf:types of the loaded objects are looked up together for
+        ``rdf.type_lookup_chunk_size`` identifiers at a time, so each object
+        is yielded once the types for its chunk have been read.
+        """
+        querier = self._load_querier(parallel)
+        if limit is None and offset is None:
+            idents = querier()
+        else:
+            idents = querier.stream(limit, offset)
+        for _, o in self._load_objects(idents):
+            yield o
+
+    @classmethod
+    def load_many(cls, templates):
+        """ Loads objects like each of the given objects from the graph.
+
+        Equivalent to calling :meth:`load` on each of `templates`, but
+        templates with the same structure, differing only in the values they
+        have set, are queried together with
+        :class:`~yarom.graphObject.BatchGraphObjectQuerier`, so loading many
+        objects by, say, their names takes few more graph calls than loading
+        one.
+
+        Parameters
+        ----------
+        templates : list of DataObject
+            The objects to load objects like
+
+        Returns
+        -------
+        list of list of DataObject
+            The loaded objects for each of `templates`, in the same order
+        """
+        templates = list(templates)
+        if not templates:
+            return []
+        first = templates[0]
+        querier = BatchGraphObjectQuerier(templates, first.rdf,
+                                          hop_scorer=first._hop_scorer(),
+                                          literal_index=first._conf_object('rdf.literal_index'),
+                                          closure_index=first._conf_object('rdf.closure_index'))
+        found = [list(idents) for idents in querier()]
+        objects = first._load_objects(itertools.chain.from_iterable(found))
+        return [[o for _, o in itertools.islice(objects, len(idents))]
+                for idents in found]
+
+    def _load_objects(self, idents):
+        """ Makes objects for `idents`, looking up their rdf:types several at
+        a time. Yields pairs of each identifier and its object """
+        for ident, types in self._with_rdf_types(idents):
             the_type = self.mapper.get_most_specific_rdf_type(types)
-            yield self.mapper.oid(ident, the_type)
+            yield ident, self.mapper.oid(ident, the_type)
+
+    def explain_load(self, analyze=False):
+        """ Describes how :meth:`load` queries for objects like this one.
+
+        Parameters
+        ----------
+        analyze : bool
+            If `True`, the query is executed and the explanation includes
+            actual result sizes, graph calls and timings
+
+        Returns
+        -------
+        yarom.queryExplanation.QueryExplanation
+        """
+        return self._load_querier().explain(analyze)
+
+    def _load_querier(self, parallel=None):
+        return self._querier(self, parallel)
 
     def resolve(self):
         """ Resolve this object from the graph.
@@ -468,6 +669,103 @@ class DataObject(six.with_metaclass(MappedClass, GraphObject, DataUser)):
         """
         self.add_statements(self.get_defined_component())
 
+    @classmethod
+    def bulk_create(cls, data, batchsize=1000):
+        """ Saves objects of this class made from tabular data.
+
+        Writes the same statements as making an object for each row, setting
+        its properties and calling :meth:`save`, but without making the
+        objects. The statements are added to the graph `batchsize` at a time.
+
+        Each row may give the object's identifier with an ``ident`` or ``key``
+        column, as in the constructor. Otherwise, the identifier is computed
+        by :meth:`identifier_augment` from the row's property values. Other
+        columns are named for properties of this class. A value of `None`
+        leaves a property unset. Values for object properties may be
+        DataObjects or identifiers.
+
+        Parameters
+        ----------
+        data : dict, numpy.ndarray or iterable of dict
+            Either a mapping from column names to sequences of values, a NumPy
+            structured array, or an iterable of rows, each mapping column
+            names to values
+        batchsize : int
+            The number of statements to add to the graph at once. Optional
+
+        Returns
+        -------
+        int
+            The number of objects saved
+        """
+        counter = [0]
+
+        def count(rows):
+            for row in rows:
+                counter[0] += 1
+                yield row
+        cls.rdf_type_object._add_to_store_in_batches(
+            cls._bulk_triples(count(_bulk_rows(data))), batchsize)
+        return counter[0]
+
+    @classmethod
+    def _bulk_triples(cls, rows):
+        props = dict((p.linkName, p) for p in cls.dataObjectProperties)
+        rdf_type = R.RDF['type']
+        saved = set()
+        scratch = None
+
+        for t in ComponentTripler(cls.rdf_type_object, generator=True)():
+            yield t
+
+        for row in rows:
+            ident = row.get('ident')
+            key = row.get('key')
+            values = []
+            for name, value in row.items():
+                if name in ('ident', 'key') or value is None:
+                    continue
+                p = props.get(name)
+                if p is None:
+                    raise ValueError(
+                        "No such argument {} to {}::bulk_create".format(
+                            name, cls.__name__))
+                values.append((p, _bulk_value(value)))
+
+            if ident:
+                ident = R.URIRef(ident)
+            elif key:
+                ident = (cls.make_identifier_direct(key)
+                         if isinstance(key, str)
+                         else cls.make_identifier(key))
+            else:
+                if scratch is None:
+                    scratch = cls()
+                for p in cls.dataObjectProperties:
+                    getattr(scratch, p.linkName).clear()
+                for p, value in values:
+                    if (isinstance(value, R.URIRef) and
+                            issubclass(p, (ObjectPropertyMixin, UnionPropertyMixin))):
+                        value = DataObject(ident=value)
+                    getattr(scratch, p.linkName).set(value)
+                if not scratch.defined:
+                    raise IdentifierMissingException(scratch)
+                ident = scratch.identifier
+
+            yield (ident, rdf_type, cls.rdf_type)
+            for p, value in values:
+                if isinstance(value, DataObject):
+                    if not value.defined:
+                        continue
+                    if id(value) not in saved:
+                        saved.add(id(value))
+                        for t in ComponentTripler(value, generator=True)():
+                            yield t
+                    value = value.idl
+                elif not isinstance(value, R.term.Identifier):
+                    value = R.Literal(value)
+                yield (ident, p.link, value)
+
     def retract(self):
         """ Remove this object from the data store.
 
@@ -542,16 +840,57 @@ def validate(do_type):
     """ Given a DataObject type, call validate() on all objects of that type in the RDF object graph """
 
 
+def _bulk_rows(data):
+    """ Yields rows, as dicts, from the data given to
+    :meth:`DataObject.bulk_create` """
+    names = getattr(getattr(data, 'dtype', None), 'names', None)
+    if names:
+        columns = [data[n] for n in names]
+    elif hasattr(data, 'keys'):
+        names = list(data.keys())
+        columns = [data[n] for n in names]
+    else:
+        for row in data:
+            yield row
+        return
+    for values in six.moves.zip(*columns):
+        yield dict(six.moves.zip(names, values))
+
+
+def _bulk_value(value):
+    """ Converts NumPy scalars from the data given to
+    :meth:`DataObject.bulk_create` into Python values """
+    if type(value).__module__ == 'numpy' and hasattr(value, 'item'):
+        value = value.item()
+    return value
+
+
 class TypeDataObject(DataObject):
-    pass
+
+    """ The DataObject for a mapped class's rdf_type.
+
+    Like the :class:`DataObjectSingleton` objects, a TypeDataObject is shared
+    by every instance of its class, so it holds the properties which refer to
+    it by weak references. Otherwise, no instance could be collected while
+    its class is mapped. Walks over the object graph don't follow those
+    properties back to the instances.
+    """
+
+    shared = True
+
+    def __init__(self, *args, **kwargs):
+        super(TypeDataObject, self).__init__(*args, **kwargs)
+        self.owner_properties = WeakIdentityOrderedSet()
 
 
 class DataObjectSingleton(DataObject):
     instance = None
+    shared = True
 
     def __init__(self, *args, **kwargs):
         if type(self)._gettingInstance:
             super(DataObjectSingleton, self).__init__(*args, **kwargs)
+            self.owner_properties = WeakIdentityOrderedSet()
         else:
             raise Exception(
                 "You must call getInstance to get " +
@@ -1,9 +1,13 @@
 from rdflib import Graph, Namespace
 from rdflib.namespace import RDF, NamespaceManager
 import logging
+from collections import Counter
 from .configure import Configureable
 from .data import Data
-from .rdfUtils import triples_to_bgp
+from .rdfUtils import triples_to_bgp, rdf_types_many
+from .graphObject import GraphObjectQuerier
+from .graphStatistics import StatisticsHopScorer
+from .sparqlQuerier import SPARQLQuerier
 
 L = logging.getLogger(__name__)
 
@@ -37,6 +41,106 @@ class DataUser(Configureable):
             "rdf.namespace_manager" : {
                 "description" : "The namespace manager associated with the rdf.graph. Stores prefixes that get used by yarom",
                 "type" : NamespaceManager
+                },
+            "rdf.collect_statistics" : {
+                "description" : "If true, statistics over the rdf.graph are collected for ordering the steps of queries. Collecting statistics for a predicate reads every statement with that predicate",
+                "type" : bool,
+                "directly_configureable" : True
+                },
+            "rdf.graph_statistics" : {
+                "description" : "Statistics over the rdf.graph used for ordering the steps of queries. Only present if rdf.collect_statistics is set",
+                "type" : "yarom.graphStatistics.GraphStatistics"
+                },
+            "rdf.query_plan_cache" : {
+                "description" : "Plans for queries against the rdf.graph, stored by the structure of the query",
+                "type" : "yarom.graphObject.QueryPlanCache"
+                },
+            "rdf.query_plan_cache_size" : {
+                "description" : "The maximum number of plans kept in the rdf.query_plan_cache. Defaults to 256",
+                "type" : int,
+                "directly_configureable" : True
+                },
+            "rdf.graph_version" : {
+                "description" : "Counts modifications made through yarom to the rdf.graph",
+                "type" : "yarom.queryResultCache.GraphVersion"
+                },
+            "rdf.query_result_cache" : {
+                "description" : "Results of queries against the rdf.graph. Only present if rdf.query_result_cache_size is set",
+                "type" : "yarom.queryResultCache.QueryResultCache"
+                },
+            "rdf.query_result_cache_size" : {
+                "description" : "The maximum total number of result terms kept in the rdf.query_result_cache. Query results are not cached unless this is set",
+                "type" : int,
+                "directly_configureable" : True
+                },
+            "rdf.index_literals" : {
+                "description" : "If true, literal values in the rdf.graph are indexed for range queries. Only modifications made through yarom update the index",
+                "type" : bool,
+                "directly_configureable" : True
+                },
+            "rdf.literal_index" : {
+                "description" : "Index of literal values in the rdf.graph. Only present if rdf.index_literals is set",
+                "type" : "yarom.literalIndex.LiteralIndex"
+                },
+            "rdf.index_closures" : {
+                "description" : "If true, transitive lookups over the rdf.graph are indexed in the rdf.closure_index. Queries for objects give the index to the ZeroOrMoreTQLayers over the rdf.graph which don't have one. May also be a list of the predicates to index. Only modifications made through yarom update the index",
+                "type" : (bool, list),
+                "directly_configureable" : True
+                },
+            "rdf.closure_index" : {
+                "description" : "Index of transitive closures in the rdf.graph. Only present if rdf.index_closures is set",
+                "type" : "yarom.closureIndex.ClosureIndex"
+                },
+            "mapper.use_identity_map" : {
+                "description" : "If true, the mapper returns the same object when asked for an object with the same identifier and type, while that object is in use",
+                "type" : bool,
+                "directly_configureable" : True
+                },
+            "mapper.identity_map_size" : {
+                "description" : "The number of most recently used objects the identity map keeps even when they aren't in use. Defaults to 0",
+                "type" : int,
+                "directly_configureable" : True
+                },
+            "mapper.identity_map" : {
+                "description" : "The mapper's identity map. Only present if mapper.use_identity_map is set. yarom.connect gives it to the mapper",
+                "type" : "yarom.identityMap.IdentityMap"
+                },
+            "rdf.intern_terms" : {
+                "description" : "If true, terms in query results from the rdf.graph are replaced with canonical instances from the rdf.term_interner",
+                "type" : bool,
+                "directly_configureable" : True
+                },
+            "rdf.term_interner" : {
+                "description" : "Interns terms from the rdf.graph. Only present if rdf.intern_terms is set. Cleared when the database is closed",
+                "type" : "yarom.termDictionary.TermInterner"
+                },
+            "rdf.type_lookup_chunk_size" : {
+                "description" : "The number of loaded resources whose rdf:types are looked up together in the rdf.graph. Defaults to 1000",
+                "type" : int,
+                "directly_configureable" : True
+                },
+            "rdf.parallel_queries" : {
+                "description" : "If true, the top-level branches of queries for objects are evaluated concurrently in the rdf.query_executor thread pool. May also be a concurrent.futures.Executor to evaluate them with, which the caller must shut down",
+                "type" : (bool, "concurrent.futures.Executor"),
+                "directly_configureable" : True
+                },
+            "rdf.parallel_query_workers" : {
+                "description" : "The number of threads in the rdf.query_executor. Defaults to 8",
+                "type" : int,
+                "directly_configureable" : True
+                },
+            "rdf.query_executor" : {
+                "description" : "The thread pool for queries made by yarom.data.Data.openDatabase when rdf.parallel_queries is true. Shut down by closeDatabase",
+                "type" : "concurrent.futures.ThreadPoolExecutor"
+                },
+            "rdf.graph_opener" : {
+                "description" : "Opens the rdf.graph in executor workers. Required if rdf.parallel_queries is a process pool. The graphs opened in this process are closed by yarom.data.Data.closeDatabase. See yarom.graphObject.GraphOpener",
+                "type" : "yarom.graphObject.GraphOpener"
+                },
+            "rdf.sparql_queries" : {
+                "description" : "If true, queries for objects are sent to the rdf.graph as a single SPARQL query. Set by the 'sparql_endpoint' source",
+                "type" : bool,
+                "directly_configureable" : True
                 }
             }
 
@@ -58,6 +162,110 @@ class DataUser(Configureable):
     def namespace_manager(self):
         return self.conf['rdf.namespace_manager']
 
+    def _with_rdf_types(self, idents):
+        """ Pairs each of `idents` with the set of its rdf:types in the
+        configured graph, looking up types for several identifiers at once """
+        return rdf_types_many(self.rdf, idents,
+                              self.conf.get('rdf.type_lookup_chunk_size', 1000))
+
+    def _objects(self, subject, predicate):
+        """ Returns the set of objects of statements in the configured graph
+        with the given `subject` and `predicate`.
+
+        This is the answer to a query with a single triple pattern, so it's
+        read directly from the graph rather than through a querier
+        """
+        objects = set(o for _, _, o in self.rdf.triples((subject, predicate, None)))
+        interner = self._term_interner()
+        if objects and not isinstance(interner, bool):
+            objects = set(interner.intern(o) for o in objects)
+        return objects
+
+    def _querier(self, q, parallel=None):
+        """ Returns a querier for objects like `q` in the configured graph.
+
+        If `parallel` is `None`, branches of the query are evaluated in
+        parallel according to ``rdf.parallel_queries``. See
+        :class:`~yarom.graphObject.GraphObjectQuerier` for other values
+        """
+        result_cache = self._conf_object('rdf.query_result_cache')
+        graph_version = self._conf_object('rdf.graph_version')
+        if parallel is None:
+            parallel = self.conf.get('rdf.parallel_queries', False)
+        if parallel is True:
+            parallel = self._conf_object('rdf.query_executor') or True
+        if self.conf.get('rdf.sparql_queries', False):
+            return SPARQLQuerier(q, self.rdf,
+                                 plan_cache=self._query_plan_cache(),
+                                 result_cache=result_cache,
+                                 graph_version=graph_version)
+        return GraphObjectQuerier(q, self.rdf,
+                                  hop_scorer=self._hop_scorer(),
+                                  plan_cache=self._query_plan_cache(),
+                                  result_cache=result_cache,
+                                  graph_version=graph_version,
+                                  literal_index=self._conf_object('rdf.literal_index'),
+                                  closure_index=self._conf_object('rdf.closure_index'),
+                                  intern_terms=self._term_interner(),
+                                  parallel=parallel,
+                                  graph_opener=self._conf_object('rdf.graph_opener'))
+
+    def _term_interner(self):
+        """ Returns the interner for terms from the configured graph, `True`
+        if terms should be interned but there's no interner for the graph, or
+        `False` """
+        if not self.conf.get('rdf.intern_terms', False):
+            return False
+        interner = self._conf_object('rdf.term_interner')
+        return True if interner is None else interner
+
+    def _hop_scorer(self):
+        """ Returns a hop scorer for queries against the configured graph or
+        `None` if there are no statistics for the graph """
+        stats = self.conf.get('rdf.graph_statistics', False)
+        if stats:
+            return StatisticsHopScorer(stats)
+        return None
+
+    def _query_plan_cache(self):
+        """ Returns the cache of query plans for the configured graph or `None`
+        """
+        return self._conf_object('rdf.query_plan_cache')
+
+    def _conf_object(self, key):
+        res = self.conf.get(key, False)
+        return None if res is False else res
+
+    def _statements_modified(self, predicate_counts=None, added=(), removed=()):
+        """ Notes that statements have been added to or removed from the
+        configured graph.
+
+        Parameters
+        ----------
+        predicate_counts : dict
+            Maps predicates to the number of statements with that predicate
+            which were changed. If `None`, then any statement may have changed
+        added : iterable
+            The statements which were added, if known
+        removed : iterable
+            The statements which were removed, if known
+        """
+        for key in ('rdf.literal_index', 'rdf.closure_index',
+                    'mapper.identity_map'):
+            index = self._conf_object(key)
+            if index is not None:
+                if predicate_counts is None:
+                    index.clear()
+                else:
+                    index.add(added)
+                    index.remove(removed)
+        stats = self.conf.get('rdf.graph_statistics', False)
+        if stats:
+            stats.note_modified(predicate_counts)
+        version = self.conf.get('rdf.graph_version', False)
+        if version:
+            version.bump(predicate_counts)
+
     def _remove_from_store(self, g):
         # Note the assymetry with _add_to_store. You must add actual elements,
         # but deletes can be performed as a query
@@ -71,6 +279,8 @@ class DataUser(Configureable):
             s = " DELETE DATA {" + temp_graph.serialize(format="nt") + " } "
             L.debug("deleting. s = " + s)
             self.conf['rdf.graph'].update(s)
+            self._statements_modified(Counter(x[1] for x in temp_graph),
+                                      removed=temp_graph)
 
     def _add_to_store(self, g, graph_name=False):
         if self.conf['rdf.store'] == 'SPARQLUpdateStore':
@@ -78,6 +288,9 @@ class DataUser(Configureable):
             #     with over the endpoint's rest interface. Just need to do it
             #     for some common endpoints
 
+            # `g` is read more than once below
+            if not isinstance(g, Graph):
+                g = list(g)
             try:
                 gs = g.serialize(format="nt")
             except:
@@ -89,13 +302,48 @@ class DataUser(Configureable):
                 s = " INSERT DATA { " + gs + " } "
                 L.debug("update query = " + s)
                 self.conf['rdf.graph'].update(s)
+            self._statements_modified(Counter(x[1] for x in g), added=g)
         else:
             gr = self.conf['rdf.graph']
+            added = []
             for x in g:
                 gr.add(x)
-            if self.conf.get('rdf.inference', False):
-                self.conf['fuxi.infer_func'](gr, g)
+                added.append(x)
+            self._statements_added(gr, added)
+
+        self._commit_store()
+
+    def _statements_added(self, gr, added):
+        """ Notes that the statements in `added` are now in `gr`, the
+        configured graph, and adds the statements inferred from them """
+        self._statements_modified(Counter(x[1] for x in added), added=added)
+        if self.conf.get('rdf.inference', False):
+            self.conf['fuxi.infer_func'](gr, added)
+
+    def _add_to_store_in_batches(self, triples, batchsize=1000):
+        """ Adds `triples` to the configured graph `batchsize` at a time, so
+        they needn't all be held in memory. Each batch is added as by
+        :meth:`add_statements`, but with one ``addN`` call unless the store is
+        a ``SPARQLUpdateStore``. Returns the number of triples added """
+        sparql = self.conf['rdf.store'] == 'SPARQLUpdateStore'
+        gr = self.conf['rdf.graph']
+        ctx = getattr(gr, 'default_context', gr)
+        count = 0
+        for chunk in grouper(triples, batchsize):
+            if not chunk:
+                break
+            count += len(chunk)
+            if sparql:
+                self._add_to_store(chunk)
+                continue
+            ctx.addN((s, p, o, ctx) for s, p, o in chunk)
+            # Only now are the statements in the graph
+            self._statements_added(gr, chunk)
+        if not sparql:
+            self._commit_store()
+        return count
 
+    def _commit_store(self):
         if self.conf['rdf.source'] == 'ZODB':
             import transaction
             # Commit the current commit
@@ -112,14 +360,18 @@ class DataUser(Configureable):
         triples : iter of (:class:`rdflib.term.URIRef`, :class:`rdflib.term.URIRef`, :class:`rdflib.term.URIRef`)
             A set of triples to remove
         """
+        removed = []
         for x in statements:
             self.rdf.remove(x)
+            removed.append(x)
+        self._statements_modified(Counter(x[1] for x in removed), removed=removed)
 
     def _remove_from_store_by_query(self, q):
         import logging as L
         s = " DELETE WHERE {" + q + " } "
         L.debug("deleting. s = " + s)
         self.conf['rdf.graph'].update(s)
+        self._statements_modified()
 
     def add_statements(self, graph):
         """
@@ -1,28 +1,49 @@
 from __future__ import print_function
-import warnings
 import logging
-from itertools import chain
+from timeit import default_timer
+from itertools import chain, islice
+from collections import OrderedDict
+import threading
 from pprint import pformat
 from yarom.utils import FCN
 import six
 
 from .rangedObjects import InRange
-from .rdfUtils import transitive_subjects, UP, DOWN
+from .orderedSet import IdentityOrderedSet
+from .rdfUtils import transitive_subjects, transitive_lookup_many, UP, DOWN
+from .termDictionary import TermDictionary, TermInterner, EncodedTermSet
+from .queryExplanation import (QueryExplanation,
+                               JoinExplanation,
+                               HopExplanation,
+                               _QueryTracer)
 
 L = logging.getLogger(__name__)
 
 __all__ = [
+    "BatchGraphObjectQuerier",
     "GraphObject",
     "GraphObjectQuerier",
     "GraphObjectChecker",
+    "GraphOpener",
     "ComponentTripler",
+    "close_worker_graphs",
     "IdentifierMissingException",
+    "InterningTQLayer",
+    "QueryPlanCache",
     "ZeroOrMoreTQLayer",
 ]
 
 EMPTY_SET = frozenset([])
 
 
+def _walked_owner_properties(node):
+    """ Returns the properties which refer to `node` and which a walk over
+    the object graph follows """
+    if getattr(node, 'shared', False):
+        return ()
+    return node.owner_properties
+
+
 class Variable(int):
     pass
 
@@ -38,10 +59,15 @@ class GraphObject(object):
     An abstract base class.
     """
 
+    # Whether this object is shared by many owners, like a class's
+    # rdf_type_object. Walks over the object graph don't follow the properties
+    # which refer to a shared object, since those connect all of its owners
+    shared = False
+
     def __init__(self, **kwargs):
         super(GraphObject, self).__init__(**kwargs)
         self.properties = []
-        self.owner_properties = []
+        self.owner_properties = IdentityOrderedSet()
 
     @property
     def identifier(self):
@@ -88,19 +114,86 @@ class GraphObject(object):
 
 
 class GraphObjectChecker(object):
-    def __init__(self, query_object, graph, parallel=False, sort_first=False):
+
+    """ Checks that the triples connecting a defined object to the other
+    defined objects in its component are all in a graph.
+
+    Triples which share a subject and predicate, or a predicate and object,
+    are checked together with one ``triples_choices`` call. Checking stops at
+    the first missing triple.
+
+    If the hop scorer has a ``known`` method, like
+    :class:`~yarom.graphStatistics.StatisticsHopScorer`, groups are checked
+    in order of the scores it already has, so that the ones most likely to be
+    missing are checked first. Groups without a known score are checked
+    after those with one. Checking is meant to be cheap, so hop scorers
+    without a ``known`` method, which might read the graph, aren't used.
+    """
+
+    def __init__(self, query_object, graph, parallel=False, sort_first=False,
+                 hop_scorer=None):
         self.query_object = query_object
         self.graph = graph
+        self.hop_scorer = hop_scorer
 
     def __call__(self):
         tripler = ComponentTripler(self.query_object)
         L.debug('GOC: Checking {}'.format(self.query_object))
-        for x in sorted(tripler()):
-            if x not in self.graph:
-                L.debug('GOC: Failed on {}'.format(x))
+        groups = self.groups(tripler())
+        known = getattr(self.hop_scorer, 'known', None)
+        if known is not None:
+            groups.sort(key=lambda g: _known_score_key(known(g[0])))
+        for hop, values in groups:
+            if not self.check(hop, values):
+                L.debug('GOC: Failed on {} {}'.format(hop, values))
                 return False
         return True
 
+    def groups(self, triples):
+        """ Groups the triples by subject and predicate or by predicate and
+        object, whichever makes the larger group for each triple.
+
+        Returns a list of pairs of a hop, a (subject, predicate, object,
+        target) four-tuple with `None` for the varying position, and the
+        values for that position """
+        by_sp = dict()
+        by_po = dict()
+        for t in triples:
+            by_sp.setdefault((t[0], t[1]), []).append(t)
+            by_po.setdefault((t[1], t[2]), []).append(t)
+
+        res = []
+        done = set()
+        for (s, p), trips in by_sp.items():
+            objects = [t[2] for t in trips if len(by_po[(p, t[2])]) <= len(trips)]
+            if objects:
+                done.update((s, p, o) for o in objects)
+                res.append(((s, p, None, None), objects))
+        for (p, o), trips in by_po.items():
+            subjects = [t[0] for t in trips if t not in done]
+            if subjects:
+                res.append(((None, p, o, None), subjects))
+        return res
+
+    def check(self, hop, values):
+        """ Returns whether the graph has a triple for each of `values` in
+        the `None` position of `hop` """
+        idx = hop.index(None)
+        if len(values) == 1:
+            q = list(hop[:3])
+            q[idx] = values[0]
+            return tuple(q) in self.graph
+        q = list(hop[:3])
+        q[idx] = list(values)
+        found = set(t[idx] for t in self.graph.triples_choices(tuple(q)))
+        return all(v in found for v in values)
+
+
+def _known_score_key(score):
+    if score is None:
+        return (1, 0)
+    return (0, score)
+
 
 class GraphObjectValidator(object):
     def __init__(self, query_object, graph, parallel=False):
@@ -164,7 +257,21 @@ class GraphObjectQuerier(object):
 
     """
 
-    def __init__(self, q, graph, parallel=False, hop_scorer=None):
+    #: The cost of looking up one term with ``triples_choices`` relative to
+    #: reading one triple with ``triples``. Used to choose how to restrict a hop
+    #: by the results of the hops before it when the hop scorer has an
+    #: ``estimates_size`` attribute set to `True`, meaning that its scores are
+    #: estimated numbers of matching triples
+    triples_choices_cost = 4
+
+    #: The number of threads in the pool made to evaluate a query with
+    #: ``parallel=True``
+    parallel_workers = 8
+
+    def __init__(self, q, graph, parallel=False, hop_scorer=None, plan_cache=None,
+                 graph_opener=None, term_dictionary=None, result_cache=None,
+                 graph_version=None, literal_index=None, intern_terms=False,
+                 closure_index=None):
         """ Initialize the querier.
 
         Call the GraphObjectQuerier object to perform the query.
@@ -192,36 +299,266 @@ class GraphObjectQuerier(object):
             that hop, with lower numbers being more selective. In general the
             score should only take the given hop into account -- it should not
             take previously given hops into account when calculating a score.
+        plan_cache : QueryPlanCache
+            If provided, the merged and ordered path table for the query is
+            looked up in this cache by the structure of the query graph and
+            stored there for reuse by queries having the same structure
+        parallel : bool or concurrent.futures.Executor
+            If `True`, the top-level branches of the query are evaluated
+            concurrently in a thread pool of :attr:`parallel_workers` threads
+            which is made for the query and shut down when it's done. This
+            helps for stores which do I/O or release the GIL while matching
+            triples. An :class:`~concurrent.futures.Executor` may be given
+            instead to evaluate the branches with that executor. The caller
+            owns the executor and must shut it down. The results are the same
+            as for sequential evaluation
+        graph_opener : callable
+            If provided, branches are evaluated against the graph returned by
+            calling `graph_opener` with no arguments in the executor's worker
+            rather than against `graph`. The opener must be picklable and
+            hashable. Each process keeps the graph for the last opener it was
+            given open until :func:`close_worker_graphs` is called. This is
+            required for a :class:`~concurrent.futures.ProcessPoolExecutor`,
+            which is only suitable for stores that can be opened read-only by
+            several processes at once. See :class:`GraphOpener`
+        term_dictionary : bool or yarom.termDictionary.TermDictionary
+            If `True`, the intermediate results of the query are encoded as
+            sorted arrays of integer ids from a dictionary made for this
+            query, and they are joined with vectorized intersections. A
+            :class:`~yarom.termDictionary.TermDictionary` may be given instead
+            to share ids between queries. Requires NumPy. Beneficial when
+            joins have many candidates
+        result_cache : yarom.queryResultCache.QueryResultCache
+            If provided, calling the querier returns results stored in this
+            cache for an identical query if they are still current with
+            `graph_version`, and stores the results otherwise. Queries for
+            defined objects aren't cached
+        graph_version : yarom.queryResultCache.GraphVersion
+            Tracks modifications to `graph`. Required with `result_cache`
+        literal_index : yarom.literalIndex.LiteralIndex
+            If provided, range queries are answered from this index for
+            `graph` rather than by scanning and filtering
+        intern_terms : bool or yarom.termDictionary.TermInterner
+            If `True`, the terms in statements from `graph` are replaced with
+            their canonical instances from a
+            :class:`~yarom.termDictionary.TermInterner` made for this query.
+            An interner may be given instead to share canonical instances
+            between queries of the same graph. See :class:`InterningTQLayer`
+        closure_index : yarom.closureIndex.ClosureIndex
+            If provided, it's given to each :class:`ZeroOrMoreTQLayer` among
+            the layers of `graph` which is over the graph the index covers and
+            which doesn't already have a closure index
         """
 
         self.query_object = q
         L.debug('GOQ graph %s', graph)
-        self.graph = _default_tq_layers(graph)
-
-        if parallel:
-            warnings.warn('Parallel execution is not supported')
+        self.base_graph = graph
+        self.literal_index = literal_index
+        _use_closure_index(graph, closure_index)
+        if intern_terms is True:
+            intern_terms = TermInterner()
+        elif intern_terms is False:
+            intern_terms = None
+        self.interner = intern_terms
+        self.graph = self._layered(graph)
+
+        self.parallel = parallel
+        if isinstance(parallel, bool) or parallel is None:
+            self.executor = None
+        else:
+            self.executor = parallel
+        self.graph_opener = graph_opener
+        if (self.graph_opener is None and
+                _is_process_pool(self.executor)):
+            raise Exception('A graph_opener is required to evaluate queries'
+                            ' with a process pool')
         self.results = dict()
         self.triples_cache = dict()
         self.hop_scorer = hop_scorer
+        self.plan_cache = plan_cache
+        self._tracer = None
+        self._query_shape = None
+        self.result_cache = result_cache
+        self.graph_version = graph_version
+        if result_cache is not None and graph_version is None:
+            raise Exception('A graph_version is required with a result_cache')
+        if term_dictionary is True:
+            term_dictionary = TermDictionary()
+        elif term_dictionary is False:
+            term_dictionary = None
+        self.term_dictionary = term_dictionary
+
+    def _layered(self, graph):
+        if self.literal_index is not None:
+            graph = LiteralIndexTQLayer(self.literal_index, graph)
+        if self.interner is not None:
+            graph = InterningTQLayer(graph, self.interner)
+        return _default_tq_layers(graph)
 
     def do_query(self):
         L.debug('do_query: Graph {}'.format(self.graph))
         if self.query_object.defined:
             L.debug('do_query: Query object {} is already defined'.format(self.query_object))
-            gv = GraphObjectChecker(self.query_object, self.graph)
+            gv = GraphObjectChecker(self.query_object, self.graph,
+                                    hop_scorer=self.hop_scorer)
             if gv():
                 return set([self.query_object.identifier])
             else:
                 L.debug('do_query: Query graph does not align with the backing graph')
                 return EMPTY_SET
 
+        h = self.plan()
+        if not h:
+            return EMPTY_SET
+        if L.isEnabledFor(logging.DEBUG):
+            L.debug('do_query: merge_paths_result:\n{}'.format(self._format_merged(h)))
+        if self.parallel and self._tracer is None and len(h) > 1:
+            res = self.parallel_path_resolver(h)
+        else:
+            res = self.query_path_resolver(h)
+        if isinstance(res, EncodedTermSet):
+            res = set(res)
+        return res
+
+    def stream(self, limit=None, offset=None):
+        """ Yields the results of the query as they are found.
+
+        All hops but the last are evaluated as they are for :meth:`do_query`.
+        The triples for the last hop, restricted by the results of the other
+        hops, are then read from the graph one at a time and each matching
+        term is yielded. If the consumer stops iterating early, no more
+        triples are pulled from the graph for the last hop, so taking the
+        first few results from a query with a large final hop is cheap.
+
+        Each result is yielded only once, but the order of results is not
+        defined. The graph should not be modified until iteration is
+        finished.
+
+        Parameters
+        ----------
+        limit : int
+            The maximum number of results. Optional
+        offset : int
+            The number of results to skip. Optional
+        """
+        results = self._stream()
+        if limit is None and not offset:
+            return results
+        start = offset or 0
+        stop = None if limit is None else start + limit
+        return islice(results, start, stop)
+
+    def _stream(self):
+        if self.query_object.defined:
+            for x in self.do_query():
+                yield x
+            return
+
+        h = self.plan()
+        if not h:
+            return
+
+        hops = list(self._hop_order(h))
+        join_args = []
+        for hop in hops[:-1]:
+            self._qpr_helper(h[hop], hop, join_args)
+            if not join_args[-1]:
+                return
+
+        last = hops[-1]
+        idx = last.index(None)
+        restriction = join_args[-1] if join_args else None
+        qx, trips = self._hop_triples(h[last], last, restriction)
+        L.debug("stream: streaming %s", qx)
+        seen = set()
+        for t in trips:
+            x = t[idx]
+            if x not in seen:
+                seen.add(x)
+                yield x
+
+    def plan(self):
+        """ Returns the merged path table for the query, or `None` if there
+        are no paths to query along """
+        if self.plan_cache is not None:
+            return self.cached_plan()
         qp = _QueryPreparer(self.query_object)
         paths = qp()
-        if len(paths) == 0:
-            return EMPTY_SET
-        h = self.merge_paths(paths)
-        L.debug('do_query: merge_paths_result:\n{}'.format(self._format_merged(h)))
-        return self.query_path_resolver(h)
+        return self.merge_paths(paths) if paths else None
+
+    def explain(self, analyze=False):
+        """ Describes how the query is performed.
+
+        Parameters
+        ----------
+        analyze : bool
+            If `True`, the query is executed and the explanation includes
+            the actual number of terms, the graph calls made and the time
+            taken for each hop. Otherwise, only the hop order and estimates
+            are given
+
+        Returns
+        -------
+        yarom.queryExplanation.QueryExplanation
+        """
+        explanation = QueryExplanation(self.query_object, analyze)
+        if analyze:
+            tracer = _QueryTracer(explanation)
+            graph = self.graph
+            self._tracer = tracer
+            self.graph = self._layered(_CallCountingTQLayer(tracer, self.base_graph))
+            try:
+                t0 = default_timer()
+                explanation.result_size = len(self.do_query())
+                explanation.time = default_timer() - t0
+            finally:
+                self._tracer = None
+                self.graph = graph
+            explanation.checked = self.query_object.defined
+        elif self.query_object.defined:
+            explanation.checked = True
+        else:
+            h = self.plan()
+            if h:
+                explanation.join = self._explain_plan(h)
+        return explanation
+
+    def _explain_plan(self, path_table):
+        join = JoinExplanation()
+        for hop in self._hop_order(path_table):
+            expl = HopExplanation(hop, self._estimate(hop))
+            sub = path_table[hop]
+            if sub:
+                expl.subquery = self._explain_plan(sub)
+            join.hops.append(expl)
+        return join
+
+    def cached_plan(self):
+        """ Returns the path table for the query, with hops in execution
+        order, reusing the plan from :attr:`plan_cache` if one has been stored
+        for a query with the same structure.
+        """
+        shape, signature = self._shape()
+        if not signature:
+            return None
+        template = self.plan_cache.get(signature)
+        if template is None:
+            template = self._order_plan(shape.path_table(signature),
+                                        shape.constants)
+            self.plan_cache.put(signature, template)
+        return _bind_plan(template, shape.constants)
+
+    def _shape(self):
+        if self._query_shape is None:
+            shape = _QueryShape(self.query_object)
+            self._query_shape = (shape, shape())
+        return self._query_shape
+
+    def _order_plan(self, table, constants):
+        return _PlanTable(
+            (hop, self._order_plan(table[hop], constants))
+            for hop in sorted(table.keys(),
+                              key=lambda h: self.score(_bind_hop(h, constants))))
 
     def merge_paths(self, l):
         """ Combines a list of lists into a multi-level table with
@@ -236,7 +573,8 @@ class GraphObjectQuerier(object):
                  e: {d: {}}}}
         """
         res = dict()
-        L.debug("merge_paths: path {}".format(_format_paths(l)))
+        if L.isEnabledFor(logging.DEBUG):
+            L.debug("merge_paths: path {}".format(_format_paths(l)))
         for x in l:
             if len(x) > 0:
                 tmp = res.get(x[0], [])
@@ -260,70 +598,180 @@ class GraphObjectQuerier(object):
     def query_path_resolver(self, path_table):
         join_args = []
         goal = None
-        for hop in sorted(path_table.keys(), key=self.score):
-            L.debug("HOP %s", str(hop))
+        tracer = self._tracer
+        if tracer is not None:
+            tracer.begin_join()
+        for hop in self._hop_order(path_table):
+            L.debug("HOP %s", hop)
             goal = hop[3]
             self._qpr_helper(path_table[hop], hop, join_args)
+        if tracer is not None:
+            join_sizes = [len(s) for s in join_args]
+        res = self._join(join_args, goal)
+        if tracer is not None:
+            tracer.end_join(join_sizes, len(res))
+        return res
+
+    def parallel_path_resolver(self, path_table):
+        """ Like :meth:`query_path_resolver`, but evaluates each branch of
+        `path_table` as a separate task in :attr:`executor`.
+
+        The branches don't restrict each other with their results as they do
+        in sequential evaluation, but they're joined in the same way, so the
+        results are the same. Sub-queries within a branch are evaluated
+        sequentially.
+
+        Branches evaluated with :attr:`graph_opener` are sent with their
+        sub-queries already in execution order and with the hop scorer's
+        scores for their hops, so they're evaluated in the same way as in
+        sequential evaluation.
+        """
+        executor = self.executor
+        if executor is None:
+            executor = _thread_pool(self.parallel_workers)
+        try:
+            hops = list(self._hop_order(path_table))
+            if self.graph_opener is None:
+                futures = [executor.submit(self._evaluate_branch,
+                                           path_table[hop], hop)
+                           for hop in hops]
+            else:
+                if not isinstance(path_table, _PlanTable):
+                    path_table = self._order_plan(path_table, ())
+                futures = [executor.submit(_evaluate_branch_in_worker,
+                                           self.graph_opener,
+                                           path_table[hop], hop,
+                                           self._branch_scores(path_table[hop], hop))
+                           for hop in hops]
+            L.debug("parallel_path_resolver: submitted %s branches", len(futures))
+            join_args = [f.result() for f in futures]
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+        return self._join(join_args, hops[-1][3])
+
+    def _branch_scores(self, sub, hop):
+        """ Returns a hop scorer giving the scores of `hop` and the hops in
+        `sub` that can be sent to an executor worker, or `None` if there's no
+        hop scorer """
+        if self.hop_scorer is None:
+            return None
+        scores = dict()
+
+        def collect(table, hop):
+            scores[hop] = self.hop_scorer(hop)
+            for h in table:
+                collect(table[h], h)
+        collect(sub, hop)
+        return _ScoreTable(scores,
+                           getattr(self.hop_scorer, 'estimates_size', False))
+
+    def _evaluate_branch(self, sub, hop):
+        join_args = []
+        self._qpr_helper(sub, hop, join_args)
+        return join_args[0]
+
+    def _hop_order(self, path_table):
+        if isinstance(path_table, _PlanTable):
+            return path_table.keys()
+        else:
+            return sorted(path_table.keys(), key=self.score)
+
+    def _join(self, join_args, goal):
         if len(join_args) == 1:
             return join_args[0]
         elif len(join_args) > 0:
-            L.debug("Joining {} args on {}".format(len(join_args), goal))
+            L.debug("Joining %s args on %s", len(join_args), goal)
             join_args = sorted(join_args, key=len)
             res = join_args[0]
             res.intersection_update(*join_args[1:])
-            L.debug("Joined {}(sizes={}) args on {}. Result size = {}".format(len(join_args),
-                [len(s) for s in join_args], goal, len(res)))
+            L.debug("Joined %s args on %s. Result size = %s", len(join_args), goal, len(res))
             return res
         else:
             return EMPTY_SET
 
     def _qpr_helper(self, sub, search_triple, join_args):
         seen = set()
+        tracer = self._tracer
+        if tracer is not None:
+            tracer.begin_hop(search_triple, self._estimate(search_triple))
         try:
             idx = search_triple.index(None)
-            other_idx = 0 if (idx == 2) else 2
-            qx = None
-
-            if isinstance(search_triple[other_idx], Variable):
-                sub_results = list(self.query_path_resolver(sub))
-
-                if idx == 2:
-                    qx = (sub_results, search_triple[1], None)
-                else:
-                    qx = (None, search_triple[1], sub_results)
-
-                if sub_results:
-                    trips = self.triples_choices(qx)
-                else:
-                    trips = iter(())
-            else:
-                # join_args is assumed to be sorted such that it the most selective query was executed first, so we
-                # should be able to profitably call triples_choices to reduce the size of our branch
-                if join_args:
-                    # We use the last-added join_arg. It should be the smallest at this point
-                    last_join = join_args[-1]
-                    if last_join:
-                        tl = (list(last_join),)
-                        if idx == 2:
-                            qx = search_triple[:2] + tl
-                        else:
-                            qx = tl + search_triple[1:3]
-                        trips = self.triples_choices(qx)
-                    else: # triples_choices treats [] as wildcard, but for us it's a 'match nothing', so...
-                        trips = iter(())
-                else:
-                    qx = search_triple[:3]
-                    trips = self.triples(qx)
-            seen = set(y[idx] for y in trips)
-            L.debug("Done with {} {}".format(qx, len(seen)))
+            # Each hop is restricted by the hop before it, so the last join arg
+            # is the intersection of all of the join args so far
+            restriction = join_args[-1] if join_args else None
+            qx, trips = self._hop_triples(sub, search_triple, restriction)
+            seen = self._term_set(y[idx] for y in trips)
+            L.debug("Done with %s %s", qx, len(seen))
         finally:
             join_args.append(seen)
+            if tracer is not None:
+                tracer.end_hop(len(seen))
+
+    def _hop_triples(self, sub, search_triple, restriction=None):
+        """ Returns the query pattern for the hop and an iterable of the
+        triples matching it. If `restriction` is given, only triples with a
+        term from `restriction` in the hop's target position are included """
+        idx = search_triple.index(None)
+        other_idx = 0 if (idx == 2) else 2
+
+        if restriction is not None and not restriction:
+            return None, iter(())
+
+        if isinstance(search_triple[other_idx], Variable):
+            sub_results = self.query_path_resolver(sub)
+            if not sub_results:
+                return None, iter(())
+            if restriction is not None and len(restriction) < len(sub_results):
+                # Look up by the smaller set of terms and filter by the larger
+                qx = self._choices_pattern(search_triple, idx, restriction)
+                return qx, _filter_triples(self.triples_choices(qx),
+                                           other_idx, sub_results)
+            qx = self._choices_pattern(search_triple, other_idx, sub_results)
+            trips = self.triples_choices(qx)
+        elif restriction is not None and not self._prefer_scan(search_triple, restriction):
+            qx = self._choices_pattern(search_triple, idx, restriction)
+            return qx, self.triples_choices(qx)
+        else:
+            qx = search_triple[:3]
+            trips = self.triples(qx)
+
+        if restriction is not None:
+            trips = _filter_triples(trips, idx, restriction)
+        return qx, trips
+
+    def _choices_pattern(self, search_triple, pos, terms):
+        q = list(search_triple[:3])
+        for i in (0, 2):
+            if isinstance(q[i], Variable):
+                q[i] = None
+        q[pos] = list(terms)
+        return tuple(q)
+
+    def _prefer_scan(self, search_triple, restriction):
+        """ Whether reading all of the triples for the hop and filtering them
+        by `restriction` is expected to be cheaper than looking up each term
+        in `restriction` """
+        if not getattr(self.hop_scorer, 'estimates_size', False):
+            return False
+        est = self.hop_scorer(search_triple)
+        return est <= len(restriction) * self.triples_choices_cost
+
+    def _term_set(self, terms):
+        if self.term_dictionary is None:
+            return set(terms)
+        return self.term_dictionary.encode(terms)
 
     def score(self, hop):
         if self.hop_scorer is not None:
             return self.hop_scorer(hop)
         return 0
 
+    def _estimate(self, hop):
+        if self.hop_scorer is not None:
+            return self.hop_scorer(hop)
+        return None
+
     def triples_choices(self, query_triple):
         return self.graph.triples_choices(query_triple)
 
@@ -331,7 +779,160 @@ class GraphObjectQuerier(object):
         return self.graph.triples(query_triple)
 
     def __call__(self):
-        return self.do_query()
+        if self.result_cache is None or self.query_object.defined:
+            return self.do_query()
+        return self.cached_query()
+
+    def cached_query(self):
+        """ Returns the results of the query from :attr:`result_cache` or, if
+        they aren't stored there or are out of date, performs the query and
+        stores the results.
+
+        The results are a new `set`, which the caller may modify without
+        affecting the cache """
+        shape, signature = self._shape()
+        if not signature:
+            return set()
+        key = (signature, tuple(_constant_key(c) for c in shape.constants))
+        version = self.graph_version.version
+        res = self.result_cache.get(key, self.graph_version)
+        if res is None:
+            res = frozenset(self.do_query())
+            self.result_cache.put(key, res, _signature_predicates(signature), version)
+        return set(res)
+
+
+def _constant_key(c):
+    if isinstance(c, _Range):
+        return (_Range, c.min_value, c.max_value)
+    return c
+
+
+def _signature_predicates(signature, res=None):
+    if res is None:
+        res = set()
+    for _, link, _, _, sub in signature:
+        res.add(link)
+        if sub:
+            _signature_predicates(sub, res)
+    return frozenset(res)
+
+
+def _filter_triples(trips, idx, terms):
+    return (t for t in trips if t[idx] in terms)
+
+
+def _thread_pool(workers):
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:
+        raise Exception("Parallel query execution requires the 'futures'"
+                        " package on this version of Python")
+    return ThreadPoolExecutor(workers)
+
+
+def _is_process_pool(executor):
+    if executor is None:
+        return False
+    from concurrent.futures import ProcessPoolExecutor
+    return isinstance(executor, ProcessPoolExecutor)
+
+
+# The graph opened in this process for the most recently used graph opener
+_worker_graphs = dict()
+
+_worker_graphs_lock = threading.Lock()
+
+
+def _worker_graph(graph_opener):
+    with _worker_graphs_lock:
+        graph = _worker_graphs.get(graph_opener)
+        if graph is None:
+            _close_worker_graphs()
+            graph = graph_opener()
+            _worker_graphs[graph_opener] = graph
+        return graph
+
+
+def close_worker_graphs():
+    """ Closes the graphs which have been opened in this process to evaluate
+    query branches for a `graph_opener`.
+
+    Only the graph for the most recently used opener is kept open in each
+    process, so this only needs to be called when that graph should be
+    closed, such as when the database it reads is closed.
+    """
+    with _worker_graphs_lock:
+        _close_worker_graphs()
+
+
+def _close_worker_graphs():
+    while _worker_graphs:
+        _, graph = _worker_graphs.popitem()
+        graph.close()
+
+
+def _evaluate_branch_in_worker(graph_opener, sub, hop, hop_scorer=None):
+    """ Evaluates one top-level branch of a query in an executor worker
+    against the graph given by `graph_opener` """
+    querier = GraphObjectQuerier(None, _worker_graph(graph_opener),
+                                 hop_scorer=hop_scorer)
+    return querier._evaluate_branch(sub, hop)
+
+
+class _ScoreTable(object):
+
+    """ A hop scorer which gives scores computed beforehand for a fixed set of
+    hops. Sent to executor workers in place of hop scorers which need the
+    parent's graph """
+
+    def __init__(self, scores, estimates_size=False):
+        self.scores = scores
+        self.estimates_size = estimates_size
+
+    def __call__(self, hop):
+        return self.scores[hop]
+
+
+class GraphOpener(object):
+
+    """ Opens an RDFLib graph backed by an on-disk store.
+
+    Suitable as the `graph_opener` for :class:`GraphObjectQuerier` when
+    executing queries in a process pool.
+    """
+
+    def __init__(self, store, configuration):
+        """
+        Parameters
+        ----------
+        store : str
+            The name of the RDFLib store plugin (e.g., 'Sleepycat')
+        configuration : str
+            The configuration for the store, typically its path
+        """
+        self.store = store
+        self.configuration = configuration
+
+    def __call__(self):
+        import rdflib
+        graph = rdflib.ConjunctiveGraph(self.store)
+        graph.open(self.configuration, create=False)
+        return graph
+
+    def __eq__(self, other):
+        return (isinstance(other, GraphOpener) and
+                self.store == other.store and
+                self.configuration == other.configuration)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.store, self.configuration))
+
+    def __repr__(self):
+        return 'GraphOpener({!r}, {!r})'.format(self.store, self.configuration)
 
 
 def _format_paths(paths):
@@ -390,6 +991,27 @@ class TerminalTQLayer(object):
         raise NotImplementedError()
 
 
+class _CallCountingTQLayer(TQLayer):
+
+    """ Counts calls to the next layer for a query explanation """
+
+    def __init__(self, tracer, *args):
+        super(_CallCountingTQLayer, self).__init__(*args)
+        self.tracer = tracer
+
+    def triples(self, qt, context=None):
+        self.tracer.count('triples')
+        return self.next.triples(qt, context)
+
+    def triples_choices(self, qt, context=None):
+        self.tracer.count('triples_choices')
+        return self.next.triples_choices(qt, context)
+
+    def __contains__(self, x):
+        self.tracer.count('__contains__')
+        return x in self.next
+
+
 class RangeTQLayer(TQLayer):
 
     def triples(self, query_triple, context=None):
@@ -412,8 +1034,8 @@ class RangeTQLayer(TQLayer):
             in_range = query_triple[2]
             qt = (query_triple[0], query_triple[1], None)
             if in_range.defined:
-                # XXX: Assuming triples_choices does not also support range
-                # queries.
+                if getattr(self.next, 'supports_range_choices', False):
+                    return self.next.triples_choices(query_triple, context)
                 return set(x for x in self.next.triples_choices(qt, context) if in_range(x[2]))
             else:
                 return self.next.triples_choices(qt, context)
@@ -421,8 +1043,108 @@ class RangeTQLayer(TQLayer):
             return self.next.triples_choices(query_triple, context)
 
 
+class InterningTQLayer(TQLayer):
+
+    """ Replaces the terms in statements from the next layer with their
+    canonical instances from a :class:`~yarom.termDictionary.TermInterner`.
+
+    If no interner is given, the layer makes one of its own, which lives as
+    long as the layer. The interner's ``stats()`` report its size and how
+    often terms were already interned.
+    """
+
+    def __init__(self, nxt=None, interner=None):
+        super(InterningTQLayer, self).__init__(nxt)
+        if interner is None:
+            interner = TermInterner()
+        self.interner = interner
+
+    def triples(self, query_triple, context=None):
+        return self._intern(self.next.triples(query_triple, context))
+
+    def triples_choices(self, query_triple, context=None):
+        return self._intern(self.next.triples_choices(query_triple, context))
+
+    def _intern(self, triples):
+        intern = self.interner.intern
+        for t in triples:
+            if isinstance(t[0], tuple):
+                yield (tuple(intern(x) for x in t[0]),) + tuple(t[1:])
+            else:
+                yield (intern(t[0]), intern(t[1]), intern(t[2]))
+
+
+class LiteralIndexTQLayer(TQLayer):
+
+    """ Answers range queries with a :class:`~yarom.literalIndex.LiteralIndex`
+    rather than by scanning and filtering the statements for a predicate.
+
+    Placed below a :class:`RangeTQLayer`, which passes range queries through
+    to this layer since it declares ``supports_range_queries`` and
+    ``supports_range_choices``.
+    """
+
+    supports_range_queries = True
+    supports_range_choices = True
+
+    def __init__(self, index, *args):
+        super(LiteralIndexTQLayer, self).__init__(*args)
+        self.index = index
+
+    def triples(self, query_triple, context=None):
+        in_range = query_triple[2]
+        if not isinstance(in_range, InRange):
+            return self.next.triples(query_triple, context)
+        pairs = self._range(query_triple)
+        if pairs is None:
+            qt = (query_triple[0], query_triple[1], None)
+            return set(x for x in self.next.triples(qt, context) if in_range(x[2]))
+        s = query_triple[0]
+        p = query_triple[1]
+        return set((x[0], p, x[1]) for x in pairs if s is None or x[0] == s)
+
+    def triples_choices(self, query_triple, context=None):
+        in_range = query_triple[2]
+        if not isinstance(in_range, InRange):
+            return self.next.triples_choices(query_triple, context)
+        pairs = self._range(query_triple)
+        if pairs is None:
+            qt = (query_triple[0], query_triple[1], None)
+            return set(x for x in self.next.triples_choices(qt, context) if in_range(x[2]))
+        subjects = query_triple[0]
+        p = query_triple[1]
+        if subjects:
+            subjects = set(subjects)
+            return set((x[0], p, x[1]) for x in pairs if x[0] in subjects)
+        return set((x[0], p, x[1]) for x in pairs)
+
+    def _range(self, query_triple):
+        p = query_triple[1]
+        if p is None or isinstance(p, list):
+            return None
+        in_range = query_triple[2]
+        return self.index.range(p, in_range.min_value, in_range.max_value)
+
+
+def _use_closure_index(graph, index):
+    """ Gives `index` to each :class:`ZeroOrMoreTQLayer` among the layers of
+    `graph` which doesn't have a closure index and which is over the graph
+    that `index` indexes """
+    if index is None:
+        return
+    layers = []
+    while isinstance(graph, TQLayer):
+        layers.append(graph)
+        graph = graph.next
+    if graph is not index.graph:
+        return
+    for layer in layers:
+        if isinstance(layer, ZeroOrMoreTQLayer) and layer.closure_index is None:
+            layer.closure_index = index
+
+
 class ZeroOrMoreTQLayer(TQLayer):
-    def __init__(self, transformer, *args):
+    def __init__(self, transformer, *args, **kwargs):
         '''
         Parameters
         ----------
@@ -435,10 +1157,15 @@ class ZeroOrMoreTQLayer(TQLayer):
             - `direction` is the direction of traversal: Either
               `yarom.rdfUtils.DOWN` for subject -> object or `yarom.rdfUtils.UP`
               for object -> subject
+        closure_index : yarom.closureIndex.ClosureIndex
+            Answers transitive lookups for the predicates it indexes, in place
+            of searching the graph. Only used for queries without a context.
+            Optional, keyword-only
         *args : other arguments
             Go to `TQLayer` init
         '''
-        super(ZeroOrMoreTQLayer, self).__init__(*args)
+        self.closure_index = kwargs.pop('closure_index', None)
+        super(ZeroOrMoreTQLayer, self).__init__(*args, **kwargs)
         self._tf = transformer
 
     def triples(self, query_triple, context=None):
@@ -446,25 +1173,21 @@ class ZeroOrMoreTQLayer(TQLayer):
         if not match:
             return self.next.triples(query_triple, context)
         qx = list(query_triple)
-        qx[i] = list(transitive_subjects(self.next,
-                                         match.identifier,
-                                         match.predicate,
-                                         context,
-                                         match.direction))
+        qx[i] = list(self._closure(match.identifier,
+                                   match.predicate,
+                                   context,
+                                   match.direction))
         return self._zom_result_helper(qx, match, i, context)
 
     def _zom_result_helper(self, qx, match, i, context):
         qx = tuple(qx)
-        zomses = dict()
         direction = DOWN if match.direction is UP else DOWN
         predicate = match.predicate
         L.debug('ZeroOrMoreTQLayer: start %s zoms %s', match, qx[i])
-        for tr in self.next.triples_choices(qx, context):
-            zoms = zomses.get(tr[i])
-            if zoms is None:
-                zoms = [sub for sub in transitive_subjects(self.next, tr[i], predicate, context, direction)]
-                zomses[tr[i]] = zoms
-            for z in zoms:
+        trs = list(self.next.triples_choices(qx, context))
+        zomses = self._closures(set(tr[i] for tr in trs), predicate, context, direction)
+        for tr in trs:
+            for z in zomses[tr[i]]:
                 yield tuple(x if x is not tr[i] else z for x in tr)
 
     def triples_choices(self, query_triple, context=None):
@@ -474,16 +1197,29 @@ class ZeroOrMoreTQLayer(TQLayer):
         qx = list(query_triple)
         iters = []
         # XXX: We should, maybe, apply some stats or heuristics here to determine which list to iterate over.
-        for sub in transitive_subjects(self.next,
-                                       match.identifier,
-                                       match.predicate,
-                                       context,
-                                       match.direction):
+        for sub in self._closure(match.identifier,
+                                 match.predicate,
+                                 context,
+                                 match.direction):
             qx[i] = sub
             iters.append(self.next.triples_choices(tuple(qx), context))
         ch = chain(*iters)
         return ch
 
+    def _closures(self, starts, predicate, context, direction):
+        if (self.closure_index is not None and context is None and
+                self.closure_index.indexes(predicate)):
+            return {start: self.closure_index.closure(start, predicate, direction)
+                    for start in starts}
+        return transitive_lookup_many(self.next, starts, predicate, context, direction)
+
+    def _closure(self, start, predicate, context, direction):
+        if self.closure_index is not None and context is None:
+            res = self.closure_index.closure(start, predicate, direction)
+            if res is not None:
+                return res
+        return transitive_subjects(self.next, start, predicate, context, direction)
+
     def __contains__(self, query_triple):
         try:
             next(self.triples(query_triple))
@@ -537,7 +1273,7 @@ class ComponentTripler(object):
                     yield x
 
     def recurse_upwards(self, current_node, depth):
-        for prop in current_node.owner_properties:
+        for prop in _walked_owner_properties(current_node):
             for x in self.recurse(prop.owner, prop, current_node, UP, depth):
                 yield x
 
@@ -667,7 +1403,7 @@ class _QueryPreparer(object):
                 self.seen.append(current_node)
             owner_parts = self.gather_paths_along_properties(
                 current_node,
-                current_node.owner_properties,
+                _walked_owner_properties(current_node),
                 UP)
             owned_parts = self.gather_paths_along_properties(
                 current_node,
@@ -685,11 +1421,326 @@ class _QueryPreparer(object):
 
     def __call__(self):
         x = self.prepare(self.start)
-        L.debug("self.prepare() result:" + str(x))
-        L.debug("_QueryPreparer paths:" + str(_format_paths(self.paths)))
+        if L.isEnabledFor(logging.DEBUG):
+            L.debug("self.prepare() result:" + str(x))
+            L.debug("_QueryPreparer paths:" + str(_format_paths(self.paths)))
         return self.paths
 
 
+class _Param(object):
+
+    """ Stands in for a constant in a query plan stored in a
+    :class:`QueryPlanCache` """
+
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __eq__(self, other):
+        return type(other) is _Param and other.index == self.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((_Param, self.index))
+
+    def __repr__(self):
+        return '_Param(' + repr(self.index) + ')'
+
+
+class _PlanTable(OrderedDict):
+
+    """ A path table whose hops are already in execution order """
+
+
+def _bind_hop(hop, constants):
+    return tuple(constants[x.index] if type(x) is _Param else x for x in hop)
+
+
+def _bind_plan(template, constants):
+    return _PlanTable((_bind_hop(hop, constants), _bind_plan(sub, constants))
+                      for hop, sub in template.items())
+
+
+class _QueryShape(object):
+
+    """ Computes the structural signature of a query graph.
+
+    The signature covers the links traversed, which nodes are defined, ranged
+    or undefined, and which of them are the same node. The identifiers of
+    defined nodes and the bounds of ranges are collected, in the order they're
+    encountered, in :attr:`constants`. Two query graphs with equal signatures
+    have the same path table up to the values of their constants.
+
+    Nodes are traversed in the same way as by :class:`_QueryPreparer`.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.constants = []
+        self.seen = list()
+        self.variables = dict()
+        self.const_index = dict()
+
+    def __call__(self):
+        return self.node(self.start)
+
+    def node(self, current_node):
+        if current_node in self.seen:
+            return None
+        self.seen.append(current_node)
+        edges = []
+        for this_property in _walked_owner_properties(current_node):
+            edge = self.edge(UP, this_property.link, this_property.owner)
+            if edge is not None:
+                edges.append(edge)
+        for this_property in current_node.properties:
+            for other in this_property.values:
+                edge = self.edge(DOWN, this_property.link, other)
+                if edge is not None:
+                    edges.append(edge)
+        self.seen.pop()
+        return tuple(edges)
+
+    def edge(self, direction, link, other):
+        if isinstance(other, InRange):
+            return (direction, link, 'c',
+                    self.const(other, _Range(other.min_value, other.max_value)), None)
+        elif other.defined:
+            return (direction, link, 'c', self.const(other, other.idl), None)
+
+        other_id = other.idl
+        var = self.variables.get(other_id)
+        if var is None:
+            var = Variable(len(self.variables))
+            self.variables[other_id] = var
+        sub = self.node(other)
+        if sub:
+            return (direction, link, 'v', var, sub)
+
+    def const(self, node, value):
+        idx = self.const_index.get(id(node))
+        if idx is None:
+            idx = len(self.constants)
+            self.const_index[id(node)] = idx
+            self.constants.append(value)
+        return idx
+
+    @classmethod
+    def path_table(cls, signature, target=None):
+        """ Creates the path table, as from
+        :meth:`GraphObjectQuerier.merge_paths`, for a signature with
+        :class:`_Param` objects in place of the constants """
+        res = dict()
+        for direction, link, kind, token, sub in signature:
+            if kind == 'c':
+                token = _Param(token)
+            if direction is UP:
+                hop = (token, link, None, target)
+            else:
+                hop = (None, link, token, target)
+            subtable = cls.path_table(sub, token) if sub else dict()
+            existing = res.get(hop)
+            if existing is None:
+                res[hop] = subtable
+            else:
+                _merge_tables(existing, subtable)
+        return res
+
+
+def _merge_tables(dst, src):
+    for hop, sub in src.items():
+        existing = dst.get(hop)
+        if existing is None:
+            dst[hop] = sub
+        else:
+            _merge_tables(existing, sub)
+
+
+class QueryPlanCache(object):
+
+    """ Stores query plans for :class:`GraphObjectQuerier` by the structure of
+    the query graph.
+
+    The least-recently used plan is evicted when the cache is full. Plans are
+    ordered according to the hop scores for the first query with a given
+    structure.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        Parameters
+        ----------
+        maxsize : int
+            The maximum number of plans to keep
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._plans = OrderedDict()
+
+    def get(self, signature):
+        """ Returns the plan stored for `signature` or `None` """
+        plan = self._plans.pop(signature, None)
+        if plan is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._plans[signature] = plan
+        return plan
+
+    def put(self, signature, plan):
+        """ Stores `plan` for queries having the given `signature` """
+        self._plans.pop(signature, None)
+        self._plans[signature] = plan
+        while len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """ Removes all stored plans """
+        self._plans.clear()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def __repr__(self):
+        return 'QueryPlanCache(maxsize={}, size={}, hits={}, misses={})'.format(
+            self.maxsize, len(self), self.hits, self.misses)
+
+
+class BatchGraphObjectQuerier(object):
+
+    """ Performs queries for many objects at once.
+
+    Queries with the same structure (see :class:`QueryPlanCache`) are
+    evaluated together: each hop is looked up once with ``triples_choices``
+    over the constants from all of the queries in the group, or over the
+    combined results of the hop's sub-query, and the matching terms are then
+    distributed back to each query. A batch of queries differing only in
+    their constants therefore makes about as many graph calls as a single
+    query.
+
+    Queries for objects which are already defined are checked individually,
+    as with :class:`GraphObjectQuerier`.
+    """
+
+    def __init__(self, queries, graph, hop_scorer=None, literal_index=None,
+                 closure_index=None):
+        """
+        Parameters
+        ----------
+        queries : list of GraphObject
+            The objects which are queried on
+        graph : object
+            The graph to query. See :class:`GraphObjectQuerier`
+        hop_scorer : callable
+            Scores hops for ordering. See :class:`GraphObjectQuerier`
+        literal_index : yarom.literalIndex.LiteralIndex
+            Index for range queries. See :class:`GraphObjectQuerier`
+        closure_index : yarom.closureIndex.ClosureIndex
+            Index for transitive lookups. See :class:`GraphObjectQuerier`
+        """
+        self.queries = list(queries)
+        _use_closure_index(graph, closure_index)
+        if literal_index is not None:
+            graph = LiteralIndexTQLayer(literal_index, graph)
+        self.graph = _default_tq_layers(graph)
+        self.hop_scorer = hop_scorer
+
+    def __call__(self):
+        """ Returns a list with the set of results for each query, in the
+        order the queries were given """
+        results = [EMPTY_SET] * len(self.queries)
+        groups = OrderedDict()
+        for i, q in enumerate(self.queries):
+            if q.defined:
+                if GraphObjectChecker(q, self.graph, hop_scorer=self.hop_scorer)():
+                    results[i] = set([q.identifier])
+                continue
+            shape = _QueryShape(q)
+            signature = shape()
+            if not signature:
+                continue
+            group = groups.get(signature)
+            if group is None:
+                group = groups[signature] = []
+            group.append((i, shape.constants))
+
+        for signature, members in groups.items():
+            table = _QueryShape.path_table(signature)
+            constants = dict(members)
+            L.debug("BatchGraphObjectQuerier: %s queries with the same structure",
+                    len(members))
+            for i, res in self._resolve(table, constants, [m[0] for m in members]).items():
+                results[i] = res
+        return results
+
+    def _resolve(self, table, constants, active):
+        """ Evaluates `table` for each of the queries in `active`, returning a
+        dict from query index to results. Queries with no results may be
+        left out """
+        running = None
+        for hop in self._hop_order(table, constants[active[0]]):
+            hop_results = self._hop(hop, table[hop], constants, active)
+            if running is None:
+                running = hop_results
+            else:
+                for i in active:
+                    running[i] &= hop_results.get(i, EMPTY_SET)
+            active = [i for i in active if running.get(i)]
+            if not active:
+                return dict()
+        return dict((i, running[i]) for i in active)
+
+    def _hop_order(self, table, constants):
+        if self.hop_scorer is None:
+            return list(table.keys())
+        return sorted(table.keys(),
+                      key=lambda h: self.hop_scorer(_bind_hop(h, constants)))
+
+    def _hop(self, hop, sub, constants, active):
+        idx = hop.index(None)
+        other_idx = 0 if (idx == 2) else 2
+        other = hop[other_idx]
+        if isinstance(other, Variable):
+            sub_results = self._resolve(sub, constants, active)
+            keys = dict((i, sub_results[i]) for i in active if i in sub_results)
+        else:
+            keys = dict((i, (constants[i][other.index],)) for i in active)
+
+        by_value = dict()
+        ranges = []
+        for i, values in keys.items():
+            for v in values:
+                if isinstance(v, _Range):
+                    ranges.append(v)
+                else:
+                    by_value[v] = set()
+
+        if by_value:
+            q = [None, hop[1], None]
+            q[other_idx] = list(by_value.keys())
+            for t in self.graph.triples_choices(tuple(q)):
+                by_value[t[other_idx]].add(t[idx])
+
+        for r in ranges:
+            q = [None, hop[1], None]
+            q[other_idx] = r
+            by_value[r] = set(t[idx] for t in self.graph.triples(tuple(q)))
+
+        res = dict()
+        for i, values in keys.items():
+            s = set()
+            for v in values:
+                s.update(by_value[v])
+            res[i] = s
+        return res
+
+
 class DescendantTripler(object):
 
     """ Gets triples that the object points to, optionally transitively. """
@@ -795,7 +1846,7 @@ class LegendFinder(object):
                 for _ in self.graph.triples((None, None, o.idl)):
                     i += 1
             else:
-                for prop in o.owner_properties:
+                for prop in _walked_owner_properties(o):
                     if prop.owner.defined:
                         i += 1
             return i
@@ -880,7 +1931,7 @@ class ReferenceTripler(object):
                         if val.defined:
                             self.results.add((o.idl, e.link, val.idl))
 
-            for e in o.owner_properties:
+            for e in _walked_owner_properties(o):
                 if (UP, id(e)) not in self.seen_edges:
                     self.seen_edges.add((UP, id(e)))
                     if e.owner.defined:
@@ -0,0 +1,211 @@
+from __future__ import division
+import logging
+from collections import Counter
+
+from .graphObject import Variable, _Range
+
+L = logging.getLogger(__name__)
+
+__all__ = ["GraphStatistics",
+           "PredicateStatistics",
+           "StatisticsHopScorer"]
+
+
+class PredicateStatistics(object):
+
+    """ Summary statistics for the triples having a single predicate """
+
+    __slots__ = ('predicate',
+                 'count',
+                 'distinct_subjects',
+                 'distinct_objects',
+                 'object_frequencies',
+                 '_untracked_count',
+                 '_untracked_distinct')
+
+    def __init__(self, predicate, count, distinct_subjects, distinct_objects,
+                 object_frequencies):
+        self.predicate = predicate
+        self.count = count
+        self.distinct_subjects = distinct_subjects
+        self.distinct_objects = distinct_objects
+        self.object_frequencies = object_frequencies
+        self._untracked_count = count - sum(object_frequencies.values())
+        self._untracked_distinct = distinct_objects - len(object_frequencies)
+
+    def subjects_for_object(self, o):
+        """ Estimate the number of subjects related to the object `o` """
+        freq = self.object_frequencies.get(o)
+        if freq is not None:
+            return freq
+        if self._untracked_distinct > 0:
+            return self._untracked_count / self._untracked_distinct
+        return 0
+
+    def objects_for_subject(self, s):
+        """ Estimate the number of objects related to the subject `s` """
+        if self.distinct_subjects > 0:
+            return self.count / self.distinct_subjects
+        return 0
+
+    def __repr__(self):
+        return ('PredicateStatistics({!r}, count={}, distinct_subjects={},'
+                ' distinct_objects={})').format(self.predicate,
+                                                self.count,
+                                                self.distinct_subjects,
+                                                self.distinct_objects)
+
+
+class GraphStatistics(object):
+
+    """ Collects per-predicate statistics over a graph for estimating the
+    selectivity of query hops.
+
+    Statistics for a predicate are gathered the first time they're asked for
+    and kept until enough statements with that predicate have been modified,
+    as reported through :meth:`note_modified`.
+    """
+
+    def __init__(self, graph, tracked_values=64, refresh_fraction=0.2,
+                 refresh_minimum=100):
+        """
+        Parameters
+        ----------
+        graph : rdflib.graph.Graph
+            The graph to collect statistics over. Must implement ``triples``
+        tracked_values : int
+            The number of most-frequent object values for which exact counts
+            are kept for each predicate
+        refresh_fraction : float
+            The fraction of a predicate's statements which must be modified
+            before its statistics are collected again
+        refresh_minimum : int
+            The minimum number of modifications before statistics for a
+            predicate are collected again
+        """
+        self.graph = graph
+        self.tracked_values = tracked_values
+        self.refresh_fraction = refresh_fraction
+        self.refresh_minimum = refresh_minimum
+        self._stats = dict()
+        self._modifications = dict()
+
+    def predicate_statistics(self, predicate, collect=True):
+        """ Returns the :class:`PredicateStatistics` for `predicate`,
+        collecting them from the graph if needed.
+
+        If `collect` is `False`, the statistics are only returned if they've
+        already been collected, even if they're stale, and `None` is returned
+        otherwise
+        """
+        stats = self._stats.get(predicate)
+        if not collect:
+            return stats
+        if stats is None or self._stale(stats):
+            stats = self._collect(predicate)
+            self._stats[predicate] = stats
+            self._modifications.pop(predicate, None)
+        return stats
+
+    def _stale(self, stats):
+        mods = self._modifications.get(stats.predicate, 0)
+        return mods > max(self.refresh_minimum,
+                          self.refresh_fraction * stats.count)
+
+    def _collect(self, predicate):
+        count = 0
+        subjects = set()
+        objects = Counter()
+        for s, _, o in self.graph.triples((None, predicate, None)):
+            count += 1
+            subjects.add(s)
+            objects[o] += 1
+        stats = PredicateStatistics(predicate,
+                                    count,
+                                    len(subjects),
+                                    len(objects),
+                                    dict(objects.most_common(self.tracked_values)))
+        L.debug('Collected %s', stats)
+        return stats
+
+    def note_modified(self, predicate_counts=None):
+        """ Record that statements with the given predicates have been added
+        or removed.
+
+        Parameters
+        ----------
+        predicate_counts : dict
+            Maps the predicates of the modified statements to the number of
+            statements modified. If `None`, all statistics are dropped
+        """
+        if predicate_counts is None:
+            self._stats.clear()
+            self._modifications.clear()
+            return
+        mods = self._modifications
+        for p, n in predicate_counts.items():
+            mods[p] = mods.get(p, 0) + n
+
+    def estimate(self, hop, collect=True):
+        """ Estimate the number of terms resulting from the given hop.
+
+        Parameters
+        ----------
+        hop : tuple
+            A (subject, predicate, object, target) four-tuple as handled by
+            :class:`~yarom.graphObject.GraphObjectQuerier`
+        collect : bool
+            If `False`, only statistics which have already been collected are
+            used
+
+        Returns
+        -------
+        float
+            The estimated number of terms matched by the hop, or `None` if
+            `collect` is `False` and there are no statistics for the hop's
+            predicate
+        """
+        stats = self.predicate_statistics(hop[1], collect)
+        if stats is None:
+            return None
+        idx = hop.index(None)
+        other = hop[2] if idx == 0 else hop[0]
+        if isinstance(other, Variable):
+            return stats.count
+        elif isinstance(other, _Range):
+            if other.defined:
+                return stats.count / 3
+            return stats.count
+        elif idx == 0:
+            return stats.subjects_for_object(other)
+        else:
+            return stats.objects_for_subject(other)
+
+    def __repr__(self):
+        return 'GraphStatistics(' + repr(self.graph) + ')'
+
+
+class StatisticsHopScorer(object):
+
+    """ A hop scorer for :class:`~yarom.graphObject.GraphObjectQuerier` which
+    orders hops by their estimated result sizes """
+
+    #: Indicates to the querier that scores are estimated result sizes
+    estimates_size = True
+
+    def __init__(self, statistics):
+        """
+        Parameters
+        ----------
+        statistics : GraphStatistics
+            Statistics for the graph being queried
+        """
+        self.statistics = statistics
+
+    def __call__(self, hop):
+        return self.statistics.estimate(hop)
+
+    def known(self, hop):
+        """ Scores `hop` with the statistics already collected, without
+        reading the graph. Returns `None` if there are none for the hop """
+        return self.statistics.estimate(hop, collect=False)
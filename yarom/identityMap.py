@@ -0,0 +1,118 @@
+import logging
+import weakref
+from collections import OrderedDict
+
+L = logging.getLogger(__name__)
+
+__all__ = ["IdentityMap"]
+
+
+class IdentityMap(object):
+
+    """ Maps (identifier, class) pairs to the objects made for them, so that
+    loading the same identifier as the same class again returns the same
+    object.
+
+    Objects are held by weak references, so an object is forgotten once
+    nothing else refers to it. Optionally, the most recently used objects are
+    also held strongly, so that they survive between loads which don't keep
+    them.
+
+    Used by :meth:`yarom.mapper.Mapper.oid`. Objects for identifiers in
+    retracted statements are discarded by :meth:`remove`, which
+    :class:`~yarom.dataUser.DataUser` calls when statements are removed
+    through yarom.
+    """
+
+    def __init__(self, strong_size=0):
+        """
+        Parameters
+        ----------
+        strong_size : int
+            The number of most recently used objects to hold strongly
+        """
+        self.strong_size = strong_size
+        # Maps each identifier to weak references to its objects by class, so
+        # the objects for an identifier are found without scanning the map
+        self._objects = dict()
+        self._recent = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        def _collected(ref, key, selfref=weakref.ref(self)):
+            s = selfref()
+            if s is not None:
+                s._forget_ref(key, ref)
+        self._collected = _collected
+
+    def get(self, identifier, cls):
+        """ Returns the object for `identifier` and `cls` or `None` if there
+        isn't one """
+        ref = self._objects.get(identifier, _NO_OBJECTS).get(cls)
+        o = None if ref is None else ref()
+        if o is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._use((identifier, cls), o)
+        return o
+
+    def put(self, identifier, cls, o):
+        """ Records `o` as the object for `identifier` and `cls` """
+        key = (identifier, cls)
+        collected = self._collected
+        ref = weakref.ref(o, lambda ref: collected(ref, key))
+        self._objects.setdefault(identifier, dict())[cls] = ref
+        self._use(key, o)
+
+    def _forget_ref(self, key, ref):
+        identifier, cls = key
+        refs = self._objects.get(identifier)
+        if refs is not None and refs.get(cls) is ref:
+            del refs[cls]
+            if not refs:
+                del self._objects[identifier]
+
+    def _use(self, key, o):
+        if self.strong_size <= 0:
+            return
+        recent = self._recent
+        if key in recent:
+            del recent[key]
+        recent[key] = o
+        while len(recent) > self.strong_size:
+            recent.popitem(last=False)
+
+    def discard(self, identifier):
+        """ Forgets the objects for `identifier`, for any class """
+        refs = self._objects.pop(identifier, None)
+        if refs is not None and self._recent:
+            for cls in refs:
+                self._recent.pop((identifier, cls), None)
+
+    def add(self, triples):
+        """ Notes that statements were added. Objects don't hold statements
+        from the graph, so nothing is forgotten """
+
+    def remove(self, triples):
+        """ Forgets the objects for the subjects and objects of removed
+        statements """
+        for s, _, o in triples:
+            self.discard(s)
+            self.discard(o)
+
+    def clear(self):
+        """ Forgets all objects """
+        self._objects.clear()
+        self._recent.clear()
+
+    def __len__(self):
+        return sum(1 for refs in self._objects.values()
+                   for ref in refs.values() if ref() is not None)
+
+    def __repr__(self):
+        return 'IdentityMap(objects={}, strong={}, hits={}, misses={})'.format(
+            len(self), len(self._recent), self.hits, self.misses)
+
+
+_NO_OBJECTS = dict()
@@ -0,0 +1,213 @@
+import logging
+import numbers
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+from rdflib.term import Identifier, Literal
+
+L = logging.getLogger(__name__)
+
+__all__ = ["LiteralIndex"]
+
+
+class _Column(object):
+
+    """ The values of one kind for a predicate, in sorted order, with the
+    (subject, object) pairs they come from.
+
+    Added and removed entries are buffered and merged into the sorted lists
+    when the column is next read, so adding many values costs one sort rather
+    than a list insertion for each.
+    """
+
+    __slots__ = ('keys', 'entries', '_added', '_removed')
+
+    def __init__(self, rows):
+        rows.sort(key=itemgetter(0))
+        self.keys = [r[0] for r in rows]
+        self.entries = [(r[1], r[2]) for r in rows]
+        self._added = dict()
+        self._removed = set()
+
+    def range(self, lo, hi):
+        self._merge()
+        i = 0 if lo is None else bisect_right(self.keys, lo)
+        j = len(self.keys) if hi is None else bisect_left(self.keys, hi)
+        return self.entries[i:j]
+
+    def add(self, key, entry):
+        if entry in self._removed:
+            self._removed.discard(entry)
+        elif not self._sorted_has(key, entry):
+            self._added[entry] = key
+
+    def remove(self, key, entry):
+        if entry in self._added:
+            del self._added[entry]
+        elif self._sorted_has(key, entry):
+            self._removed.add(entry)
+
+    def _sorted_has(self, key, entry):
+        i = bisect_left(self.keys, key)
+        j = bisect_right(self.keys, key, i)
+        return entry in self.entries[i:j]
+
+    def _merge(self):
+        if not (self._added or self._removed):
+            return
+        removed = self._removed
+        rows = [r for r in zip(self.keys, self.entries) if r[1] not in removed]
+        rows.extend((key, entry) for entry, key in self._added.items())
+        rows.sort(key=itemgetter(0))
+        self.keys = [r[0] for r in rows]
+        self.entries = [r[1] for r in rows]
+        self._added = dict()
+        self._removed = set()
+
+
+class LiteralIndex(object):
+
+    """ A secondary index of the literal values for each predicate in a
+    graph, kept in sorted order so that the statements with values in a range
+    can be found by bisection.
+
+    Values are grouped by kind: numbers of any datatype are compared with
+    each other, and other values are compared only with values of the same
+    Python type, after conversion with :meth:`rdflib.term.Literal.toPython`.
+
+    The index for a predicate is built from the graph the first time it's
+    asked for. After that, it must be kept current with :meth:`add` and
+    :meth:`remove`, or dropped with :meth:`clear`. Within yarom, this is done
+    by :class:`~yarom.dataUser.DataUser` and :func:`yarom.loadData`.
+    """
+
+    def __init__(self, graph):
+        """
+        Parameters
+        ----------
+        graph : rdflib.graph.Graph
+            The graph to index. Must implement ``triples``
+        """
+        self.graph = graph
+        self._columns = dict()
+
+    def range(self, predicate, min_value=None, max_value=None):
+        """ Returns the (subject, object) pairs for statements with
+        `predicate` whose objects are strictly between `min_value` and
+        `max_value`.
+
+        Either bound may be `None`. Returns `None` if the index can't answer
+        the query because the bounds can't be compared with each other or the
+        values of their kind can't be ordered.
+        """
+        lo = _sort_key(min_value) if min_value is not None else None
+        hi = _sort_key(max_value) if max_value is not None else None
+        if lo is None and hi is None:
+            return None
+        if lo is not None and hi is not None and lo[0] != hi[0]:
+            return None
+        kind = (lo or hi)[0]
+        columns = self._predicate_columns(predicate)
+        if kind not in columns:
+            return []
+        column = columns[kind]
+        if column is None:
+            return None
+        try:
+            return column.range(None if lo is None else lo[1],
+                                None if hi is None else hi[1])
+        except TypeError:
+            L.warning('Values of %s for %s are not orderable.'
+                      ' They will not be indexed', kind, predicate)
+            columns[kind] = None
+            return None
+
+    def _predicate_columns(self, predicate):
+        columns = self._columns.get(predicate)
+        if columns is None:
+            columns = self._build(predicate)
+            self._columns[predicate] = columns
+        return columns
+
+    def _build(self, predicate):
+        rows = dict()
+        for s, _, o in self.graph.triples((None, predicate, None)):
+            key = _sort_key(o)
+            if key is not None:
+                rows.setdefault(key[0], []).append((key[1], s, o))
+        columns = dict()
+        for kind, kind_rows in rows.items():
+            try:
+                columns[kind] = _Column(kind_rows)
+            except TypeError:
+                L.warning('Values of %s for %s are not orderable.'
+                          ' They will not be indexed', kind, predicate)
+                columns[kind] = None
+        L.debug('Indexed %s values for %s', sum(len(r) for r in rows.values()), predicate)
+        return columns
+
+    def add(self, triples):
+        """ Adds statements to the index for predicates which have been
+        indexed """
+        for s, p, o in triples:
+            columns = self._columns.get(p)
+            if columns is None:
+                continue
+            key = _sort_key(o)
+            if key is None:
+                continue
+            if key[0] not in columns:
+                columns[key[0]] = _Column([(key[1], s, o)])
+            else:
+                column = columns[key[0]]
+                if column is not None:
+                    try:
+                        column.add(key[1], (s, o))
+                    except TypeError:
+                        columns[key[0]] = None
+
+    def remove(self, triples):
+        """ Removes statements from the index """
+        for s, p, o in triples:
+            columns = self._columns.get(p)
+            if columns is None:
+                continue
+            key = _sort_key(o)
+            if key is None:
+                continue
+            column = columns.get(key[0])
+            if column is not None:
+                if (s, p, o) in self.graph:
+                    # Still present, for instance, in another context
+                    continue
+                try:
+                    column.remove(key[1], (s, o))
+                except TypeError:
+                    columns[key[0]] = None
+
+    def clear(self):
+        """ Drops the index for all predicates. They will be rebuilt as
+        needed """
+        self._columns.clear()
+
+    def __repr__(self):
+        return 'LiteralIndex(' + repr(self.graph) + ')'
+
+
+def _sort_key(term):
+    """ Returns the kind of value and the value to sort by for a term, or
+    `None` if the term isn't indexed """
+    if isinstance(term, Literal):
+        value = term.toPython()
+        if isinstance(value, Literal):
+            return None
+    elif isinstance(term, Identifier):
+        return None
+    else:
+        value = term
+
+    if isinstance(value, bool):
+        return (bool, value)
+    elif isinstance(value, numbers.Number) and not isinstance(value, complex):
+        return ('number', value)
+    return (type(value), value)
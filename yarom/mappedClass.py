@@ -193,6 +193,7 @@ class MappedClass(type):
         """
         L.debug("UNMAPPING %s", cls.__name__)
         del cls.mapper.RDFTypeTable[cls.__rdf_type]
+        cls.mapper._update_type_ranks()
         # XXX: What else to do here?
 
     def _remove_namespace_from_manager(cls):
@@ -255,7 +256,14 @@ class MappedClass(type):
                             **x)
                 else:
                     p = _create_property(cls, x, propType)
+                if any(x.linkName == p.linkName for x in cls.dataObjectProperties):
+                    raise Exception(
+                        "Cannot attach property '{}'. A property must have a"
+                        " different name from any attributes in"
+                        " DataObject".format(p.linkName))
                 cls.dataObjectProperties.append(p)
+                if not hasattr(cls, p.linkName):
+                    setattr(cls, p.linkName, PropertyAttribute(p))
             setattr(cls, '_' + listName, propList)
             setattr(cls, listName, [])
 
@@ -274,6 +282,29 @@ class MappedClass(type):
         cls.du.rdf.update(q)
 
 
+class PropertyAttribute(object):
+
+    """ A class attribute for a property declared on a MappedClass.
+
+    The property is attached to an object the first time the attribute is
+    accessed on it, so objects only pay for the properties they use. After
+    that, the attached property is found on the object itself.
+    """
+
+    __slots__ = ('prop',)
+
+    def __init__(self, prop):
+        self.prop = prop
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.attachProperty(self.prop)
+
+    def __repr__(self):
+        return 'PropertyAttribute({})'.format(self.prop.__name__)
+
+
 def _create_property(
         owner_type,
         linkName,
@@ -4,6 +4,7 @@ import logging
 import rdflib as R
 import yarom
 from itertools import count
+from collections import OrderedDict
 from .rdfTypeResolver import RDFTypeResolver
 from six import with_metaclass
 from .mapperUtils import parents_str
@@ -31,6 +32,9 @@ class MapperMeta(type):
 class Mapper(with_metaclass(MapperMeta, object)):
     _instances = dict()
 
+    #: The number of results from :meth:`get_most_specific_rdf_type` to keep
+    most_specific_type_cache_size = 1024
+
     @classmethod
     def get_instance(cls, *args):
         if args not in cls._instances:
@@ -90,8 +94,13 @@ class Mapper(with_metaclass(MapperMeta, object)):
         self.imported_mappers = imported
 
         self.loading_module = None
+        self._most_specific_types = OrderedDict()
         self.class_ordering = dict()
 
+        """ Optional :class:`~yarom.identityMap.IdentityMap` consulted by
+        :meth:`oid` """
+        self.identity_map = None
+
     def decorate_class(self, cls):
         return cls
 
@@ -140,6 +149,27 @@ class Mapper(with_metaclass(MapperMeta, object)):
         self.class_ordering = self._compute_class_ordering()
         return True
 
+    @property
+    def class_ordering(self):
+        """ Maps class names to their position in a walk of the class
+        hierarchy from the base classes, so that sub-classes come after their
+        super-classes """
+        return self._class_ordering
+
+    @class_ordering.setter
+    def class_ordering(self, ordering):
+        self._class_ordering = ordering
+        self._update_type_ranks()
+
+    def _update_type_ranks(self):
+        """ Recomputes the position in :attr:`class_ordering` for each RDF
+        type in :attr:`RDFTypeTable` and forgets the results of
+        :meth:`get_most_specific_rdf_type` """
+        ordering = self._class_ordering
+        self._type_ranks = {rdf_type: (ordering.get(FCN(cls)), cls)
+                            for rdf_type, cls in self.RDFTypeTable.items()}
+        self._most_specific_types.clear()
+
     def remap(self):
         """ Calls `map` on all of the registered classes """
         classes = set(self.MappedClasses.values())
@@ -374,7 +404,8 @@ class Mapper(with_metaclass(MapperMeta, object)):
 
         Returns
         -------
-           The newly created object
+           The newly created object or, if :attr:`identity_map` is set, the
+           object previously made for the identifier and type
 
         """
         L.debug("%s identifier or rdf type", identifier_or_rdf_type)
@@ -389,7 +420,14 @@ class Mapper(with_metaclass(MapperMeta, object)):
         # if there's a part after that, that's the property name
         o = None
         if identifier:
-            o = c(ident=identifier)
+            im = self.identity_map
+            if im is not None:
+                o = im.get(identifier, c)
+                if o is None:
+                    o = c(ident=identifier)
+                    im.put(identifier, c, o)
+            else:
+                o = c(ident=identifier)
         else:
             o = c(generate_key=True)
         return o
@@ -408,16 +446,41 @@ class Mapper(with_metaclass(MapperMeta, object)):
 
         Returns the URI corresponding to the lowest in the class hierarchy from
         among the given URIs.
+
+        Results are kept for the most recent
+        :attr:`most_specific_type_cache_size` sets of types and forgotten
+        when :attr:`class_ordering` changes.
         """
+        key = frozenset(types)
+        cache = self._most_specific_types
+        res = cache.pop(key, None)
+        if res is None:
+            res = self._most_specific_rdf_type(key)
+            if self.most_specific_type_cache_size <= 0:
+                return res
+            while len(cache) >= self.most_specific_type_cache_size:
+                cache.popitem(last=False)
+        cache[key] = res
+        return res
+
+    def _most_specific_rdf_type(self, types):
         # TODO: Use the MappedClasses and DataObjectsParents to get the root
         least = self.base_classes[self.base_class_names[0]]
+        ranks = self._type_ranks
+        least_rank = self.class_ordering.get(FCN(least))
         for x in types:
-            try:
-                xtype = self.RDFTypeTable[x]
-                if self.compare_types(xtype, least) > 0:
-                    least = self.RDFTypeTable[x]
-            except KeyError:
-                pass
+            rank_cls = ranks.get(x)
+            if rank_cls is None:
+                continue
+            rank, xtype = rank_cls
+            if rank is None or least_rank is None:
+                missing = xtype if rank is None else least
+                raise Exception(
+                    "The given type is not in the class ordering: " +
+                    repr(FCN(missing)))
+            if rank > least_rank:
+                least = xtype
+                least_rank = rank
         return least.rdf_type
 
     def lookup_class(self, cname):
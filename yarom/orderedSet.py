@@ -0,0 +1,195 @@
+import sys
+import weakref
+from collections import OrderedDict
+from itertools import count
+
+__all__ = ["OrderedSet", "IdentityOrderedSet", "IdentityOrderedBag",
+           "WeakIdentityOrderedSet"]
+
+if sys.version_info >= (3, 7):
+    _ordered_dict = dict
+else:
+    _ordered_dict = OrderedDict
+
+
+class OrderedSet(object):
+
+    """ A collection which iterates over its elements in the order they were
+    added, like a list, but which has constant-time membership tests,
+    insertion and removal.
+
+    Elements which are equal to one already in the set are not added again.
+    As with a dict, the set must not be changed while iterating over it.
+    """
+
+    __slots__ = ('_d',)
+
+    def __init__(self, iterable=()):
+        self._d = _ordered_dict()
+        for x in iterable:
+            self.append(x)
+
+    def _key(self, x):
+        return x
+
+    def append(self, x):
+        """ Adds `x` to the end of the set if it isn't already in the set """
+        k = self._key(x)
+        if k not in self._d:
+            self._d[k] = x
+
+    add = append
+
+    def remove(self, x):
+        """ Removes the element in the set for `x`
+
+        Raises
+        ------
+        ValueError
+            If there is no such element
+        """
+        try:
+            del self._d[self._key(x)]
+        except KeyError:
+            raise ValueError("{!r} is not in the set".format(x))
+
+    def discard(self, x):
+        """ Removes the element in the set for `x` if there is one """
+        self._d.pop(self._key(x), None)
+
+    def clear(self):
+        self._d.clear()
+
+    def __contains__(self, x):
+        return self._key(x) in self._d
+
+    def __iter__(self):
+        return iter(self._d.values())
+
+    def __len__(self):
+        return len(self._d)
+
+    def __bool__(self):
+        return len(self._d) > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self._d.values()))
+
+
+class IdentityOrderedSet(OrderedSet):
+
+    """ An :class:`OrderedSet` which compares its elements by identity rather
+    than by equality, so equal objects are distinct elements and elements
+    needn't be hashable.
+    """
+
+    __slots__ = ()
+
+    def _key(self, x):
+        return id(x)
+
+
+class IdentityOrderedBag(object):
+
+    """ A collection which iterates over its elements in the order they were
+    added, like a list, and may hold an element more than once, but which
+    has constant-time membership tests, insertion and removal.
+
+    Elements are compared by identity rather than by equality, so equal
+    objects are distinct elements and elements needn't be hashable. As with
+    a dict, the bag must not be changed while iterating over it.
+    """
+
+    __slots__ = ('_d', '_tokens', '_count')
+
+    def __init__(self, iterable=()):
+        self._d = _ordered_dict()
+        # Maps the id of each element to the keys in `_d` for its occurrences
+        self._tokens = dict()
+        self._count = count()
+        for x in iterable:
+            self.append(x)
+
+    def append(self, x):
+        """ Adds `x` to the end of the bag """
+        token = next(self._count)
+        self._d[token] = x
+        self._tokens.setdefault(id(x), []).append(token)
+
+    def remove(self, x):
+        """ Removes the first occurrence of `x`
+
+        Raises
+        ------
+        ValueError
+            If `x` is not in the bag
+        """
+        tokens = self._tokens.get(id(x))
+        if tokens is None:
+            raise ValueError("{!r} is not in the bag".format(x))
+        del self._d[tokens.pop(0)]
+        if not tokens:
+            del self._tokens[id(x)]
+
+    def clear(self):
+        self._d.clear()
+        self._tokens.clear()
+
+    def __contains__(self, x):
+        return id(x) in self._tokens
+
+    def __iter__(self):
+        return iter(self._d.values())
+
+    def __len__(self):
+        return len(self._d)
+
+    def __bool__(self):
+        return len(self._d) > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self._d.values()))
+
+
+class WeakIdentityOrderedSet(IdentityOrderedSet):
+
+    """ An :class:`IdentityOrderedSet` which holds its elements by weak
+    references.
+
+    An element is dropped from the set once nothing else refers to it.
+    """
+
+    __slots__ = ('_remove', '__weakref__')
+
+    def __init__(self, iterable=()):
+        def _remove(ref, selfref=weakref.ref(self)):
+            s = selfref()
+            if s is not None and s._d.get(ref.key) is ref:
+                del s._d[ref.key]
+        self._remove = _remove
+        super(WeakIdentityOrderedSet, self).__init__(iterable)
+
+    def append(self, x):
+        k = id(x)
+        if k not in self._d:
+            self._d[k] = weakref.KeyedRef(x, self._remove, k)
+
+    add = append
+
+    def __contains__(self, x):
+        ref = self._d.get(id(x))
+        return ref is not None and ref() is x
+
+    def __iter__(self):
+        for ref in list(self._d.values()):
+            x = ref()
+            if x is not None:
+                yield x
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, list(self))
+
@@ -46,31 +46,41 @@ class ObjectPropertyMixin(object):
         return super(ObjectPropertyMixin, self).set(v)
 
     def get(self):
-        for ident in super(ObjectPropertyMixin, self).get():
-            n = self.id2ob(ident)
+        for ident, types in self._value_types(super(ObjectPropertyMixin, self).get()):
+            n = self._types2ob(ident, types)
             if n:
                 yield n
 
     def id2ob(self, ident):
-        if not isinstance(ident, rdflib.URIRef):
-            L.warn(
-                'ObjectProperty.get: Skipping non-URI term, "' +
-                str(ident) +
-                '", returned for a DataObject.')
-            return None
-
-        types = set()
-        types.add(type(self).value_rdf_type)
+        for ident, types in self._value_types([ident]):
+            return self._types2ob(ident, types)
+        return None
+
+    def _value_types(self, idents):
+        """ Pairs each URI in `idents` with its rdf:types, looking up the
+        types for several identifiers at once """
+        idents = (ident for ident in idents if self._is_object_ident(ident))
         sup = super(ObjectPropertyMixin, self)
         if hasattr(sup, 'rdf'):
-            for rdf_type in sup.rdf.objects(
-                    ident, rdflib.RDF['type']):
-                types.add(rdf_type)
+            return sup._with_rdf_types(idents)
         else:
             L.warn('ObjectProperty.get: base type is missing an "rdf"'
                    ' property. Retrieved values will be created as ' +
                    str(type(self).value_rdf_type))
+            return ((ident, ()) for ident in idents)
 
+    def _is_object_ident(self, ident):
+        if not isinstance(ident, rdflib.URIRef):
+            L.warn(
+                'ObjectProperty.get: Skipping non-URI term, "' +
+                str(ident) +
+                '", returned for a DataObject.')
+            return False
+        return True
+
+    def _types2ob(self, ident, types):
+        types = set(types)
+        types.add(type(self).value_rdf_type)
         the_type = self.resolver.type_resolver(types)
         return self.resolver.id2ob(ident, the_type)
 
@@ -93,7 +103,8 @@ class UnionPropertyMixin(object):
         return super(UnionPropertyMixin, self).set(v)
 
     def get(self):
-        for ident in super(UnionPropertyMixin, self).get():
+        sup = super(UnionPropertyMixin, self)
+        for ident, types in sup._with_rdf_types(sup.get()):
             if isinstance(ident, rdflib.Literal):
                 yield self.resolver.deserializer(ident)
             elif isinstance(ident, rdflib.BNode):
@@ -102,10 +113,6 @@ class UnionPropertyMixin(object):
                     ident +
                     '". BNodes are not supported in yarom')
             else:
-                types = set()
-                rdf = super(UnionPropertyMixin, self).rdf
-                for rdf_type in rdf.objects(ident, rdflib.RDF['type']):
-                    types.add(rdf_type)
                 L.debug("{} <- types, {} <- ident".format(types, ident))
                 the_type = self.resolver.base_type
                 if len(types) == 0:
@@ -1,6 +1,7 @@
 from rdflib.term import Literal, bind, Identifier, URIRef
 import six
 from .quantity import Quantity
+from .orderedSet import IdentityOrderedSet
 from json import loads, dumps
 
 bind(URIRef('http://markw.cc/yarom/schema/datatype/list'),
@@ -26,7 +27,7 @@ class PropertyValue(object):
 
     def __init__(self, value):
         self.properties = []
-        self.owner_properties = []
+        self.owner_properties = IdentityOrderedSet()
         if not isinstance(value, Identifier):
             self.value = Literal(value)
         else:
@@ -0,0 +1,201 @@
+from __future__ import print_function
+from timeit import default_timer
+import six
+
+__all__ = ["QueryExplanation",
+           "JoinExplanation",
+           "HopExplanation"]
+
+
+class HopExplanation(object):
+
+    """ Describes one hop of a query executed by
+    :class:`~yarom.graphObject.GraphObjectQuerier`
+
+    Attributes
+    ----------
+    hop : tuple
+        The (subject, predicate, object, target) four-tuple for the hop
+    estimate : float
+        The score given to the hop by the querier's hop scorer. For a
+        :class:`~yarom.graphStatistics.StatisticsHopScorer`, this is the
+        estimated number of terms matched by the hop. `None` if there is no
+        hop scorer
+    actual : int
+        The number of distinct terms matched by the hop. `None` unless
+        the query was analyzed
+    calls : dict
+        Maps the name of a graph method (``triples``, ``triples_choices``,
+        ``__contains__``) to the number of times it was called for this hop,
+        excluding calls made for the sub-query
+    time : float
+        Wall time in seconds for the hop, including its sub-query. `None`
+        unless the query was analyzed
+    subquery : JoinExplanation
+        The query for the terms on the other side of the hop, or `None` if the
+        other side is a constant
+    """
+
+    def __init__(self, hop, estimate=None):
+        self.hop = hop
+        self.estimate = estimate
+        self.actual = None
+        self.calls = dict()
+        self.time = None
+        self.subquery = None
+
+    def describe(self):
+        """ Returns a single-line description of the hop """
+        idx = self.hop.index(None)
+        other_idx = 0 if (idx == 2) else 2
+        direction = '' if idx == 2 else '^'
+        res = str(self.hop[1]) + direction + '->' + str(self.hop[other_idx])
+        if self.estimate is not None:
+            res += ' est={:g}'.format(self.estimate)
+        if self.actual is not None:
+            res += ' actual={}'.format(self.actual)
+        if self.calls:
+            res += ' ' + _format_calls(self.calls)
+        if self.time is not None:
+            res += ' time={:.3f}ms'.format(self.time * 1000)
+        return res
+
+
+class JoinExplanation(object):
+
+    """ Describes the hops which are evaluated and joined to get the terms for
+    one node of the query
+
+    Attributes
+    ----------
+    hops : list of HopExplanation
+        The hops in the order they were (or would be) executed
+    join_sizes : list of int
+        The number of terms from each hop going into the join. `None` unless
+        the query was analyzed
+    result_size : int
+        The number of terms resulting from the join. `None` unless the query
+        was analyzed
+    """
+
+    def __init__(self):
+        self.hops = []
+        self.join_sizes = None
+        self.result_size = None
+
+    def _format(self, sio, depth):
+        indent = depth * 4 * ' '
+        if self.result_size is not None:
+            print(indent + 'Join sizes={} result={}'.format(self.join_sizes,
+                                                             self.result_size),
+                  file=sio)
+        for hop in self.hops:
+            print(indent + '-> ' + hop.describe(), file=sio)
+            if hop.subquery is not None:
+                hop.subquery._format(sio, depth + 1)
+
+
+class QueryExplanation(object):
+
+    """ Describes how a query for a :class:`~yarom.graphObject.GraphObject`
+    is (or would be) performed.
+
+    Print the explanation to get a tree of the hops in execution order.
+
+    Attributes
+    ----------
+    query_object : GraphObject
+        The object queried on
+    analyzed : bool
+        Whether the query was actually executed
+    checked : bool
+        `True` if the query object was already defined, in which case the
+        query just checks that its triples are in the graph
+    join : JoinExplanation
+        The hops for the query object. `None` if `checked` is `True` or there
+        are no hops
+    result_size : int
+        The number of results. `None` unless the query was analyzed
+    time : float
+        Wall time in seconds for the query. `None` unless the query was
+        analyzed
+    calls : dict
+        Maps the name of a graph method to the number of times it was called
+        for the whole query
+    """
+
+    def __init__(self, query_object, analyzed=False):
+        self.query_object = query_object
+        self.analyzed = analyzed
+        self.checked = False
+        self.join = None
+        self.result_size = None
+        self.time = None
+        self.calls = dict()
+
+    def hop_order(self):
+        """ Returns the top-level hops in execution order """
+        if self.join is None:
+            return []
+        return [h.hop for h in self.join.hops]
+
+    def __str__(self):
+        sio = six.StringIO()
+        header = 'Query for ' + str(self.query_object)
+        if self.checked:
+            header += ' (defined; checking triples)'
+        if self.result_size is not None:
+            header += ' results={}'.format(self.result_size)
+        if self.calls:
+            header += ' ' + _format_calls(self.calls)
+        if self.time is not None:
+            header += ' time={:.3f}ms'.format(self.time * 1000)
+        print(header, file=sio)
+        if self.join is not None:
+            self.join._format(sio, 1)
+        return sio.getvalue()
+
+
+def _format_calls(calls):
+    return ' '.join('{}={}'.format(k, calls[k]) for k in sorted(calls))
+
+
+class _QueryTracer(object):
+
+    """ Records a :class:`QueryExplanation` while a query executes """
+
+    def __init__(self, explanation):
+        self.explanation = explanation
+        self.hops = []
+        self.joins = []
+
+    def begin_join(self):
+        join = JoinExplanation()
+        if self.hops:
+            self.hops[-1].subquery = join
+        else:
+            self.explanation.join = join
+        self.joins.append(join)
+
+    def end_join(self, join_sizes, result_size):
+        join = self.joins.pop()
+        join.join_sizes = join_sizes
+        join.result_size = result_size
+
+    def begin_hop(self, hop, estimate):
+        expl = HopExplanation(hop, estimate)
+        self.joins[-1].hops.append(expl)
+        self.hops.append(expl)
+        expl.time = default_timer()
+
+    def end_hop(self, actual):
+        expl = self.hops.pop()
+        expl.time = default_timer() - expl.time
+        expl.actual = actual
+
+    def count(self, method):
+        calls = self.explanation.calls
+        calls[method] = calls.get(method, 0) + 1
+        if self.hops:
+            calls = self.hops[-1].calls
+            calls[method] = calls.get(method, 0) + 1
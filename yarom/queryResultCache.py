@@ -0,0 +1,158 @@
+import logging
+from collections import OrderedDict
+
+L = logging.getLogger(__name__)
+
+__all__ = ["GraphVersion",
+           "QueryResultCache"]
+
+
+class GraphVersion(object):
+
+    """ Counts modifications to a graph, overall and for each predicate.
+
+    Only modifications which are reported through :meth:`bump` are counted.
+    Within yarom, these are the ones made through
+    :class:`~yarom.dataUser.DataUser` and :func:`yarom.loadData`.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._predicate_versions = dict()
+        self._reset_version = 0
+
+    def bump(self, predicates=None):
+        """ Record a modification to the graph.
+
+        Parameters
+        ----------
+        predicates : iterable
+            The predicates of the modified statements. If `None`, then any
+            statement may have been modified
+        """
+        self.version += 1
+        if predicates is None:
+            self._reset_version = self.version
+        else:
+            for p in predicates:
+                self._predicate_versions[p] = self.version
+
+    def predicate_version(self, predicate):
+        """ Returns the version at which statements with `predicate` were
+        last modified """
+        return max(self._predicate_versions.get(predicate, 0),
+                   self._reset_version)
+
+    def __repr__(self):
+        return 'GraphVersion({})'.format(self.version)
+
+
+class _Entry(object):
+
+    __slots__ = ('results', 'predicates', 'version')
+
+    def __init__(self, results, predicates, version):
+        self.results = results
+        self.predicates = predicates
+        self.version = version
+
+
+class QueryResultCache(object):
+
+    """ A least-recently-used cache of query results.
+
+    Results are stored with the predicates the query depends on and the
+    :class:`GraphVersion` at the time of the query. A result is discarded when
+    it's looked up if statements with any of its predicates have been
+    modified since then.
+
+    The size of the cache is bounded by the total number of result terms
+    stored, as a rough measure of memory use.
+    """
+
+    def __init__(self, max_terms=100000):
+        """
+        Parameters
+        ----------
+        max_terms : int
+            The maximum total number of result terms to store. Each stored
+            result also counts as one term
+        """
+        self.max_terms = max_terms
+        self._entries = OrderedDict()
+        self._terms = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, graph_version):
+        """ Returns the stored results for `key`, or `None` if there are none
+        or they are out of date with `graph_version` """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        for p in entry.predicates:
+            if graph_version.predicate_version(p) > entry.version:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+        del self._entries[key]
+        self._entries[key] = entry
+        self.hits += 1
+        return entry.results
+
+    def put(self, key, results, predicates, version):
+        """ Stores `results` for `key`.
+
+        Parameters
+        ----------
+        key : object
+            Hashable key for the query
+        results : frozenset
+            The results of the query
+        predicates : frozenset
+            The predicates the results depend on
+        version : int
+            The version of the graph that the query was executed on
+        """
+        size = len(results) + 1
+        if size > self.max_terms:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(results, predicates, version)
+        self._terms += size
+        while self._terms > self.max_terms:
+            _, entry = self._entries.popitem(last=False)
+            self._terms -= len(entry.results) + 1
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._terms -= len(entry.results) + 1
+
+    def clear(self):
+        """ Removes all stored results """
+        self._entries.clear()
+        self._terms = 0
+
+    @property
+    def hit_rate(self):
+        """ The fraction of lookups which found a current result """
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return ('QueryResultCache(entries={}, terms={}, hits={}, misses={},'
+                ' invalidations={}, evictions={})').format(len(self),
+                                                           self._terms,
+                                                           self.hits,
+                                                           self.misses,
+                                                           self.invalidations,
+                                                           self.evictions)
@@ -121,6 +121,206 @@ def transitive_lookup(graph, start, predicate, context=None, direction=DOWN, see
     return res
 
 
+def transitive_lookup_many(graph, starts, predicate, context=None, direction=DOWN,
+                           max_depth=None, depths=False):
+    '''
+    Do transitive lookups from several resources at once over an
+    `rdflib.graph.Graph` or `rdflib.store.Store`
+
+    The frontiers from all of `starts` are expanded together, with one
+    ``triples_choices`` call per step, so a resource reachable from more than
+    one start is only looked up once. Without a `max_depth`, the closure of
+    each resource is computed once from the closures of the resources it
+    reaches, and resources which reach each other share one closure.
+
+    Parameters
+    ----------
+    graph : rdflib.graph.Graph or rdflib.store.Store
+        The graph to query
+    starts : iterable of rdflib.term.Identifier
+        The resources in the graph to start from
+    predicate : rdflib.term.URIRef
+        The predicate relating terms in the closure
+    context : rdflib.graph.Graph or rdflib.term.URIRef
+        The context in which the query should run. Optional
+    direction : DOWN or UP
+        The direction in which to traverse
+    max_depth : int
+        The maximum number of `predicate` relationships to traverse from each
+        start. Optional
+    depths : bool
+        If true, return the distance of each resource in a closure from its
+        start. Optional
+
+    Returns
+    -------
+    dict
+        Maps each of `starts` to a frozenset of the resources in its closure
+        or, if `depths` is set, to a dict from each resource in its closure to
+        its distance from the start
+    '''
+    starts = set(starts)
+    roots = starts - _none_singleton_set
+    succ = dict()
+    seen = set(roots)
+    border = roots
+    depth = 0
+    while border and (max_depth is None or depth < max_depth):
+        new_border = set()
+        if direction is DOWN:
+            qx = (list(border), predicate, None)
+        else:
+            qx = (None, predicate, list(border))
+        for t in graph.triples_choices(qx, context=context):
+            if isinstance(t[0], tuple):
+                t = t[0]
+            if direction is DOWN:
+                a, b = t[0], t[2]
+            else:
+                a, b = t[2], t[0]
+            if b is None:
+                continue
+            succ.setdefault(a, set()).add(b)
+            if b not in seen:
+                seen.add(b)
+                new_border.add(b)
+        border = new_border
+        depth += 1
+
+    if max_depth is None and not depths:
+        closures = _component_closures(succ, roots)
+    else:
+        closures = dict()
+        for start in roots:
+            dist = _bfs_distances(succ, start, max_depth)
+            closures[start] = dist if depths else frozenset(dist)
+
+    res = dict()
+    for start in starts:
+        if start is None:
+            res[start] = dict() if depths else frozenset()
+        else:
+            res[start] = closures[start]
+    return res
+
+
+def _bfs_distances(succ, start, max_depth):
+    dist = {start: 0}
+    border = [start]
+    depth = 0
+    while border and (max_depth is None or depth < max_depth):
+        depth += 1
+        new_border = []
+        for n in border:
+            for m in succ.get(n, ()):
+                if m not in dist:
+                    dist[m] = depth
+                    new_border.append(m)
+        border = new_border
+    return dist
+
+
+def _component_closures(succ, roots):
+    ''' Computes closures for the strongly connected components reachable from
+    `roots`, in the order Tarjan's algorithm finds them, so the closures of
+    the components a component reaches are always available '''
+    index = dict()
+    low = dict()
+    stack = []
+    on_stack = set()
+    closures = dict()
+
+    def visit(n):
+        index[n] = low[n] = len(index)
+        stack.append(n)
+        on_stack.add(n)
+        return (n, iter(succ.get(n, ())))
+
+    for root in roots:
+        if root in index:
+            continue
+        work = [visit(root)]
+        while work:
+            node, itr = work[-1]
+            for m in itr:
+                if m not in index:
+                    work.append(visit(m))
+                    break
+                elif m in on_stack:
+                    low[node] = min(low[node], index[m])
+            else:  # no break
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        m = stack.pop()
+                        on_stack.discard(m)
+                        members.append(m)
+                        if m == node:
+                            break
+                    closure = set(members)
+                    for m in members:
+                        for x in succ.get(m, ()):
+                            c = closures.get(x)
+                            if c is not None:
+                                closure |= c
+                    closure = frozenset(closure)
+                    for m in members:
+                        closures[m] = closure
+    return closures
+
+
+def rdf_types_many(graph, idents, chunk_size=1000):
+    '''
+    Looks up the ``rdf:type`` values of resources in an `rdflib.graph.Graph`
+
+    `idents` are read `chunk_size` at a time and the types for each chunk are
+    looked up with one ``triples_choices`` call, so results are available
+    before all of `idents` have been read.
+
+    Parameters
+    ----------
+    graph : rdflib.graph.Graph
+        The graph to query
+    idents : iterable of rdflib.term.Identifier
+        The resources to get types for. Only URIs are looked up; other terms
+        are given no types
+    chunk_size : int
+        The number of resources to look up at once. Optional
+
+    Returns
+    -------
+    generator of tuple
+        Pairs of each of `idents`, in order, and a frozenset of its types
+    '''
+    from itertools import islice
+    from rdflib.namespace import RDF
+    from rdflib.term import URIRef
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1: Got {}'.format(chunk_size))
+    idents = iter(idents)
+    while True:
+        chunk = list(islice(idents, chunk_size))
+        if not chunk:
+            return
+        lookup = list(set(x for x in chunk if isinstance(x, URIRef)))
+        types = dict()
+        if lookup:
+            for t in graph.triples_choices((lookup, RDF['type'], None)):
+                if isinstance(t[0], tuple):
+                    t = t[0]
+                types.setdefault(t[0], set()).add(t[2])
+        types = {x: frozenset(y) for x, y in types.items()}
+        for x in chunk:
+            yield x, types.get(x, _empty_set)
+
+
+_empty_set = frozenset()
+
+
 class BatchAddGraph(object):
     ''' Wrapper around graph that turns calls to 'add' into calls to 'addN' '''
     def __init__(self, graph, batchsize=1000, _parent=None, *args, **kwargs):
@@ -3,7 +3,6 @@ import sys
 import six
 
 from .variable import Variable
-from .graphObject import GraphObjectQuerier
 from .propertyMixins import (
     DatatypePropertyMixin,
     ObjectPropertyMixin,
@@ -11,6 +10,7 @@ from .propertyMixins import (
 from .rangedObjects import InRange
 from .yProperty import Property
 from .propertyValue import PropertyValue
+from .orderedSet import IdentityOrderedBag
 from .mappedProperty import MappedPropertyClass
 from .deprecation import deprecated
 from random import randint
@@ -45,7 +45,7 @@ class SimpleProperty(six.with_metaclass(MappedPropertyClass, Property)):
         #
         # 'v' holds values that have been set on this SimpleProperty. It acts
         # as a sort of staging area before saving the values to the graph.
-        self._v = []
+        self._v = IdentityOrderedBag()
 
     def has_value(self):
         """ Returns true if the :meth:`set` has been called previously """
@@ -73,7 +73,7 @@ class SimpleProperty(six.with_metaclass(MappedPropertyClass, Property)):
     @property
     def values(self):
         """ Get all values """
-        return self._v
+        return list(self._v)
 
     @property
     def defined_values(self):
@@ -89,26 +89,32 @@ class SimpleProperty(six.with_metaclass(MappedPropertyClass, Property)):
         the resulting values. Also queries the configured rdf graph for values
         which are set for the ``Property``'s owner.
         """
+        owner = self.owner
+        if getattr(owner, 'defined', False):
+            # Nothing else about the owner can constrain the values once it's
+            # identified, so they're just the objects of (owner, link, ?)
+            return self._objects(owner.identifier, self.link)
         v = Variable("var" + str(id(self)))
         self.set(v)
-        results = GraphObjectQuerier(v, self.rdf)()
+        results = self._querier(v)()
         self.unset(v)
         return results
 
     def unset(self, v):
 
-        for idx, val in enumerate(self._v):
+        for val in self._v:
             if not hasattr(v, 'idl') and isinstance(val, PropertyValue):
                 deval = self.resolver.deserializer(val.identifier)
             else:
                 deval = val
             if deval == v:
+                actual_val = val
                 break
         else: # no break
             raise Exception("Can't find value {}".format(v))
-        actual_val = self._v[idx]
-        actual_val.owner_properties.remove(self)
+        actual_val.owner_properties.discard(self)
         self._v.remove(actual_val)
+        self._values_changed()
 
     def set(self, v):
         if isinstance(v, Rel):
@@ -131,18 +137,27 @@ class SimpleProperty(six.with_metaclass(MappedPropertyClass, Property)):
         return RelationshipProxy(Rel(self.owner, self, v))
 
     def _remove_value(self, v):
-        assert self in v.owner_properties
-        v.owner_properties.remove(self)
+        # Objects shared by many owners, like an rdf_type_object, hold the
+        # properties which refer to them weakly, so `self` may already be gone
+        v.owner_properties.discard(self)
         self._v.remove(v)
+        self._values_changed()
 
     def clear(self):
-        for x in self._v:
+        for x in list(self._v):
             self._remove_value(x)
 
     def _insert_value(self, v):
         self._v.append(v)
         if self not in v.owner_properties:
             v.owner_properties.append(self)
+        self._values_changed()
+
+    def _values_changed(self):
+        # The owner's identifier may be computed from our values
+        changed = getattr(self.owner, '_identifier_changed', None)
+        if changed is not None:
+            changed()
 
     def __eq__(self, other):
         return isinstance(other, self.__class__) and (self.link == other.link)
@@ -0,0 +1,127 @@
+import logging
+from itertools import count
+
+from rdflib.term import Literal, Identifier
+
+from .graphObject import GraphObjectQuerier, Variable, _Range, EMPTY_SET
+
+L = logging.getLogger(__name__)
+
+__all__ = ["SPARQLQuerier",
+           "path_table_to_sparql"]
+
+
+class SPARQLQuerier(GraphObjectQuerier):
+
+    """ A :class:`~yarom.graphObject.GraphObjectQuerier` which sends the
+    whole query to the graph as a single SPARQL ``SELECT``.
+
+    Suitable for graphs backed by a remote SPARQL endpoint, where each
+    ``triples`` call is a round trip. The graph must implement ``query``,
+    taking a SPARQL query string and returning result rows, as
+    :class:`rdflib.graph.Graph` does.
+
+    Queries for objects which are already defined are checked as they are for
+    :class:`~yarom.graphObject.GraphObjectQuerier`.
+    """
+
+    def do_query(self):
+        if self.query_object.defined:
+            return super(SPARQLQuerier, self).do_query()
+        h = self.plan()
+        if not h:
+            return EMPTY_SET
+        return set(self._select(h))
+
+    def stream(self, limit=None, offset=None):
+        """ Yields the results of the query as they are returned by the graph.
+
+        `limit` and `offset` are given to the graph in the query.
+        """
+        if self.query_object.defined:
+            for x in super(SPARQLQuerier, self).stream(limit, offset):
+                yield x
+            return
+        h = self.plan()
+        if not h:
+            return
+        for x in self._select(h, limit, offset):
+            yield x
+
+    def sparql(self, limit=None, offset=None):
+        """ Returns the SPARQL query for the query object, or `None` if there
+        are no paths to query along """
+        h = self.plan()
+        if not h:
+            return None
+        return path_table_to_sparql(h, limit, offset)
+
+    def _select(self, path_table, limit=None, offset=None):
+        q = path_table_to_sparql(path_table, limit, offset)
+        L.debug('SPARQLQuerier: %s', q)
+        for row in self.base_graph.query(q):
+            yield row[0]
+
+
+def path_table_to_sparql(path_table, limit=None, offset=None):
+    """ Translates a path table, as produced by
+    :meth:`~yarom.graphObject.GraphObjectQuerier.plan`, to a SPARQL query
+    selecting the distinct terms at the center of the query as ``?x``.
+
+    Parameters
+    ----------
+    path_table : dict
+        The path table
+    limit : int
+        Maximum number of results. Optional
+    offset : int
+        Number of results to skip. Optional
+
+    Returns
+    -------
+    str
+        The query
+    """
+    patterns = []
+    filters = []
+    _compile_table(path_table, '?x', patterns, filters, count())
+    q = 'SELECT DISTINCT ?x WHERE {\n'
+    for p in patterns:
+        q += '    ' + p + ' .\n'
+    for f in filters:
+        q += '    FILTER(' + f + ')\n'
+    q += '}'
+    if limit is not None:
+        q += '\nLIMIT ' + str(int(limit))
+    if offset:
+        q += '\nOFFSET ' + str(int(offset))
+    return q
+
+
+def _compile_table(path_table, var, patterns, filters, counter):
+    for hop, sub in path_table.items():
+        idx = hop.index(None)
+        other_idx = 0 if (idx == 2) else 2
+        other = hop[other_idx]
+        if isinstance(other, Variable):
+            other_term = '?v' + str(next(counter))
+            _compile_table(sub, other_term, patterns, filters, counter)
+        elif isinstance(other, _Range):
+            other_term = '?v' + str(next(counter))
+            if other.min_value is not None:
+                filters.append(other_term + ' > ' + _n3(other.min_value))
+            if other.max_value is not None:
+                filters.append(other_term + ' < ' + _n3(other.max_value))
+        else:
+            other_term = _n3(other)
+
+        if idx == 0:
+            patterns.append(var + ' ' + _n3(hop[1]) + ' ' + other_term)
+        else:
+            patterns.append(other_term + ' ' + _n3(hop[1]) + ' ' + var)
+
+
+def _n3(term):
+    if not isinstance(term, Identifier):
+        term = Literal(term)
+    return term.n3()
@@ -0,0 +1,196 @@
+import logging
+import sys
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+L = logging.getLogger(__name__)
+
+__all__ = ["TermInterner",
+           "TermDictionary",
+           "EncodedTermSet"]
+
+
+class TermInterner(object):
+
+    """ Maps RDF terms to canonical instances and dense integer ids.
+
+    Equal terms interned through the same interner come back as the same
+    instance, so later comparisons between them can mostly be settled by
+    identity, and repeated terms in results share memory. Ids aren't reused
+    until the interner is cleared, so an interner grows with the number of
+    distinct terms seen. :class:`yarom.data.Data` keeps one for its graph
+    when ``rdf.intern_terms`` is set and clears it when the graph is closed.
+    """
+
+    def __init__(self):
+        self._ids = dict()
+        self._terms = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, term):
+        """ Returns the canonical instance of `term` """
+        i = self._ids.get(term)
+        if i is None:
+            self.misses += 1
+            i = self.id(term)
+        else:
+            self.hits += 1
+        return self._terms[i]
+
+    def id(self, term):
+        """ Returns the id for `term`, assigning one if there isn't one
+        already """
+        i = self._ids.get(term)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(term)
+                if i is None:
+                    i = len(self._terms)
+                    self._terms.append(term)
+                    self._ids[term] = i
+        return i
+
+    def get_id(self, term):
+        """ Returns the id for `term` or `None` if it doesn't have one """
+        return self._ids.get(term)
+
+    def term(self, i):
+        """ Returns the term for the id `i` """
+        return self._terms[i]
+
+    def clear(self):
+        """ Forgets all of the interned terms and their ids """
+        with self._lock:
+            self._ids.clear()
+            del self._terms[:]
+            self.hits = 0
+            self.misses = 0
+
+    def _assign(self, new_terms):
+        with self._lock:
+            id_map = self._ids
+            terms = self._terms
+            for t in new_terms:
+                if t not in id_map:
+                    id_map[t] = len(terms)
+                    terms.append(t)
+
+    def memory_size(self):
+        """ Returns an estimate, in bytes, of the memory held by the interner,
+        including the terms themselves """
+        return (sys.getsizeof(self._ids) +
+                sys.getsizeof(self._terms) +
+                sum(sys.getsizeof(t) for t in self._terms))
+
+    def stats(self):
+        """ Returns a dict of statistics about the interner: the number of
+        ``terms``, interning ``hits`` and ``misses``, the ``hit_rate``, and
+        the estimated ``memory_size`` in bytes """
+        lookups = self.hits + self.misses
+        return dict(terms=len(self),
+                    hits=self.hits,
+                    misses=self.misses,
+                    hit_rate=self.hits / float(lookups) if lookups else 0.0,
+                    memory_size=self.memory_size())
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __repr__(self):
+        return '{}({} terms)'.format(type(self).__name__, len(self))
+
+
+class TermDictionary(TermInterner):
+
+    """ Maps RDF terms to dense integer ids.
+
+    Used by :class:`~yarom.graphObject.GraphObjectQuerier` to represent the
+    intermediate results of a query as sorted arrays of ids, which can be
+    intersected without hashing the terms again. A dictionary can be made for
+    a single query or shared between queries on the same store. Ids are never
+    reused, so a shared dictionary grows with the number of distinct terms
+    seen.
+
+    Requires NumPy.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise Exception("NumPy is required for integer-encoded join sets")
+        super(TermDictionary, self).__init__()
+
+    def encode(self, terms):
+        """ Returns an :class:`EncodedTermSet` for the given terms """
+        terms = list(terms)
+        get_id = self._ids.get
+        ids = list(map(get_id, terms))
+        if None in ids:
+            self._assign(t for t, i in zip(terms, ids) if i is None)
+            ids = list(map(get_id, terms))
+        return EncodedTermSet(self, np.unique(np.array(ids, dtype=np.int64)))
+
+
+class EncodedTermSet(object):
+
+    """ A set of terms stored as a sorted array of ids from a
+    :class:`TermDictionary`.
+
+    Supports the operations on join sets used by
+    :class:`~yarom.graphObject.GraphObjectQuerier`: ``len``, iteration (which
+    yields the terms), ``in`` and :meth:`intersection_update`.
+    """
+
+    __slots__ = ('dictionary', 'ids')
+
+    def __init__(self, dictionary, ids):
+        self.dictionary = dictionary
+        self.ids = ids
+
+    def intersection_update(self, *others):
+        """ Keeps only the terms which are also in all of `others`.
+
+        `others` may be :class:`EncodedTermSet` objects with the same
+        dictionary or any other iterables of terms
+        """
+        res = self.ids
+        for other in sorted(others, key=len):
+            if not len(res):
+                break
+            res = np.intersect1d(res, self._ids_of(other), assume_unique=True)
+        self.ids = res
+
+    def _ids_of(self, other):
+        if isinstance(other, EncodedTermSet) and other.dictionary is self.dictionary:
+            return other.ids
+        get_id = self.dictionary.get_id
+        ids = np.fromiter((i for i in (get_id(t) for t in other) if i is not None),
+                          dtype=np.int64)
+        return np.unique(ids)
+
+    def __contains__(self, term):
+        i = self.dictionary.get_id(term)
+        if i is None:
+            return False
+        k = np.searchsorted(self.ids, i)
+        return k < len(self.ids) and self.ids[k] == i
+
+    def __iter__(self):
+        terms = self.dictionary._terms
+        return iter([terms[i] for i in self.ids.tolist()])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __bool__(self):
+        return len(self.ids) > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return 'EncodedTermSet({} terms)'.format(len(self))